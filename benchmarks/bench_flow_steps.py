@@ -0,0 +1,152 @@
+"""Micro-benchmark: per-step cost of BaseFlow.run.
+
+Compares the compiled execution plan used by ``BaseFlow.run`` with the
+previous interpreter, which resolved every step through string-keyed
+lookups on ``flow_definition`` and the node's transitions, and with the
+specialized function generated by ``src.flows.codegen.compile_flow``.
+The nodes here are plain step-scoped nodes, which the plan marks as
+``direct`` so the walker runs them itself.
+
+Run from the repository root:
+
+    python benchmarks/bench_flow_steps.py
+"""
+# ruff: noqa: T201
+
+import logging
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.flows.base import BaseFlow, FlowNode
+from src.flows.codegen import compile_flow
+from src.nodes.base import BaseNode
+
+
+class CountNode(BaseNode):
+    """Loops until the counter reaches the limit."""
+
+    def exec(self, store):
+        store["count"] = store.get("count", 0) + 1
+        store["action"] = "loop" if store["count"] < store["limit"] else "done"
+        return store
+
+
+def legacy_run(flow, initial_store=None, max_steps=100):
+    """The pre-compilation ``BaseFlow.run`` loop, kept for comparison."""
+    store = initial_store or {}
+    store["_flow_name"] = flow.name
+    store["_flow_path"] = []
+    current_node_id = "start"
+    steps = 0
+    flow.logger.info(f"Starting flow: {flow.name}")
+    while current_node_id != "end" and steps < max_steps:
+        steps += 1
+        store["_flow_path"].append(current_node_id)
+        if current_node_id not in flow.flow_definition:
+            store["action"] = "error"
+            break
+        node_config = flow.flow_definition[current_node_id]
+        try:
+            node = node_config.node_class()
+            flow.logger.info(f"Executing node: {current_node_id}")
+            store = node.run(store)
+        except Exception as e:
+            store["action"] = "error"
+            store["error"] = str(e)
+            break
+        action = store.get("action", "default")
+        if action == "error" and "error" not in node_config.transitions:
+            break
+        next_node_id = node_config.transitions.get(
+            action, node_config.transitions.get("default", "end")
+        )
+        flow.logger.info(
+            f"Transition: {current_node_id} --[{action}]--> {next_node_id}"
+        )
+        current_node_id = next_node_id
+    store["_flow_steps"] = steps
+    store["_flow_completed"] = current_node_id == "end"
+    return store
+
+
+def build_flow(width: int) -> BaseFlow:
+    """Build a flow with ``width`` unrelated actions per node."""
+    transitions = {f"unused_{i}": "end" for i in range(width)}
+    definition = {
+        "start": FlowNode(CountNode, {**transitions, "loop": "middle"}),
+        "middle": FlowNode(CountNode, {**transitions, "loop": "start"}),
+    }
+    return BaseFlow(definition, name="BenchFlow")
+
+
+def per_step_ns(run, flow, steps: int, repeat: int = 5, number: int = 200) -> float:
+    """Best-of-``repeat`` nanoseconds per flow step."""
+    timings = timeit.repeat(
+        lambda: run(flow, {"limit": steps}, max_steps=steps + 1),
+        repeat=repeat,
+        number=number,
+    )
+    return min(timings) / (number * steps) * 1e9
+
+
+def dispatch_ns(flow: BaseFlow, number: int = 200_000) -> tuple[float, float]:
+    """Nanoseconds to resolve one transition, legacy vs plan.
+
+    This isolates the interpretive overhead from node construction and
+    logging, which dominate the full per-step numbers.
+    """
+    definition = flow.flow_definition
+    plan = flow.plan
+    action_index = plan.action_index
+    nodes = plan.nodes
+
+    def legacy() -> str:
+        node_config = definition["start"]
+        action = "loop"
+        if action == "error" and "error" not in node_config.transitions:
+            return "stop"
+        return node_config.transitions.get(
+            action, node_config.transitions.get("default", "end")
+        )
+
+    def planned() -> int:
+        return nodes[0].targets[action_index.get("loop", -1)]
+
+    legacy_time = min(timeit.repeat(legacy, repeat=5, number=number))
+    planned_time = min(timeit.repeat(planned, repeat=5, number=number))
+    return legacy_time / number * 1e9, planned_time / number * 1e9
+
+
+def main() -> None:
+    """Print per-step cost before and after plan compilation."""
+    logging.disable(logging.CRITICAL)
+    steps = 50
+
+    print("Full step (node construction, node.run, logging, transition):")
+    print(
+        f"{'actions/node':>12} {'legacy ns/step':>15} {'plan ns/step':>13} "
+        f"{'compiled ns/step':>17}"
+    )
+    for width in (2, 16, 64):
+        flow = build_flow(width)
+        compiled = compile_flow(flow)
+        legacy = per_step_ns(legacy_run, flow, steps)
+        planned = per_step_ns(BaseFlow.run, flow, steps)
+        generated = per_step_ns(
+            lambda _flow, store, max_steps, run=compiled: run(store, max_steps),
+            flow,
+            steps,
+        )
+        print(f"{width:>12} {legacy:>15.0f} {planned:>13.0f} {generated:>17.0f}")
+
+    print()
+    print("Transition resolution only:")
+    legacy, planned = dispatch_ns(build_flow(16))
+    print(f"  legacy: {legacy:.0f} ns   plan: {planned:.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Micro-benchmark: plain dict stores versus typed ``FlowStore`` objects.
+
+Measures the memory of many small stores, the cost of reading and writing
+one key through dict access, ``FlowStore`` attribute access and
+``FlowStore`` mapping access, and the per-step cost of a looping flow whose
+nodes use mapping access on either kind of store.
+
+Run from the repository root:
+
+    python benchmarks/bench_store.py
+"""
+# ruff: noqa: T201
+
+import logging
+import sys
+import timeit
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.flows.base import BaseFlow, FlowNode
+from src.nodes.base import BaseNode
+from src.utils.schema import FlowStore
+
+STORES = 10_000
+NUMBER = 1_000_000
+FLOW_STEPS = 1_000
+
+
+class OrderStore(FlowStore):
+    """Store of a typical order-processing run."""
+
+    order_id: int = 0
+    customer: str = ""
+    amount: float = 0.0
+    currency: str = "EUR"
+    status: str = "new"
+    score: float = 0.0
+
+
+def order_dict() -> dict:
+    """The same contents as a plain dict."""
+    return {
+        "order_id": 0,
+        "customer": "",
+        "amount": 0.0,
+        "currency": "EUR",
+        "status": "new",
+        "score": 0.0,
+        "action": "success",
+        "_flow_name": "OrderFlow",
+        "_flow_steps": 3,
+        "_flow_completed": True,
+    }
+
+
+def order_store() -> OrderStore:
+    """An ``OrderStore`` holding the same keys."""
+    return OrderStore(
+        action="success", _flow_name="OrderFlow", _flow_steps=3, _flow_completed=True
+    )
+
+
+class ScoreNode(BaseNode):
+    """Updates the order through mapping access until the limit is reached."""
+
+    def exec(self, store):
+        store["score"] = store["score"] + store["amount"]
+        store["order_id"] = store.get("order_id", 0) + 1
+        store["action"] = "loop" if store["order_id"] < FLOW_STEPS else "done"
+        return store
+
+
+SCORE_FLOW = BaseFlow(
+    {"start": FlowNode(ScoreNode, {"loop": "start", "done": "end"})},
+    name="ScoreFlow",
+)
+
+
+def flow_us_per_step(factory) -> float:
+    """Microseconds per step of ``SCORE_FLOW`` on a store."""
+    timings = timeit.repeat(
+        lambda: SCORE_FLOW.run(factory(), max_steps=FLOW_STEPS + 1),
+        repeat=5,
+        number=20,
+    )
+    return min(timings) / (20 * FLOW_STEPS) * 1e6
+
+
+def memory_per_store(factory) -> float:
+    """Bytes allocated per store when creating many of them."""
+    tracemalloc.start()
+    stores = [factory() for _ in range(STORES)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del stores
+    return size / STORES
+
+
+def ns_per_op(statement: str, setup: str) -> float:
+    """Nanoseconds per execution of a statement."""
+    timer = timeit.Timer(statement, setup, globals=globals())
+    return min(timer.repeat(repeat=5, number=NUMBER)) / NUMBER * 1e9
+
+
+def main():
+    """Print memory and access costs."""
+    print(f"{'':<28}{'dict':>10}{'FlowStore':>12}")
+    dict_bytes = memory_per_store(order_dict)
+    store_bytes = memory_per_store(order_store)
+    print(f"{'bytes per store':<28}{dict_bytes:>10.0f}{store_bytes:>12.0f}")
+
+    setup = "d = order_dict(); s = order_store()"
+    rows = [
+        ("read (attribute)", "d['amount']", "s.amount"),
+        ("write (attribute)", "d['amount'] = 1.0", "s.amount = 1.0"),
+        ("read (mapping)", "d['amount']", "s['amount']"),
+        ("get (mapping)", "d.get('action')", "s.get('action')"),
+    ]
+    for label, plain, typed in rows:
+        print(
+            f"{label + ' ns':<28}{ns_per_op(plain, setup):>10.1f}"
+            f"{ns_per_op(typed, setup):>12.1f}"
+        )
+
+    logging.disable(logging.CRITICAL)
+    dict_step = flow_us_per_step(order_dict)
+    store_step = flow_us_per_step(order_store)
+    print(f"{'flow step (mapping) µs':<28}{dict_step:>10.2f}{store_step:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Benchmark: ``DataTransformNode`` on lists versus columns.
+
+Times each transform on inputs of growing size, once with ``input_data``
+as a Python list and once as a column (a NumPy array if NumPy is
+installed, otherwise an ``array.array``; uppercase needs NumPy), and
+reports the smallest size from which the column is faster. Also reports
+the memory held by a million-item input in both forms.
+
+Run from the repository root:
+
+    python benchmarks/bench_transform.py
+"""
+# ruff: noqa: S311, T201
+
+import random
+import sys
+import time
+import tracemalloc
+from array import array
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.nodes.examples import DataTransformNode
+from src.utils.columns import HAS_NUMPY
+
+if HAS_NUMPY:
+    import numpy as np
+
+SIZES = (10, 100, 1_000, 10_000, 100_000, 1_000_000)
+BUDGET = 0.2  # Seconds of repetitions per measurement
+
+
+def make_list(transform_type: str, size: int) -> list:
+    """Random input data: words for uppercase, integers otherwise."""
+    rng = random.Random(size)
+    if transform_type == "uppercase":
+        return [f"item-{rng.getrandbits(24):x}" for _ in range(size)]
+    return [rng.getrandbits(48) for _ in range(size)]
+
+
+def make_column(values: list):
+    """The same data as a column, or None if it cannot be one."""
+    if HAS_NUMPY:
+        return np.asarray(values)
+    if isinstance(values[0], str):
+        return None
+    return array("q", values)
+
+
+def seconds_per_run(input_data, transform_type: str) -> float:
+    """Best time of one node run over repeated runs."""
+    node = DataTransformNode()
+    best = float("inf")
+    spent = 0.0
+    while spent < BUDGET:
+        store = {"input_data": input_data, "transform_type": transform_type}
+        started = time.perf_counter()
+        node.run(store)
+        elapsed = time.perf_counter() - started
+        best = min(best, elapsed)
+        spent += elapsed
+    return best
+
+
+def held_bytes(factory) -> int:
+    """Bytes allocated by building a value, kept alive while measuring."""
+    tracemalloc.start()
+    value = factory()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del value
+    return size
+
+
+def main():
+    """Print run times per size and the crossover size of each transform."""
+    backend = "NumPy" if HAS_NUMPY else "array.array"
+    print(f"Columns: {backend}")
+    for transform_type in ("uppercase", "reverse", "sort"):
+        print(f"\n{transform_type:<10}{'size':>10}{'list µs':>14}{'column µs':>14}")
+        crossover = None
+        for size in SIZES:
+            values = make_list(transform_type, size)
+            column = make_column(values)
+            if column is None:
+                print(f"{'':<10}{size:>10,}  (needs NumPy)")
+                continue
+            list_time = seconds_per_run(values, transform_type)
+            column_time = seconds_per_run(column, transform_type)
+            if crossover is None and column_time < list_time:
+                crossover = size
+            print(
+                f"{'':<10}{size:>10,}{list_time * 1e6:>14.1f}{column_time * 1e6:>14.1f}"
+            )
+        print(f"{'':<10}columns faster from: {crossover or '-'}")
+
+    size = SIZES[-1]
+    print(f"\nMemory held by {size:,} integers:")
+    print(f"  list    {held_bytes(lambda: make_list('sort', size)) / 1e6:>8.1f} MB")
+    column_bytes = held_bytes(lambda: make_column(make_list("sort", size)))
+    print(f"  column  {column_bytes / 1e6:>8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
 """Flow daemon for managing and executing flows."""
 
 import asyncio
+import inspect
 import logging
+import time
 from typing import Any
 
 logger = logging.getLogger(__name__)
@@ -25,10 +27,22 @@ class FlowDaemon:
     def add_flow(self, name: str, flow: Any) -> None:
         """Add a flow to the daemon.
 
+        Flows with a static ``analysis`` (such as ``BaseFlow``) are rejected
+        if their graph shows they can loop forever or never complete.
+
         Args:
             name: Name identifier for the flow
             flow: Flow object to add
+
+        Raises:
+            ValueError: If the flow's analysis reports errors
         """
+        analysis = getattr(flow, "analysis", None)
+        errors = getattr(analysis, "errors", None)
+        if errors:
+            msg = f"Cannot add flow {name}: {'; '.join(errors)}"
+            raise ValueError(msg)
+
         self.flows[name] = flow
         self.logger.info(f"Added flow: {name}")
 
@@ -104,6 +118,10 @@ class FlowDaemon:
     ) -> dict[str, Any]:
         """Execute a flow by name.
 
+        The run gets a deadline of ``config.flow_timeout`` seconds, which
+        flows read from ``_flow_deadline`` in the store; a run that exceeds
+        it ends with the 'timeout' action.
+
         Args:
             flow_name: Name of the flow to execute
             input_data: Input data for the flow
@@ -121,13 +139,21 @@ class FlowDaemon:
 
         self.logger.info(f"Executing flow: {flow_name}")
 
-        # Execute the flow (this would be implementation-specific)
-        # For now, return a mock result
+        store = dict(input_data)
+        timeout = self.config.flow_timeout
+        if timeout is not None and timeout > 0:
+            store["_flow_deadline"] = time.time() + timeout
+        if inspect.iscoroutinefunction(flow.run):
+            result = await flow.run(store)
+        else:
+            # Sync flows block, so keep them off the event loop
+            result = await asyncio.to_thread(flow.run, store)
+
         return {
             "flow_name": flow_name,
             "input": input_data,
-            "status": "completed",
-            "result": "Mock execution result",
+            "status": "completed" if result.get("_flow_completed") else "failed",
+            "result": result,
         }
 
     @property
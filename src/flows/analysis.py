@@ -0,0 +1,233 @@
+"""Static analysis of compiled flow graphs.
+
+``analyze_plan`` inspects an ``ExecutionPlan`` once, when a flow is
+constructed, and reports structural problems that would otherwise only
+show up at runtime as a flow burning through ``max_steps``:
+
+- cycles (strongly connected components that can repeat)
+- nodes that can never be reached from ``start``
+- nodes from which ``end`` can never be reached
+- nodes from which the flow can never finish at all, not even by stopping
+  on an unhandled error
+- the longest path to ``end`` and a ``max_steps`` bound that is always
+  enough, for acyclic flows
+
+The graph has an edge for every entry of a node's transition table, so it
+includes the implicit transitions (unknown actions falling back to
+``default`` or ``end``, errors without an ``error`` transition stopping the
+flow). Node code can take any of these edges, so the analysis is
+conservative: it reports what may happen, not what will.
+"""
+
+from dataclasses import dataclass
+
+from src.flows.plan import END, STOP, ExecutionPlan
+
+
+@dataclass(frozen=True)
+class FlowAnalysis:
+    """Structural properties of a flow graph.
+
+    Attributes:
+        cycles: Groups of node IDs that can repeat (strongly connected
+            components with a cycle), in no particular order
+        unreachable: Nodes that can never run
+        no_exit: Reachable nodes from which ``end`` cannot be reached
+        traps: Reachable nodes from which the flow can never finish, so
+            runs reaching them always exhaust ``max_steps``
+        longest_path: Most steps a run can take, or None if the flow has
+            cycles
+        safe_max_steps: Smallest ``max_steps`` that never cuts a run
+            short, or None if the flow has cycles
+    """
+
+    cycles: tuple[tuple[str, ...], ...]
+    unreachable: frozenset[str]
+    no_exit: frozenset[str]
+    traps: frozenset[str]
+    longest_path: int | None
+    safe_max_steps: int | None
+
+    @property
+    def is_acyclic(self) -> bool:
+        """True if no node can run more than once per run."""
+        return not self.cycles
+
+    @property
+    def errors(self) -> list[str]:
+        """Problems that make a flow unusable, as messages."""
+        errors = []
+        if self.traps:
+            errors.append(f"Flow can loop forever at nodes: {sorted(self.traps)}")
+        if "start" in self.no_exit:
+            errors.append("Flow can never reach 'end' from 'start'")
+        return errors
+
+
+def _successors(plan: ExecutionPlan) -> list[tuple[int, ...]]:
+    """Node successors, with fan-outs leading to their branches and join."""
+    successors = []
+    for node in plan.nodes:
+        if node.fanout is not None:
+            targets = (*node.fanout.branches, node.fanout.join)
+        else:
+            targets = node.targets
+        successors.append(tuple(sorted(set(targets))))
+    return successors
+
+
+def _strongly_connected(successors: list[tuple[int, ...]]) -> list[list[int]]:
+    """Tarjan's algorithm, iterative so deep flows cannot overflow the stack."""
+    index: dict[int, int] = {}
+    low: dict[int, int] = {}
+    on_stack: set[int] = set()
+    stack: list[int] = []
+    components: list[list[int]] = []
+
+    for root in range(len(successors)):
+        if root in index:
+            continue
+        work = [(root, 0)]
+        while work:
+            node, child = work.pop()
+            if child == 0:
+                index[node] = low[node] = len(index)
+                stack.append(node)
+                on_stack.add(node)
+
+            targets = successors[node]
+            while child < len(targets) and targets[child] < 0:
+                child += 1
+            if child < len(targets):
+                target = targets[child]
+                work.append((node, child + 1))
+                if target not in index:
+                    work.append((target, 0))
+                elif target in on_stack:
+                    low[node] = min(low[node], index[target])
+                continue
+
+            for target in targets:
+                if target >= 0 and target in on_stack:
+                    low[node] = min(low[node], low[target])
+            if low[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+
+    return components
+
+
+def _can_reach(
+    successors: list[tuple[int, ...]], goals: frozenset[int], plan: ExecutionPlan
+) -> set[int]:
+    """Nodes from which one of the sentinel ``goals`` can be reached."""
+    reaching: set[int] = set()
+    changed = True
+    while changed:
+        changed = False
+        for node, targets in enumerate(successors):
+            if node in reaching:
+                continue
+            fanout = plan.nodes[node].fanout
+            # A fan-out always continues at its join
+            candidates = (fanout.join,) if fanout is not None else targets
+            if any(t in goals or t in reaching for t in candidates):
+                reaching.add(node)
+                changed = True
+    return reaching
+
+
+def _longest_path(plan: ExecutionPlan, components: list[list[int]]) -> int:
+    """Most steps a run of an acyclic flow can take.
+
+    ``components`` come from ``_strongly_connected``, which lists them in
+    reverse topological order: every node is visited after all the nodes
+    it leads to, so one pass without recursion finds the longest paths.
+    A fan-out's branches are counted up to its join, so a path is kept to
+    ``end`` and to every join.
+    """
+    stops = list(
+        dict.fromkeys(
+            [END] + [n.fanout.join for n in plan.nodes if n.fanout is not None]
+        )
+    )
+    # longest[stop][node]: steps from node until the run reaches stop
+    longest = {stop: [0] * len(plan.nodes) for stop in stops}
+
+    def steps(stop: int, node: int) -> int:
+        return 0 if node < 0 else longest[stop][node]
+
+    for component in components:
+        for node in component:
+            compiled = plan.nodes[node]
+            fanout = compiled.fanout
+            branches = (
+                0
+                if fanout is None
+                else sum(steps(fanout.join, b) for b in fanout.branches)
+            )
+            for stop in stops:
+                if node == stop:
+                    continue
+                if fanout is not None:
+                    count = branches + steps(stop, fanout.join)
+                else:
+                    count = 1 + max(steps(stop, t) for t in compiled.targets)
+                longest[stop][node] = count
+
+    return longest[END][0]
+
+
+def analyze_plan(plan: ExecutionPlan) -> FlowAnalysis:
+    """Analyze the graph of a compiled flow.
+
+    Args:
+        plan: The compiled execution plan
+
+    Returns:
+        The analysis results
+    """
+    successors = _successors(plan)
+
+    reachable = {0}
+    pending = [0]
+    while pending:
+        for target in successors[pending.pop()]:
+            if target >= 0 and target not in reachable:
+                reachable.add(target)
+                pending.append(target)
+
+    components = _strongly_connected(successors)
+    cyclic = []
+    for component in components:
+        node = component[0]
+        if len(component) > 1 or node in successors[node]:
+            cyclic.append(tuple(sorted(plan.nodes[n].node_id for n in component)))
+
+    to_end = _can_reach(successors, frozenset({END}), plan)
+    to_finish = _can_reach(successors, frozenset({END, STOP}), plan)
+
+    def names(indices: set[int]) -> frozenset[str]:
+        # Fan-outs are internal nodes; report flow nodes only
+        return frozenset(
+            plan.nodes[i].node_id for i in indices if plan.nodes[i].config is not None
+        )
+
+    all_nodes = set(range(len(plan.nodes)))
+    longest = None if cyclic else _longest_path(plan, components)
+
+    return FlowAnalysis(
+        cycles=tuple(sorted(cyclic)),
+        unreachable=names(all_nodes - reachable),
+        no_exit=names(reachable - to_end),
+        traps=names(reachable - to_finish),
+        longest_path=longest,
+        # A run that ends exactly at max_steps is reported as exceeding it
+        safe_max_steps=None if longest is None else longest + 1,
+    )
@@ -1,18 +1,221 @@
 """Base flow implementation for PocketFlow."""
 
+import asyncio
 import logging
+import time
+import uuid
+from collections.abc import (
+    AsyncIterator,
+    Generator,
+    Iterable,
+    Iterator,
+    Mapping,
+    MutableMapping,
+)
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
 from dataclasses import dataclass, field
-from typing import Any
+from functools import partial
+from typing import Any, NamedTuple
+
+from src.flows.analysis import FlowAnalysis, analyze_plan
+from src.flows.checkpoint import CheckpointState, CheckpointWriter, FileCheckpointer
+from src.flows.dataflow import (
+    IMPLICIT_KEYS,
+    Speculation,
+    check_effects,
+    commit,
+    plan_waves,
+)
+from src.flows.executors import (
+    exec_in_process,
+    get_thread_pool,
+    register_worker_modules,
+    run_in_daemon_thread,
+)
+from src.flows.hedging import async_hedged_runner, hedged_runner
+from src.flows.hooks import FlowHook, async_phase_tracer, emit, phase_tracer
+from src.flows.incremental import (
+    TRACE_KEY,
+    IncrementalRun,
+    ReadTracker,
+    RunTrace,
+    start_rerun,
+)
+from src.flows.instances import (
+    NODE_SCOPES,
+    STEP_SCOPE,
+    FlowScopeProvider,
+    PooledProvider,
+    make_provider,
+)
+from src.flows.parallel import (
+    BranchResult,
+    CompiledFanOut,
+    FanOut,
+    JoinState,
+    fork_store,
+    merge_branches,
+    validate_fanout,
+)
+from src.flows.path import FlowPath
+from src.flows.plan import (
+    END,
+    STOP,
+    TIMEOUT_ACTION,
+    CompiledNode,
+    ExecutionPlan,
+    compile_plan,
+    subflow_definition,
+)
+from src.flows.profiler import FlowProfiler
+from src.flows.timeouts import (
+    DEADLINE_KEY,
+    StepDurations,
+    mark_timeout,
+    run_limited,
+    run_limited_async,
+    run_limited_in_thread,
+    set_deadline,
+)
+from src.nodes.base import AsyncBaseNode, PhaseRunner
+from src.utils.rng import RandomStream, assign_seed, seed_store, split_stream
+from src.utils.store import CowStore
 
 logger = logging.getLogger(__name__)
 
 
 @dataclass
 class FlowNode:
-    """Configuration for a node in a flow."""
+    """Configuration for a node in a flow.
+
+    Attributes:
+        node_class: Node class to run at this step, or a flow to inline as
+            a sub-flow (its nodes get IDs like ``'<node ID>.<inner ID>'``)
+        transitions: Mapping of action to target node ID (or ``FanOut``)
+        scope: Instance scope - 'step', 'run', 'flow' or 'pooled'
+            (see ``src.flows.instances``)
+        pool_size: Maximum number of live instances for the 'pooled' scope
+    """
+
+    node_class: "type | BaseFlow"
+    transitions: dict[str, str | FanOut] = field(default_factory=dict)
+    scope: str = STEP_SCOPE
+    pool_size: int = 4
+
+
+@dataclass
+class RunContext:
+    """Per-run state shared by the plan walker and node execution.
+
+    Attributes:
+        max_steps: Step budget of the run
+        instances: Node instances cached for the 'run' scope
+        verbose: Log every step at INFO level
+        checkpoint: Writer recording every step of the run, or None
+        hooks: Subscribers receiving the run's events
+        inline: Let the walker run direct nodes (see ``CompiledNode``)
+            itself instead of yielding them; set by the sync driver
+    """
+
+    max_steps: int
+    instances: dict[Any, Any] = field(default_factory=dict)
+    verbose: bool = True
+    checkpoint: CheckpointWriter | None = None
+    hooks: tuple[FlowHook, ...] = ()
+    inline: bool = False
+
+    def close(self) -> None:
+        """Release resources held by the run."""
+        if self.checkpoint is not None:
+            self.checkpoint.close()
+
+
+class StepEvent(NamedTuple):
+    """Progress event yielded by ``run_iter`` after every step.
+
+    The last event of a run has no ``node_id`` and carries the final
+    ``store``; its ``elapsed`` covers the whole run.
+
+    Attributes:
+        node_id: ID of the node that ran, or None for the final event
+        action: Action the store held after the step
+        elapsed: Seconds the step took
+        written_keys: Keys the step set, in write order, not counting the
+            flow's own ``_flow_*`` bookkeeping
+        store: Final store, on the final event only
+    """
+
+    node_id: str | None
+    action: str | None
+    elapsed: float
+    written_keys: tuple[str, ...]
+    store: MutableMapping[str, Any] | None = None
 
-    node_class: type
-    transitions: dict[str, str] = field(default_factory=dict)
+
+_MISSING = object()
+
+
+def _step_event(
+    node: CompiledNode,
+    tracker: ReadTracker,
+    implicit: tuple[Any, ...],
+    store: Any,
+    elapsed: float,
+) -> StepEvent:
+    """Describe a completed step from the keys written through its tracker.
+
+    ``implicit`` holds the values of ``IMPLICIT_KEYS`` before the step,
+    which the flow itself sets when a node fails or the run stops.
+    """
+    written = dict(tracker.written)
+    if store is not tracker.store:
+        # A node returning another store may have changed any key
+        original = tracker.store
+        written.update(
+            dict.fromkeys(
+                key
+                for key, value in store.items()
+                if original.get(key, _MISSING) is not value
+            )
+        )
+    for key, value in zip(IMPLICIT_KEYS, implicit, strict=True):
+        if store.get(key, _MISSING) is not value:
+            written[key] = None
+    keys = tuple(
+        key for key in written if not key.startswith("_flow_") and key in store
+    )
+    return StepEvent(node.node_id, store.get("action"), elapsed, keys)
+
+
+def _final_event(store: Any, started: float) -> StepEvent:
+    """Event closing a run."""
+    return StepEvent(None, store.get("action"), time.monotonic() - started, (), store)
+
+
+def _is_cpu_bound(node: CompiledNode) -> bool:
+    """Check whether a compiled node runs its exec phase in a process."""
+    return getattr(node.node_class, "cpu_bound", False) is True
+
+
+def _is_async_node(node_class: Any) -> bool:
+    """Check whether a node class has awaitable lifecycle phases."""
+    return isinstance(node_class, type) and issubclass(node_class, AsyncBaseNode)
+
+
+def _can_start_early(node: CompiledNode) -> bool:
+    """Check whether a node may run ahead of its turn (see ``src.flows.dataflow``)."""
+    node_class = node.node_class
+    return (
+        getattr(node_class, "hedge", False) is not True
+        and getattr(node_class, "node_timeout", None) is None
+    )
 
 
 class BaseFlow:
@@ -21,17 +224,141 @@ class BaseFlow:
     Manages node execution and transitions based on actions.
     """
 
-    def __init__(self, flow_definition: dict[str, FlowNode], name: str | None = None):
+    supports_async = False
+
+    def __init__(
+        self,
+        flow_definition: dict[str, FlowNode],
+        name: str | None = None,
+        *,
+        checkpointer: FileCheckpointer | None = None,
+        hooks: Iterable[FlowHook] = (),
+        path_limit: int | None = None,
+        seed: int | None = None,
+        parallel: bool = False,
+        debug: bool = False,
+    ):
         """Initialize the flow with its definition.
 
         Args:
             flow_definition: Dictionary mapping node IDs to FlowNode configs
             name: Optional name for the flow
+            checkpointer: Optional ``FileCheckpointer`` that records every
+                step of ``run`` so it can be continued with ``resume``
+            hooks: Subscribers for flow events (see ``src.flows.hooks``)
+            path_limit: Keep only the last ``path_limit`` steps in
+                ``_flow_path``, or None to keep all of them. Results hold
+                the path as a compact ``FlowPath``; call its ``to_list()``
+                for a plain list.
+            seed: Seed for the random streams of runs, or None to seed only
+                runs whose store has a ``_flow_seed`` (see
+                ``src.utils.rng``)
+            parallel: Start nodes that declare their reads and writes
+                ahead of their turn when they do not depend on the nodes
+                before them (see ``src.flows.dataflow``)
+            debug: Check the keys nodes use against their declared reads
+                and writes
         """
         self.flow_definition = flow_definition
         self.name = name or self.__class__.__name__
+        self.checkpointer = checkpointer
+        self.hooks: tuple[FlowHook, ...] = tuple(hooks)
+        self.path_limit = path_limit
+        self.seed = seed
+        self.parallel = parallel
+        self.debug = debug
+        self._rng = None if seed is None else RandomStream(seed)
         self.logger = logging.getLogger(f"{__name__}.{self.name}")
         self._validate_flow()
+        self._compile()
+
+    def _compile(self) -> None:
+        """Compile the execution plan and the node instance providers."""
+        self._plan = compile_plan(self.flow_definition)
+        self._analysis = analyze_plan(self._plan)
+        self._providers = tuple(
+            make_provider(node.config) if node.config is not None else None
+            for node in self._plan.nodes
+        )
+        self._runners = tuple(self._phase_runner(node) for node in self._plan.nodes)
+        # (hooks, runner) of each node, rebuilt when the hooks change
+        self._tracers: list[tuple[tuple[FlowHook, ...], PhaseRunner | None] | None] = [
+            None
+        ] * len(self._plan.nodes)
+        self._durations = StepDurations(len(self._plan.nodes))
+        self._path_names = tuple(node.node_id for node in self._plan.nodes)
+        self._path_lookup = {name: index for index, name in enumerate(self._path_names)}
+        self._waves = (
+            plan_waves(self._plan, _can_start_early) if self.parallel else None
+        )
+
+        cpu_bound = [
+            node.node_class for node in self._plan.nodes if _is_cpu_bound(node)
+        ]
+        if cpu_bound:
+            register_worker_modules({node_class.__module__ for node_class in cpu_bound})
+
+    def _phase_runner(self, node: CompiledNode) -> PhaseRunner | None:
+        """Pick the phase runner for a compiled node, if it needs one."""
+        runner = exec_in_process if _is_cpu_bound(node) else None
+        if getattr(node.node_class, "hedge", False) is True:
+            if _is_async_node(node.node_class):
+                return async_hedged_runner(runner)
+            return hedged_runner(runner)
+        return runner
+
+    def _traced_runner(
+        self,
+        node: CompiledNode,
+        hooks: tuple[FlowHook, ...],
+        *,
+        is_async: bool = False,
+    ) -> PhaseRunner | None:
+        """Get the phase runner reporting a node's phases to the hooks."""
+        cached = self._tracers[node.index]
+        if cached is None or cached[0] is not hooks:
+            tracer = async_phase_tracer if is_async else phase_tracer
+            runner = tracer(hooks, node.node_id, self._runners[node.index])
+            cached = self._tracers[node.index] = (hooks, runner)
+        return cached[1]
+
+    def __getstate__(self) -> dict[str, Any]:
+        """Pickle the definition only; plans and node pools are rebuilt."""
+        state = self.__dict__.copy()
+        state.pop("_plan", None)
+        state.pop("_analysis", None)
+        state.pop("_providers", None)
+        state.pop("_runners", None)
+        state.pop("_tracers", None)
+        state.pop("_durations", None)
+        state.pop("_async_nodes", None)
+        state.pop("_path_names", None)
+        state.pop("_path_lookup", None)
+        state.pop("_waves", None)
+        state.pop("_profiler", None)
+        state["hooks"] = ()  # Subscribers stay in the parent process
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        """Restore a pickled flow and recompile it."""
+        self.__dict__.update(state)
+        self._compile()
+
+    def add_hook(self, hook: FlowHook) -> None:
+        """Subscribe a hook to the events of future runs."""
+        self.hooks = (*self.hooks, hook)
+
+    def remove_hook(self, hook: FlowHook) -> None:
+        """Unsubscribe a hook."""
+        self.hooks = tuple(h for h in self.hooks if h is not hook)
+
+    @property
+    def profiler(self) -> FlowProfiler:
+        """The flow's latency profiler, disabled until ``enable()`` is called."""
+        profiler = self.__dict__.get("_profiler")
+        if profiler is None:
+            profiler = self.__dict__.setdefault("_profiler", FlowProfiler(self))
+        return profiler
 
     def _validate_flow(self) -> None:
         """Validate the flow definition."""
@@ -45,94 +372,937 @@ class BaseFlow:
 
         for node_id, node_config in self.flow_definition.items():
             for action, target_id in node_config.transitions.items():
-                if target_id not in all_node_ids:
+                if isinstance(target_id, FanOut):
+                    validate_fanout(node_id, target_id, self.flow_definition)
+                elif target_id not in all_node_ids:
                     msg = (
                         f"Node '{node_id}' has transition '{action}' "
                         f"pointing to unknown node '{target_id}'"
                     )
                     raise ValueError(msg)
 
+            if node_config.scope not in NODE_SCOPES:
+                msg = f"Node '{node_id}' has unknown scope '{node_config.scope}'"
+                raise ValueError(msg)
+
+            if node_config.pool_size < 1:
+                msg = f"Node '{node_id}' must have a pool_size of at least 1"
+                raise ValueError(msg)
+
+            if not self.supports_async and _is_async_node(node_config.node_class):
+                msg = f"Node '{node_id}' is an async node; use AsyncBaseFlow to run it"
+                raise ValueError(msg)
+
+            node_class = node_config.node_class
+            if _is_async_node(node_class) and getattr(node_class, "cpu_bound", False):
+                msg = (
+                    f"Node '{node_id}' is an async node and cannot be cpu_bound; "
+                    "worker processes run plain exec methods"
+                )
+                raise ValueError(msg)
+
+            if subflow_definition(node_config.node_class) is not None:
+                self._validate_subflow(node_id, node_config.node_class)
+
+    def _validate_subflow(self, node_id: str, subflow: "BaseFlow") -> None:
+        """Check that a sub-flow can be inlined into this flow."""
+        if not self.supports_async and any(
+            _is_async_node(node.node_class) for node in subflow.plan.nodes
+        ):
+            msg = (
+                f"Sub-flow node '{node_id}' contains async nodes; "
+                "use AsyncBaseFlow to run it"
+            )
+            raise ValueError(msg)
+
+    @property
+    def plan(self) -> ExecutionPlan:
+        """The compiled execution plan for this flow.
+
+        The plan is compiled once in ``__init__``; changes made to
+        ``flow_definition`` afterwards are not picked up.
+        """
+        return self._plan
+
+    @property
+    def analysis(self) -> FlowAnalysis:
+        """Static analysis of the flow graph (see ``src.flows.analysis``)."""
+        return self._analysis
+
     def run(
-        self, initial_store: dict[str, Any] | None = None, max_steps: int = 100
-    ) -> dict[str, Any]:
+        self,
+        initial_store: MutableMapping[str, Any] | None = None,
+        max_steps: int = 100,
+        *,
+        run_id: str | None = None,
+        timeout: float | None = None,
+        record: bool = False,
+    ) -> MutableMapping[str, Any]:
         """Execute the flow starting from the 'start' node.
 
         Args:
             initial_store: Initial state dictionary
             max_steps: Maximum steps to prevent infinite loops
+            run_id: ID to checkpoint the run under (generated if omitted).
+                Requires a checkpointer; the ID is stored in
+                ``_flow_run_id``.
+            timeout: Seconds the run may take, or None to keep any
+                ``_flow_deadline`` already in the store (see
+                ``src.flows.timeouts``)
+            record: Record the keys every step reads and writes in
+                ``_flow_trace``, so the run can be passed to ``rerun``
 
         Returns:
             Final store state after flow completion
         """
-        store = initial_store or {}
+        if record:
+            incremental = IncrementalRun(None, ())
+            return self._run_incremental(
+                initial_store, incremental, max_steps, run_id, timeout
+            )
+
+        store = self._start_run(initial_store, timeout)
+        ctx = RunContext(
+            max_steps,
+            checkpoint=self._open_checkpoint(store, run_id),
+            hooks=self.hooks,
+        )
+        try:
+            return self._drive(self._walk(store, ctx), ctx)
+        finally:
+            ctx.close()
+
+    def rerun(
+        self,
+        previous_result: MutableMapping[str, Any],
+        changed_keys: Mapping[str, Any],
+        max_steps: int = 100,
+        *,
+        run_id: str | None = None,
+        timeout: float | None = None,
+    ) -> MutableMapping[str, Any]:
+        """Run a recorded run again with changed inputs, reusing its steps.
+
+        Steps whose nodes read none of the changed keys are replayed from
+        the recording instead of running (see ``src.flows.incremental``).
+        The result is recorded too, so reruns can be chained.
+
+        Args:
+            previous_result: Final store of a run started with
+                ``record=True``
+            changed_keys: New values of the input keys that changed
+            max_steps: Maximum steps to prevent infinite loops
+            run_id: ID to checkpoint the run under, as for ``run``
+            timeout: Seconds the run may take, as for ``run``
+
+        Returns:
+            Final store state after flow completion
+
+        Raises:
+            ValueError: If the previous run was not recorded
+        """
+        return self._run_incremental(
+            *start_rerun(previous_result, changed_keys), max_steps, run_id, timeout
+        )
+
+    def _run_incremental(
+        self,
+        initial_store: MutableMapping[str, Any] | None,
+        incremental: IncrementalRun,
+        max_steps: int,
+        run_id: str | None,
+        timeout: float | None,
+    ) -> MutableMapping[str, Any]:
+        """Run a recorded run or a rerun and attach its trace."""
+        store, initial, ctx = self._start_incremental(
+            initial_store, max_steps, run_id, timeout
+        )
+        try:
+            store = self._drive_incremental(self._walk(store, ctx), ctx, incremental)
+        finally:
+            ctx.close()
+        store[TRACE_KEY] = RunTrace(initial, incremental.steps, incremental.replayed)
+        return store
+
+    def _start_incremental(
+        self,
+        initial_store: MutableMapping[str, Any] | None,
+        max_steps: int,
+        run_id: str | None,
+        timeout: float | None,
+    ) -> tuple[MutableMapping[str, Any], Any, RunContext]:
+        """Prepare a recorded run, returning its store, inputs and context."""
+        store = {} if initial_store is None else initial_store
+        store.pop(TRACE_KEY, None)
+        initial = fork_store(store)
+        store = self._start_run(store, timeout)
+        ctx = RunContext(
+            max_steps,
+            checkpoint=self._open_checkpoint(store, run_id),
+            hooks=self.hooks,
+        )
+        return store, initial, ctx
+
+    def resume(
+        self, run_id: str, max_steps: int = 100, *, timeout: float | None = None
+    ) -> MutableMapping[str, Any]:
+        """Continue a checkpointed run after its last completed step.
+
+        Nodes that completed before the run was interrupted are not run
+        again. Resuming a run that already finished returns its final store.
+
+        Args:
+            run_id: ID of the run to continue
+            max_steps: Maximum steps, including the steps already taken
+            timeout: Seconds the resumed run may take; the deadline of the
+                original run does not carry over
+
+        Returns:
+            Final store state after flow completion
+        """
+        state = self._load_checkpoint(run_id, timeout)
+        if state.finished:
+            return state.store
+
+        ctx = RunContext(
+            max_steps, checkpoint=self.checkpointer.open(run_id), hooks=self.hooks
+        )
+        ctx.checkpoint.track(state.store)
+        try:
+            return self._drive(self._resume_walk(state, ctx), ctx)
+        finally:
+            ctx.close()
+
+    def run_iter(
+        self,
+        initial_store: MutableMapping[str, Any] | None = None,
+        max_steps: int = 100,
+        *,
+        run_id: str | None = None,
+        timeout: float | None = None,
+    ) -> Generator[StepEvent, None, None]:
+        """Execute the flow, yielding a ``StepEvent`` after every step.
+
+        Takes the same arguments as ``run``. The run advances only while
+        the caller iterates; the last event carries the final store. Nodes
+        run on a ``ReadTracker`` proxy of the store that records the keys
+        they write, as with ``record=True``.
+
+        Yields:
+            One event per step, then the final event
+        """
+        store = self._start_run(initial_store, timeout)
+        ctx = RunContext(
+            max_steps,
+            checkpoint=self._open_checkpoint(store, run_id),
+            hooks=self.hooks,
+        )
+        try:
+            yield from self._drive_iter(self._walk(store, ctx), ctx)
+        finally:
+            ctx.close()
+
+    def _open_checkpoint(
+        self, store: MutableMapping[str, Any], run_id: str | None
+    ) -> CheckpointWriter | None:
+        """Start the checkpoint log of a new run, if checkpointing is enabled."""
+        if self.checkpointer is None:
+            if run_id is not None:
+                msg = f"Flow {self.name} has no checkpointer to record runs"
+                raise ValueError(msg)
+            return None
+
+        run_id = run_id or uuid.uuid4().hex
+        store["_flow_run_id"] = run_id
+        writer = self.checkpointer.open(run_id)
+        writer.start(self.name, run_id, store)
+        return writer
+
+    def _load_checkpoint(
+        self, run_id: str, timeout: float | None = None
+    ) -> CheckpointState:
+        """Rebuild the state of a checkpointed run of this flow."""
+        if self.checkpointer is None:
+            msg = f"Flow {self.name} has no checkpointer to resume runs from"
+            raise ValueError(msg)
+
+        state = self.checkpointer.load(run_id)
+        if state.flow_name != self.name:
+            msg = f"Run {run_id} belongs to flow {state.flow_name}, not {self.name}"
+            raise ValueError(msg)
+        path = self._new_path()
+        path.extend(state.path)
+        state.store["_flow_path"] = path
+        if not state.finished:
+            state.store.pop(DEADLINE_KEY, None)
+            set_deadline(state.store, timeout)
+        return state
+
+    def _resume_walk(self, state: CheckpointState, ctx: RunContext) -> Generator:
+        """Create a plan walker that continues a checkpointed run."""
+        if state.next_node is None:
+            index = STOP
+        elif state.next_node == "end":
+            index = END
+        else:
+            indices = {node.node_id: node.index for node in self._plan.nodes}
+            if state.next_node not in indices:
+                msg = (
+                    f"Cannot resume run {state.run_id}: "
+                    f"unknown node '{state.next_node}'"
+                )
+                raise ValueError(msg)
+            index = indices[state.next_node]
+        return self._walk(state.store, ctx, index, len(state.path))
+
+    def _drive(self, walker: Generator, ctx: RunContext) -> Any:
+        """Execute the nodes requested by a plan walker until it finishes."""
+        if self._waves is not None:
+            return self._drive_parallel(walker, ctx)
+        ctx.inline = True
+        try:
+            node, store = next(walker)
+            while True:
+                try:
+                    store = self._run_node(node, store, ctx)
+                except Exception as e:
+                    node, store = walker.throw(e)
+                else:
+                    node, store = walker.send(store)
+        except StopIteration as done:
+            return done.value
+
+    def _drive_parallel(self, walker: Generator, ctx: RunContext) -> Any:
+        """Like ``_drive``, but starting independent nodes ahead of their turn."""
+        speculation = Speculation(self._waves)
+        nodes = self._plan.nodes
+        pool = get_thread_pool()
+
+        def start(index: int, fork: Any) -> Any:
+            return pool.submit(self._run_node, nodes[index], fork, ctx)
+
+        try:
+            node, store = next(walker)
+            while True:
+                started = speculation.take(node.index, store)
+                if started is not None and self._finish_early(started, store):
+                    speculation.start(node.index, store, start)
+                    node, store = walker.send(store)
+                    continue
+                speculation.start(node.index, store, start)
+                try:
+                    store = self._run_node(node, store, ctx)
+                except Exception as e:
+                    node, store = walker.throw(e)
+                else:
+                    node, store = walker.send(store)
+        except StopIteration as done:
+            return done.value
+        finally:
+            speculation.discard()
+
+    @staticmethod
+    def _finish_early(started: tuple[Any, ReadTracker], store: Any) -> bool:
+        """Wait for a node started early and apply its writes.
+
+        Returns:
+            False if the node has to run now instead
+        """
+        future, tracker = started
+        if future.cancel():
+            return False  # Still queued; running it here is no slower
+        try:
+            result = future.result()
+        except Exception:
+            return False  # Run it again so the error is raised at its turn
+        return commit(store, tracker, result)
+
+    def _drive_incremental(
+        self, walker: Generator, ctx: RunContext, incremental: IncrementalRun
+    ) -> Any:
+        """Like ``_drive``, but replaying steps whose inputs did not change."""
+        try:
+            node, store = next(walker)
+            while True:
+                if incremental.replay(node.node_id, store):
+                    node, store = walker.send(store)
+                    continue
+                tracker = ReadTracker(store)
+                try:
+                    result = self._run_node(node, tracker, ctx)
+                except Exception as e:
+                    node, store = walker.throw(e)
+                else:
+                    store = incremental.record(node.node_id, tracker, result)
+                    node, store = walker.send(store)
+        except StopIteration as done:
+            return done.value
+
+    def _drive_iter(
+        self, walker: Generator, ctx: RunContext
+    ) -> Generator[StepEvent, None, None]:
+        """Execute the nodes requested by a plan walker, yielding step events."""
+        started = time.monotonic()
+        try:
+            node, store = next(walker)
+        except StopIteration as done:
+            yield _final_event(done.value, started)
+            return
+
+        while True:
+            tracker = ReadTracker(store)
+            implicit = tuple(store.get(key, _MISSING) for key in IMPLICIT_KEYS)
+            step_started = time.monotonic()
+            try:
+                result = self._run_node(node, tracker, ctx)
+            except Exception as e:
+                advance = partial(walker.throw, e)
+            else:
+                advance = partial(walker.send, store if result is tracker else result)
+            elapsed = time.monotonic() - step_started
+
+            try:
+                next_node, store = advance()
+            except StopIteration as done:
+                yield _step_event(node, tracker, implicit, done.value, elapsed)
+                yield _final_event(done.value, started)
+                return
+            yield _step_event(node, tracker, implicit, store, elapsed)
+            node = next_node
+
+    def run_many(
+        self,
+        stores: Iterable[MutableMapping[str, Any] | None],
+        *,
+        executor: str | Executor | None = None,
+        chunk_size: int = 64,
+        max_steps: int = 100,
+        stream: bool = False,
+    ) -> Any:
+        """Execute the flow over many input stores.
+
+        Stores are split into chunks. Within a chunk the runs advance in
+        lockstep: all runs waiting at the same node are executed together,
+        sharing one instance if the node's scope is 'flow' or 'pooled', and
+        per-step logging is skipped. Every run otherwise gets its own
+        instances, as with ``run``, and is checked in debug mode and
+        checkpointed under a new run ID like a ``run`` call.
+
+        Args:
+            stores: Initial state dictionaries, one per run
+            executor: Where chunks run - None (the calling thread),
+                'thread', 'process', or an existing ``Executor``. With
+                'process', the flow, its node classes and the stores must
+                be picklable, and the results are copies of the inputs.
+            chunk_size: Number of stores per chunk
+            max_steps: Maximum steps per run
+            stream: Return an iterator of ``(index, store)`` pairs in
+                completion order instead of a list in input order
+
+        Returns:
+            List of final stores in input order, or an iterator if
+            ``stream`` is True
+        """
+        if chunk_size < 1:
+            msg = "chunk_size must be at least 1"
+            raise ValueError(msg)
+        if isinstance(executor, str) and executor not in ("thread", "process"):
+            msg = f"Unknown executor: {executor}"
+            raise ValueError(msg)
+
+        stores = list(stores)
+        if self._rng is not None:
+            # Seed in input order, so results do not depend on the executor
+            stores = [assign_seed(store, self._rng) for store in stores]
+        chunks = [
+            (start, stores[start : start + chunk_size])
+            for start in range(0, len(stores), chunk_size)
+        ]
+        self.logger.info(
+            "Running flow %s over %d stores in %d chunks",
+            self.name,
+            len(stores),
+            len(chunks),
+        )
+
+        results = self._run_chunks(chunks, executor, max_steps)
+        if stream:
+            return results
+
+        ordered: list[Any] = [None] * len(stores)
+        for index, store in results:
+            ordered[index] = store
+        return ordered
+
+    def _run_chunks(
+        self,
+        chunks: list[tuple[int, list[Any]]],
+        executor: str | Executor | None,
+        max_steps: int,
+    ) -> Iterator[tuple[int, MutableMapping[str, Any]]]:
+        """Run chunks on an executor, yielding results as chunks complete."""
+        if executor is None:
+            for start, chunk in chunks:
+                yield from enumerate(self._run_chunk(chunk, max_steps), start)
+            return
+
+        owned = None
+        if executor == "thread":
+            executor = owned = ThreadPoolExecutor(thread_name_prefix="pocketflow")
+        elif executor == "process":
+            executor = owned = ProcessPoolExecutor()
+
+        try:
+            futures = {
+                executor.submit(self._run_chunk, chunk, max_steps): start
+                for start, chunk in chunks
+            }
+            for future in as_completed(futures):
+                yield from enumerate(future.result(), futures[future])
+        finally:
+            if owned is not None:
+                owned.shutdown(cancel_futures=True)
+
+    def _run_chunk(
+        self, stores: list[MutableMapping[str, Any] | None], max_steps: int
+    ) -> list[MutableMapping[str, Any]]:
+        """Run a chunk of stores in lockstep, grouping runs by node."""
+        results: list[Any] = [None] * len(stores)
+        contexts: list[RunContext] = []
+        waiting: dict[int, list[tuple[int, Generator, Any]]] = {}
+
+        def advance(slot: int, walker: Generator, step: Any) -> None:
+            """Queue the walker's next node, or store its final result."""
+            try:
+                node, store = step()
+            except StopIteration as done:
+                results[slot] = done.value
+            else:
+                waiting.setdefault(node.index, []).append((slot, walker, store))
+
+        try:
+            for slot, initial_store in enumerate(stores):
+                store = self._start_run(initial_store)
+                ctx = RunContext(
+                    max_steps,
+                    verbose=False,
+                    checkpoint=self._open_checkpoint(store, None),
+                    hooks=self.hooks,
+                )
+                contexts.append(ctx)
+                walker = self._walk(store, ctx)
+                advance(slot, walker, walker.__next__)
+
+            while waiting:
+                index = min(waiting)
+                group = waiting.pop(index)
+                node = self._plan.nodes[index]
+                provider = self._providers[index]
+                runner = self._runners[index]
+                if self.hooks:
+                    runner = self._traced_runner(node, self.hooks)
+                # Only scopes that share instances between runs share one
+                # here; time-limited and debugged steps go through _run_node
+                shared = (
+                    isinstance(provider, FlowScopeProvider | PooledProvider)
+                    and not self.debug
+                    and getattr(node.node_class, "node_timeout", None) is None
+                    and not any(DEADLINE_KEY in store for _, _, store in group)
+                )
+                instance = provider.acquire({}) if shared else None
+
+                try:
+                    for slot, walker, store in group:
+                        try:
+                            if instance is None:
+                                result = self._run_node(node, store, contexts[slot])
+                            elif runner is None:
+                                result = instance.run(store)
+                            else:
+                                result = instance.run(store, runner)
+                        except Exception as e:
+                            advance(slot, walker, lambda w=walker, e=e: w.throw(e))
+                        else:
+                            advance(slot, walker, lambda w=walker, r=result: w.send(r))
+                finally:
+                    if instance is not None:
+                        provider.release(instance)
+        finally:
+            for ctx in contexts:
+                ctx.close()
+
+        return results
+
+    def _start_run(
+        self,
+        initial_store: MutableMapping[str, Any] | None,
+        timeout: float | None = None,
+    ) -> MutableMapping[str, Any]:
+        """Prepare the store for a new run."""
+        store = {} if initial_store is None else initial_store
         store["_flow_name"] = self.name
-        store["_flow_path"] = []
+        store["_flow_path"] = self._new_path()
+        set_deadline(store, timeout)
+        seed_store(store, self._rng)
+        return store
 
-        current_node_id = "start"
-        steps = 0
+    def _new_path(self) -> FlowPath:
+        """Create the compact path recorder for a run."""
+        return FlowPath(self._path_names, self._path_lookup, limit=self.path_limit)
 
-        self.logger.info(f"Starting flow: {self.name}")
+    def _walk(
+        self,
+        store: MutableMapping[str, Any],
+        ctx: RunContext,
+        index: int = 0,
+        steps: int = 0,
+    ) -> Generator:
+        """Walk the execution plan, independent of how nodes are executed.
 
-        while current_node_id != "end" and steps < max_steps:
-            steps += 1
+        Yields ``(node, store)`` for every step. The driver executes the
+        node and sends back the resulting store, or throws the exception
+        raised while executing it. Returns the final store.
 
-            # Record the path
-            store["_flow_path"].append(current_node_id)
+        ``index`` and ``steps`` are the node to start at and the steps
+        already taken, for resumed runs.
+        """
+        plan = self._plan
+        nodes = plan.nodes
+        action_index = plan.action_index
+        max_steps = ctx.max_steps
+        # Checked once per run: with INFO off, the step messages cost
+        # nothing, not even building their arguments
+        verbose = ctx.verbose and self.logger.isEnabledFor(logging.INFO)
+        checkpoint = ctx.checkpoint
+        hooks = ctx.hooks
+        path = store["_flow_path"]
+        record = path.append
+        deadline = store.get(DEADLINE_KEY)
+        # Only runs started on a copy-on-write store record layers; checked
+        # once per run, as an ABC instance check costs more than a step
+        cow = isinstance(store, CowStore)
+        # Without hooks, debugging or a deadline, direct nodes need nothing
+        # from the driver: run them here and save the round trip
+        inline = ctx.inline and not hooks and not self.debug and deadline is None
 
-            # Get the node configuration
-            if current_node_id not in self.flow_definition:
-                self.logger.error(f"Unknown node: {current_node_id}")
-                store["action"] = "error"
-                store["error"] = f"Unknown node: {current_node_id}"
+        if verbose:
+            if steps:
+                self.logger.info("Resuming flow: %s (steps: %d)", self.name, steps)
+            else:
+                self.logger.info("Starting flow: %s", self.name)
+
+        if hooks:
+            run_id = store.get("_flow_run_id") or uuid.uuid4().hex
+            store["_flow_run_id"] = run_id
+            emit(hooks, "on_flow_start", run_id, self.name, store)
+
+        while index >= 0 and steps < max_steps:
+            if deadline is not None and time.time() >= deadline:
+                self._stop_at_deadline(store, hooks)
+                index = STOP
                 break
 
-            node_config = self.flow_definition[current_node_id]
+            node = nodes[index]
+            if hooks:
+                emit(hooks, "on_node_start", run_id, node.node_id, store)
+                started = time.monotonic()
+
+            if node.fanout is not None:
+                # Branch steps are counted once the branches have finished
+                try:
+                    store = yield node, store
+                except Exception as e:
+                    self.logger.error("Error in fan-out %s: %s", node.node_id, e)
+                    store["action"] = "error"
+                    store["error"] = str(e)
+                    index = STOP
+                    if hooks:
+                        emit(hooks, "on_error", run_id, node.node_id, str(e))
+                    break
+                branch_path = store["_join"]["path"]
+                path.extend(branch_path)
+                steps += len(branch_path)
+                index = node.fanout.join
+                if checkpoint is not None:
+                    checkpoint.step(branch_path, plan.target_name(index), store)
+                if hooks:
+                    wall = time.monotonic() - started
+                    emit(hooks, "on_node_end", run_id, node.node_id, store, wall)
+                continue
+
+            steps += 1
+
+            # Record the path
+            record(node.node_id)
 
-            # Create and run the node
             try:
-                node = node_config.node_class()
-                self.logger.info(f"Executing node: {current_node_id}")
-                store = node.run(store)
+                if inline and node.direct:
+                    if verbose:
+                        self.logger.info("Executing node: %s", node.node_id)
+                    store = node.config.node_class().run(store)
+                else:
+                    store = yield node, store
             except Exception as e:
-                self.logger.error(f"Error in node {current_node_id}: {e!s}")
+                self.logger.error("Error in node %s: %s", node.node_id, e)
                 store["action"] = "error"
                 store["error"] = str(e)
-                store["error_node"] = current_node_id
+                store["error_node"] = node.node_id
+                index = STOP
+                if checkpoint is not None:
+                    checkpoint.step([node.node_id], None, store)
+                if hooks:
+                    emit(hooks, "on_error", run_id, node.node_id, str(e))
                 break
 
+            # Record the node's changes as one layer of a copy-on-write store
+            if cow and isinstance(store, CowStore):
+                store.commit(node.node_id)
+
             # Determine the next node based on action
             action = store.get("action", "default")
+            index = node.targets[action_index.get(action, -1)]
+
+            if checkpoint is not None:
+                next_node = None if index == STOP else plan.target_name(index)
+                checkpoint.step([node.node_id], next_node, store)
+
+            if hooks:
+                self._emit_step(
+                    hooks,
+                    run_id,
+                    node,
+                    store,
+                    action=action,
+                    index=index,
+                    started=started,
+                )
 
-            if action == "error" and "error" not in node_config.transitions:
+            if index == STOP:
                 # If there's an error but no error transition, stop
-                self.logger.error(f"Error in node {current_node_id}, stopping flow")
+                self.logger.error("Error in node %s, stopping flow", node.node_id)
                 break
 
-            next_node_id = node_config.transitions.get(
-                action, node_config.transitions.get("default", "end")
-            )
-
-            self.logger.info(
-                f"Transition: {current_node_id} --[{action}]--> {next_node_id}"
-            )
+            if (
+                index == END
+                and action == TIMEOUT_ACTION
+                and deadline is not None
+                and time.time() >= deadline
+            ):
+                # The last step was cut off by the deadline, not completed
+                self._stop_at_deadline(store, hooks)
+                index = STOP
+                break
 
-            current_node_id = next_node_id
+            if verbose:
+                self.logger.info(
+                    "Transition: %s --[%s]--> %s",
+                    node.node_id,
+                    action,
+                    plan.target_name(index),
+                )
 
         if steps >= max_steps:
-            self.logger.error(f"Flow exceeded maximum steps ({max_steps})")
+            self.logger.error("Flow exceeded maximum steps (%d)", max_steps)
             store["action"] = "error"
             store["error"] = f"Flow exceeded maximum steps ({max_steps})"
+            if hooks:
+                emit(hooks, "on_error", run_id, None, store["error"])
 
+        store["_flow_path"] = path
         store["_flow_steps"] = steps
-        store["_flow_completed"] = current_node_id == "end"
+        store["_flow_completed"] = index == END
 
-        self.logger.info(
-            f"Flow completed: {self.name} "
-            f"(steps: {steps}, completed: {store['_flow_completed']})"
-        )
+        if checkpoint is not None:
+            checkpoint.finish(store)
+
+        if hooks:
+            emit(hooks, "on_flow_end", run_id, self.name, store)
+
+        if verbose:
+            self.logger.info(
+                "Flow completed: %s (steps: %d, completed: %s)",
+                self.name,
+                steps,
+                store["_flow_completed"],
+            )
 
         return store
 
+    def _stop_at_deadline(
+        self, store: MutableMapping[str, Any], hooks: tuple[FlowHook, ...]
+    ) -> None:
+        """Record that a run stopped because its deadline passed."""
+        self.logger.error("Flow %s exceeded its deadline", self.name)
+        store["action"] = TIMEOUT_ACTION
+        store["error"] = "Flow exceeded its deadline"
+        if hooks:
+            emit(hooks, "on_error", store["_flow_run_id"], None, store["error"])
+
+    def _walk_branch(self, start: int, join: int, store: Any, ctx: RunContext):
+        """Walk one fan-out branch until it reaches the join node.
+
+        Works like ``_walk`` but without flow bookkeeping; returns a
+        ``BranchResult``.
+        """
+        nodes = self._plan.nodes
+        action_index = self._plan.action_index
+        result = BranchResult(store)
+        index = start
+
+        hooks = ctx.hooks
+        run_id = store.get("_flow_run_id")
+
+        while index >= 0 and index != join and len(result.path) < ctx.max_steps:
+            node = nodes[index]
+            if hooks:
+                emit(hooks, "on_node_start", run_id, node.node_id, store)
+                started = time.monotonic()
+
+            if node.fanout is not None:
+                store = yield node, store
+                result.path.extend(store["_join"]["path"])
+                index = node.fanout.join
+                if hooks:
+                    wall = time.monotonic() - started
+                    emit(hooks, "on_node_end", run_id, node.node_id, store, wall)
+                continue
+
+            result.path.append(node.node_id)
+            try:
+                store = yield node, store
+            except Exception as e:
+                store["action"] = "error"
+                store["error"] = str(e)
+                store["error_node"] = node.node_id
+                index = STOP
+                if hooks:
+                    emit(hooks, "on_error", run_id, node.node_id, str(e))
+                break
+
+            if isinstance(store, CowStore):
+                store.commit(node.node_id)
+
+            action = store.get("action", "default")
+            index = node.targets[action_index.get(action, -1)]
+
+            if hooks:
+                self._emit_step(
+                    hooks,
+                    run_id,
+                    node,
+                    store,
+                    action=action,
+                    index=index,
+                    started=started,
+                )
+
+        result.store = store
+        result.ok = index in (join, END)
+        return result
+
+    def _emit_step(
+        self,
+        hooks: tuple[FlowHook, ...],
+        run_id: str,
+        node: CompiledNode,
+        store: Any,
+        *,
+        action: str,
+        index: int,
+        started: float,
+    ) -> None:
+        """Deliver the events that follow a completed node step."""
+        wall = time.monotonic() - started
+        emit(hooks, "on_node_end", run_id, node.node_id, store, wall)
+        if action in ("error", TIMEOUT_ACTION):
+            error = store.get("error", "unknown error")
+            emit(hooks, "on_error", run_id, node.node_id, error)
+        if index != STOP:
+            target = self._plan.target_name(index)
+            emit(hooks, "on_transition", run_id, node.node_id, action, target)
+
+    def _run_node(
+        self, node: CompiledNode, store: MutableMapping[str, Any], ctx: RunContext
+    ) -> MutableMapping[str, Any]:
+        """Run a node, or the branches of a fan-out."""
+        if node.fanout is not None:
+            return self._run_fanout(node.fanout, store, ctx)
+        if self.debug:
+            tracker = ReadTracker(store)
+            result = self._run_instance(node, tracker, ctx)
+            check_effects(node, tracker)
+            return store if result is tracker else result
+        return self._run_instance(node, store, ctx)
+
+    def _run_instance(
+        self, node: CompiledNode, store: MutableMapping[str, Any], ctx: RunContext
+    ) -> MutableMapping[str, Any]:
+        """Obtain an instance of a node and run it on the store."""
+        provider = self._providers[node.index]
+        instance = provider.acquire(ctx.instances)
+        try:
+            if ctx.verbose:
+                self.logger.info("Executing node: %s", node.node_id)
+            runner = self._runners[node.index]
+            if ctx.hooks:
+                runner = self._traced_runner(node, ctx.hooks)
+            timeout = self._durations.limit(node.index, instance, store)
+            if timeout is None and DEADLINE_KEY not in store:
+                if runner is None:
+                    return instance.run(store)
+                return instance.run(store, runner)
+
+            # Under a deadline, time the step to know when it needs a limit
+            started = time.monotonic()
+            if timeout is None:
+                store = instance.run(store, runner)
+            else:
+                store, completed = run_limited(
+                    lambda view: instance.run(view, runner), store, timeout
+                )
+                if not completed:
+                    provider.discard(instance, ctx.instances)
+                    instance = None
+                    return mark_timeout(store, node.node_id, timeout)
+            self._durations.record(node.index, time.monotonic() - started)
+            return store
+        finally:
+            if instance is not None:
+                provider.release(instance)
+
+    def _run_fanout(
+        self, fanout: CompiledFanOut, store: MutableMapping[str, Any], ctx: RunContext
+    ) -> MutableMapping[str, Any]:
+        """Run fan-out branches on threads and merge them into the store."""
+        state = JoinState(fanout)
+        branch_ids = [self._plan.nodes[index].node_id for index in fanout.branches]
+
+        # Branches run on daemon threads of their own: they cannot deadlock
+        # with nested fan-outs, and a branch abandoned after the join is
+        # satisfied or timed out cannot keep the interpreter from exiting
+        futures = {
+            run_in_daemon_thread(
+                partial(self._drive, ctx=RunContext(ctx.max_steps, hooks=ctx.hooks)),
+                self._walk_branch(
+                    start, fanout.join, split_stream(fork_store(store)), ctx
+                ),
+            ): branch
+            for branch, start in enumerate(fanout.branches)
+        }
+        pending = set(futures)
+        while pending and not state.done:
+            done, pending = wait(
+                pending, timeout=state.remaining_time(), return_when=FIRST_COMPLETED
+            )
+            if not done:
+                break  # Timed out
+            for future in done:
+                state.record(futures[future], future.result())
+        # Branches still running are abandoned; their results are ignored
+
+        merge_branches(store, state, branch_ids)
+        return store
+
     def visualize(self) -> str:
         """Generate a simple text visualization of the flow.
 
@@ -142,7 +1312,11 @@ class BaseFlow:
         lines = [f"Flow: {self.name}", "=" * (len(self.name) + 6), ""]
 
         for node_id, node_config in self.flow_definition.items():
-            lines.append(f"{node_id} ({node_config.node_class.__name__}):")
+            node_class = node_config.node_class
+            if subflow_definition(node_class) is not None:
+                lines.append(f"{node_id} (sub-flow {node_class.name}):")
+            else:
+                lines.append(f"{node_id} ({node_class.__name__}):")
 
             for action, target in node_config.transitions.items():
                 lines.append(f"  --[{action}]--> {target}")
@@ -150,3 +1324,437 @@ class BaseFlow:
             lines.append("")
 
         return "\n".join(lines)
+
+
+class AsyncBaseFlow(BaseFlow):
+    """Flow whose ``run`` is awaitable.
+
+    ``AsyncBaseNode`` nodes are awaited directly on the event loop. Sync
+    ``BaseNode`` nodes are offloaded to a bounded thread pool, so they never
+    block the loop; many flows can be in flight in one process while only
+    the sync nodes among them occupy threads.
+    """
+
+    supports_async = True
+
+    def __init__(
+        self,
+        flow_definition: dict[str, FlowNode],
+        name: str | None = None,
+        *,
+        executor: Executor | None = None,
+        checkpointer: FileCheckpointer | None = None,
+        hooks: Iterable[FlowHook] = (),
+        path_limit: int | None = None,
+        seed: int | None = None,
+        parallel: bool = False,
+        debug: bool = False,
+    ):
+        """Initialize the flow with its definition.
+
+        Args:
+            flow_definition: Dictionary mapping node IDs to FlowNode configs
+            name: Optional name for the flow
+            executor: Executor for sync nodes (defaults to the shared,
+                bounded thread pool)
+            checkpointer: Optional ``FileCheckpointer`` that records every
+                step of ``run`` so it can be continued with ``resume``
+            hooks: Subscribers for flow events (see ``src.flows.hooks``)
+            path_limit: Keep only the last ``path_limit`` steps in
+                ``_flow_path``, or None to keep all of them. Results hold
+                the path as a compact ``FlowPath``; call its ``to_list()``
+                for a plain list.
+            seed: Seed for the random streams of runs (see ``src.utils.rng``)
+            parallel: Start independent nodes ahead of their turn as tasks
+                (see ``src.flows.dataflow``)
+            debug: Check the keys nodes use against their declared reads
+                and writes
+        """
+        self.executor = executor
+        super().__init__(
+            flow_definition,
+            name=name,
+            checkpointer=checkpointer,
+            hooks=hooks,
+            path_limit=path_limit,
+            seed=seed,
+            parallel=parallel,
+            debug=debug,
+        )
+
+    def _compile(self) -> None:
+        """Compile the plan and note which nodes are awaitable."""
+        super()._compile()
+        self._async_nodes = tuple(
+            _is_async_node(node.node_class) for node in self._plan.nodes
+        )
+
+    async def run(  # type: ignore[override]
+        self,
+        initial_store: MutableMapping[str, Any] | None = None,
+        max_steps: int = 100,
+        *,
+        run_id: str | None = None,
+        timeout: float | None = None,
+        record: bool = False,
+    ) -> MutableMapping[str, Any]:
+        """Execute the flow starting from the 'start' node.
+
+        Args:
+            initial_store: Initial state dictionary
+            max_steps: Maximum steps to prevent infinite loops
+            run_id: ID to checkpoint the run under (generated if omitted).
+                Requires a checkpointer; the ID is stored in
+                ``_flow_run_id``.
+            timeout: Seconds the run may take, or None to keep any
+                ``_flow_deadline`` already in the store (see
+                ``src.flows.timeouts``)
+            record: Record the run for ``rerun``
+
+        Returns:
+            Final store state after flow completion
+        """
+        if record:
+            incremental = IncrementalRun(None, ())
+            return await self._run_incremental_async(
+                initial_store, incremental, max_steps, run_id, timeout
+            )
+
+        store = self._start_run(initial_store, timeout)
+        ctx = RunContext(
+            max_steps,
+            checkpoint=self._open_checkpoint(store, run_id),
+            hooks=self.hooks,
+        )
+        try:
+            return await self._drive_async(self._walk(store, ctx), ctx)
+        finally:
+            ctx.close()
+
+    async def rerun(  # type: ignore[override]
+        self,
+        previous_result: MutableMapping[str, Any],
+        changed_keys: Mapping[str, Any],
+        max_steps: int = 100,
+        *,
+        run_id: str | None = None,
+        timeout: float | None = None,
+    ) -> MutableMapping[str, Any]:
+        """Run a recorded run again with changed inputs, see ``BaseFlow.rerun``."""
+        return await self._run_incremental_async(
+            *start_rerun(previous_result, changed_keys), max_steps, run_id, timeout
+        )
+
+    async def _run_incremental_async(
+        self,
+        initial_store: MutableMapping[str, Any] | None,
+        incremental: IncrementalRun,
+        max_steps: int,
+        run_id: str | None,
+        timeout: float | None,
+    ) -> MutableMapping[str, Any]:
+        """Awaitable form of ``_run_incremental``."""
+        store, initial, ctx = self._start_incremental(
+            initial_store, max_steps, run_id, timeout
+        )
+        try:
+            walker = self._walk(store, ctx)
+            store = await self._drive_incremental_async(walker, ctx, incremental)
+        finally:
+            ctx.close()
+        store[TRACE_KEY] = RunTrace(initial, incremental.steps, incremental.replayed)
+        return store
+
+    async def resume(  # type: ignore[override]
+        self, run_id: str, max_steps: int = 100, *, timeout: float | None = None
+    ) -> MutableMapping[str, Any]:
+        """Continue a checkpointed run after its last completed step.
+
+        Args:
+            run_id: ID of the run to continue
+            max_steps: Maximum steps, including the steps already taken
+            timeout: Seconds the resumed run may take
+
+        Returns:
+            Final store state after flow completion
+        """
+        state = self._load_checkpoint(run_id, timeout)
+        if state.finished:
+            return state.store
+
+        ctx = RunContext(
+            max_steps, checkpoint=self.checkpointer.open(run_id), hooks=self.hooks
+        )
+        ctx.checkpoint.track(state.store)
+        try:
+            return await self._drive_async(self._resume_walk(state, ctx), ctx)
+        finally:
+            ctx.close()
+
+    async def run_iter(  # type: ignore[override]
+        self,
+        initial_store: MutableMapping[str, Any] | None = None,
+        max_steps: int = 100,
+        *,
+        run_id: str | None = None,
+        timeout: float | None = None,
+    ) -> AsyncIterator[StepEvent]:
+        """Execute the flow, yielding a ``StepEvent`` after every step.
+
+        Use with ``async for``; see ``BaseFlow.run_iter``.
+
+        Yields:
+            One event per step, then the final event
+        """
+        store = self._start_run(initial_store, timeout)
+        ctx = RunContext(
+            max_steps,
+            checkpoint=self._open_checkpoint(store, run_id),
+            hooks=self.hooks,
+        )
+        try:
+            async for event in self._drive_iter_async(self._walk(store, ctx), ctx):
+                yield event
+        finally:
+            ctx.close()
+
+    async def run_many(  # type: ignore[override]
+        self,
+        stores: Iterable[MutableMapping[str, Any] | None],
+        *,
+        concurrency: int = 64,
+        max_steps: int = 100,
+    ) -> list[MutableMapping[str, Any]]:
+        """Execute the flow over many input stores concurrently.
+
+        Args:
+            stores: Initial state dictionaries, one per run
+            concurrency: Maximum number of runs in flight at once
+            max_steps: Maximum steps per run
+
+        Returns:
+            List of final stores in input order
+        """
+        if self._rng is not None:
+            stores = [assign_seed(store, self._rng) for store in stores]
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run_one(
+            store: MutableMapping[str, Any] | None,
+        ) -> MutableMapping[str, Any]:
+            async with semaphore:
+                return await self.run(store, max_steps)
+
+        return list(await asyncio.gather(*(run_one(store) for store in stores)))
+
+    async def _drive_async(self, walker: Generator, ctx: RunContext) -> Any:
+        """Execute the nodes requested by a plan walker until it finishes."""
+        if self._waves is not None:
+            return await self._drive_parallel_async(walker, ctx)
+        try:
+            node, store = next(walker)
+            while True:
+                try:
+                    store = await self._run_node_async(node, store, ctx)
+                except Exception as e:
+                    node, store = walker.throw(e)
+                else:
+                    node, store = walker.send(store)
+        except StopIteration as done:
+            return done.value
+
+    async def _drive_parallel_async(self, walker: Generator, ctx: RunContext) -> Any:
+        """Awaitable form of ``_drive_parallel``, starting nodes as tasks."""
+        speculation = Speculation(self._waves)
+        nodes = self._plan.nodes
+
+        def start(index: int, fork: Any) -> Any:
+            return asyncio.ensure_future(self._run_node_async(nodes[index], fork, ctx))
+
+        try:
+            node, store = next(walker)
+            while True:
+                started = speculation.take(node.index, store)
+                if started is not None:
+                    task, tracker = started
+                    try:
+                        result = await task
+                    except Exception:
+                        result = None  # Run it again so the error is raised now
+                    if commit(store, tracker, result):
+                        speculation.start(node.index, store, start)
+                        node, store = walker.send(store)
+                        continue
+                speculation.start(node.index, store, start)
+                try:
+                    store = await self._run_node_async(node, store, ctx)
+                except Exception as e:
+                    node, store = walker.throw(e)
+                else:
+                    node, store = walker.send(store)
+        except StopIteration as done:
+            return done.value
+        finally:
+            speculation.discard()
+
+    async def _drive_incremental_async(
+        self, walker: Generator, ctx: RunContext, incremental: IncrementalRun
+    ) -> Any:
+        """Awaitable form of ``_drive_incremental``."""
+        try:
+            node, store = next(walker)
+            while True:
+                if incremental.replay(node.node_id, store):
+                    node, store = walker.send(store)
+                    continue
+                tracker = ReadTracker(store)
+                try:
+                    result = await self._run_node_async(node, tracker, ctx)
+                except Exception as e:
+                    node, store = walker.throw(e)
+                else:
+                    store = incremental.record(node.node_id, tracker, result)
+                    node, store = walker.send(store)
+        except StopIteration as done:
+            return done.value
+
+    async def _drive_iter_async(
+        self, walker: Generator, ctx: RunContext
+    ) -> AsyncIterator[StepEvent]:
+        """Awaitable form of ``_drive_iter``."""
+        started = time.monotonic()
+        try:
+            node, store = next(walker)
+        except StopIteration as done:
+            yield _final_event(done.value, started)
+            return
+
+        while True:
+            tracker = ReadTracker(store)
+            implicit = tuple(store.get(key, _MISSING) for key in IMPLICIT_KEYS)
+            step_started = time.monotonic()
+            try:
+                result = await self._run_node_async(node, tracker, ctx)
+            except Exception as e:
+                advance = partial(walker.throw, e)
+            else:
+                advance = partial(walker.send, store if result is tracker else result)
+            elapsed = time.monotonic() - step_started
+
+            try:
+                next_node, store = advance()
+            except StopIteration as done:
+                yield _step_event(node, tracker, implicit, done.value, elapsed)
+                yield _final_event(done.value, started)
+                return
+            yield _step_event(node, tracker, implicit, store, elapsed)
+            node = next_node
+
+    async def _run_node_async(
+        self, node: CompiledNode, store: MutableMapping[str, Any], ctx: RunContext
+    ) -> MutableMapping[str, Any]:
+        """Run a node or fan-out without blocking the loop."""
+        if node.fanout is not None:
+            return await self._run_fanout_async(node.fanout, store, ctx)
+        if self.debug:
+            tracker = ReadTracker(store)
+            result = await self._run_instance_async(node, tracker, ctx)
+            check_effects(node, tracker)
+            return store if result is tracker else result
+        return await self._run_instance_async(node, store, ctx)
+
+    async def _run_instance_async(
+        self, node: CompiledNode, store: MutableMapping[str, Any], ctx: RunContext
+    ) -> MutableMapping[str, Any]:
+        """Obtain an instance of a node and run it without blocking the loop."""
+
+        loop = asyncio.get_running_loop()
+        executor = self.executor or get_thread_pool()
+        provider = self._providers[node.index]
+
+        if isinstance(provider, PooledProvider):
+            # Wait on the loop: a worker parked here could be the one the
+            # instance's current holder needs to finish and release it
+            instance = await provider.acquire_async(ctx.instances)
+        else:
+            instance = provider.acquire(ctx.instances)
+
+        try:
+            if ctx.verbose:
+                self.logger.info("Executing node: %s", node.node_id)
+            runner = self._runners[node.index]
+            is_async = self._async_nodes[node.index]
+            if ctx.hooks:
+                runner = self._traced_runner(node, ctx.hooks, is_async=is_async)
+            timeout = self._durations.limit(node.index, instance, store)
+            if timeout is None and DEADLINE_KEY not in store:
+                if is_async:
+                    if runner is None:
+                        return await instance.run(store)
+                    return await instance.run(store, runner)
+                if runner is None:
+                    return await loop.run_in_executor(executor, instance.run, store)
+                return await loop.run_in_executor(executor, instance.run, store, runner)
+
+            # Under a deadline, time the step to know when it needs a limit
+            started = time.monotonic()
+            if timeout is None:
+                if is_async:
+                    store = await instance.run(store, runner)
+                else:
+                    store = await loop.run_in_executor(
+                        executor, instance.run, store, runner
+                    )
+            else:
+                if is_async:
+                    store, completed = await run_limited_async(
+                        lambda view: instance.run(view, runner), store, timeout
+                    )
+                else:
+                    store, completed = await run_limited_in_thread(
+                        lambda view: instance.run(view, runner), store, timeout
+                    )
+                if not completed:
+                    provider.discard(instance, ctx.instances)
+                    instance = None
+                    return mark_timeout(store, node.node_id, timeout)
+            self._durations.record(node.index, time.monotonic() - started)
+            return store
+        finally:
+            if instance is not None:
+                provider.release(instance)
+
+    async def _run_fanout_async(
+        self, fanout: CompiledFanOut, store: MutableMapping[str, Any], ctx: RunContext
+    ) -> MutableMapping[str, Any]:
+        """Run fan-out branches as tasks and merge them into the store."""
+        state = JoinState(fanout)
+        branch_ids = [self._plan.nodes[index].node_id for index in fanout.branches]
+
+        tasks = {
+            asyncio.ensure_future(
+                self._drive_async(
+                    self._walk_branch(
+                        start, fanout.join, split_stream(fork_store(store)), ctx
+                    ),
+                    RunContext(ctx.max_steps, hooks=ctx.hooks),
+                )
+            ): branch
+            for branch, start in enumerate(fanout.branches)
+        }
+        pending = set(tasks)
+        try:
+            while pending and not state.done:
+                done, pending = await asyncio.wait(
+                    pending, timeout=state.remaining_time(), return_when=FIRST_COMPLETED
+                )
+                if not done:
+                    break  # Timed out
+                for task in done:
+                    state.record(tasks[task], task.result())
+        finally:
+            for task in pending:
+                task.cancel()
+
+        merge_branches(store, state, branch_ids)
+        return store
@@ -0,0 +1,261 @@
+"""Step-level checkpointing for PocketFlow flows.
+
+A flow with a checkpointer appends one record per step to a log file in the
+checkpoint directory (by default ``Config.data_dir / "checkpoints"``):
+
+- a start record with the full initial store
+- one step record per step with the node IDs visited, the next node, and
+  only the store keys that changed during the step
+- an end record with the final changes when the run finishes
+
+Records are pickled and appended in batches, optionally followed by
+``fsync``. ``BaseFlow.resume`` replays the log to rebuild the store and
+continues from the next node after the last recorded step.
+
+Changes are detected by identity (a key counts as changed when it holds a
+different object) plus a length check for sized values, which catches
+in-place appends. The writer keeps a reference to every value it recorded,
+so a new value can never reuse a recorded one's ``id``. Nodes that mutate
+values in place without changing their length should assign a new value
+instead.
+
+Checkpoint files are unpickled on resume, so the checkpoint directory must
+only contain files written by trusted processes.
+"""
+
+import os
+import pickle
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+# Store keys that are rebuilt on resume instead of being logged
+_UNLOGGED_KEYS = frozenset({"_flow_path"})
+
+_MISSING = object()
+
+
+@dataclass
+class CheckpointState:
+    """State of a run rebuilt from its checkpoint log.
+
+    Attributes:
+        run_id: ID of the run
+        flow_name: Name of the flow that wrote the log
+        store: Store after the last recorded step
+        path: Node IDs visited so far
+        next_node: Node ID to continue from, 'end' if the run ended
+            normally, or None if it stopped on an error
+        finished: True if the run wrote its end record
+    """
+
+    run_id: str
+    flow_name: str
+    store: dict[str, Any]
+    path: list[str] = field(default_factory=list)
+    next_node: str | None = "start"
+    finished: bool = False
+
+
+def _sized(value: Any) -> int:
+    """Length of a sized value, or -1."""
+    try:
+        return len(value)
+    except TypeError:
+        return -1
+
+
+class CheckpointWriter:
+    """Appends the checkpoint records of one run."""
+
+    def __init__(self, path: Path, *, batch_size: int, fsync: bool):
+        """Open the log of a run for appending.
+
+        Args:
+            path: Log file path
+            batch_size: Number of records buffered before writing
+            fsync: Call ``os.fsync`` after every write
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self._file = path.open("ab")
+        self._pending: list[bytes] = []
+        # Value and length of every key as last recorded
+        self._seen: dict[str, tuple[Any, int]] = {}
+
+    def start(self, flow_name: str, run_id: str, store: Any) -> None:
+        """Record the initial store of the run."""
+        snapshot = {k: v for k, v in store.items() if k not in _UNLOGGED_KEYS}
+        self.track(snapshot)
+        self._append(
+            {"type": "start", "flow": flow_name, "run_id": run_id, "store": snapshot}
+        )
+        self.flush()
+
+    def track(self, store: Any) -> None:
+        """Use ``store`` as the baseline for the next step's changes."""
+        self._seen = {
+            key: (value, _sized(value))
+            for key, value in store.items()
+            if key not in _UNLOGGED_KEYS
+        }
+
+    def step(self, path: list[str], next_node: str | None, store: Any) -> None:
+        """Record a finished step and the keys it changed.
+
+        Args:
+            path: Node IDs visited during the step
+            next_node: Node ID the flow continues with ('end' when done,
+                None when stopping on an error)
+            store: Store after the step
+        """
+        changed, deleted = self._delta(store)
+        self._append(
+            {
+                "type": "step",
+                "path": path,
+                "next": next_node,
+                "set": changed,
+                "del": deleted,
+            }
+        )
+
+    def finish(self, store: Any) -> None:
+        """Record the end of the run and close the log."""
+        changed, deleted = self._delta(store)
+        self._append({"type": "end", "set": changed, "del": deleted})
+        self.close()
+
+    def _delta(self, store: Any) -> tuple[dict[str, Any], list[str]]:
+        """Find the keys changed since the last record and update the baseline."""
+        seen = self._seen
+        changed = {}
+        for key, value in store.items():
+            if key in _UNLOGGED_KEYS:
+                continue
+            recorded, recorded_size = seen.get(key, (_MISSING, -1))
+            size = _sized(value)
+            if recorded is not value or size != recorded_size:
+                seen[key] = (value, size)
+                changed[key] = value
+        deleted = [key for key in seen if key not in store]
+        for key in deleted:
+            del seen[key]
+        return changed, deleted
+
+    def flush(self) -> None:
+        """Write buffered records to disk."""
+        if not self._pending:
+            return
+        self._file.write(b"".join(self._pending))
+        self._pending.clear()
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        """Flush buffered records and close the log."""
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+
+    def _append(self, record: dict[str, Any]) -> None:
+        """Buffer a record, writing the batch once it is full."""
+        self._pending.append(pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+
+class FileCheckpointer:
+    """Stores checkpoint logs as files in a directory."""
+
+    def __init__(
+        self, directory: Path | str, *, batch_size: int = 1, fsync: bool = False
+    ):
+        """Initialize the checkpointer.
+
+        Args:
+            directory: Directory for checkpoint logs (created if missing)
+            batch_size: Number of step records buffered before each write.
+                Larger batches are cheaper but a crash loses up to
+                ``batch_size - 1`` steps, which are re-run on resume.
+            fsync: Call ``os.fsync`` after every write for durability
+                against power loss, at the cost of slower steps
+        """
+        if batch_size < 1:
+            msg = "batch_size must be at least 1"
+            raise ValueError(msg)
+
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.fsync = fsync
+
+    @classmethod
+    def from_config(cls, config: Any, **kwargs: Any) -> "FileCheckpointer":
+        """Create a checkpointer under ``config.data_dir / "checkpoints"``."""
+        return cls(Path(config.data_dir) / "checkpoints", **kwargs)
+
+    def path_for(self, run_id: str) -> Path:
+        """Path of the checkpoint log of a run."""
+        if not run_id or os.sep in run_id or run_id.startswith("."):
+            msg = f"Invalid run ID: {run_id!r}"
+            raise ValueError(msg)
+        return self.directory / f"{run_id}.ckpt"
+
+    def open(self, run_id: str) -> CheckpointWriter:
+        """Open the log of a run for appending."""
+        return CheckpointWriter(
+            self.path_for(run_id), batch_size=self.batch_size, fsync=self.fsync
+        )
+
+    def load(self, run_id: str) -> CheckpointState:
+        """Rebuild the state of a run from its log.
+
+        A truncated final record, left by a crash during a write, is
+        ignored.
+
+        Raises:
+            KeyError: If there is no checkpoint for the run
+        """
+        path = self.path_for(run_id)
+        if not path.exists():
+            msg = f"No checkpoint for run: {run_id}"
+            raise KeyError(msg)
+
+        state = None
+        with path.open("rb") as file:
+            while True:
+                try:
+                    record = pickle.load(file)  # noqa: S301
+                except (EOFError, pickle.UnpicklingError):
+                    break
+
+                if record["type"] == "start":
+                    state = CheckpointState(
+                        run_id=run_id,
+                        flow_name=record["flow"],
+                        store=record["store"],
+                    )
+                elif state is None:
+                    break
+                else:
+                    state.store.update(record["set"])
+                    for key in record["del"]:
+                        state.store.pop(key, None)
+                    if record["type"] == "step":
+                        state.path.extend(record["path"])
+                        state.next_node = record["next"]
+                    else:
+                        state.finished = True
+
+        if state is None:
+            msg = f"Checkpoint for run {run_id} has no start record"
+            raise KeyError(msg)
+        return state
+
+    def delete(self, run_id: str) -> None:
+        """Delete the log of a run, if it exists."""
+        self.path_for(run_id).unlink(missing_ok=True)
@@ -0,0 +1,231 @@
+"""Code generation for small, hot flows.
+
+``compile_flow`` turns a ``BaseFlow`` into a specialized Python function
+with the same signature and results as ``run``. The function's source has
+one block per node, with the node's transitions unrolled into an
+``if``/``elif`` chain over the action, so a step costs a few comparisons
+instead of the plan walker's generator round trip, dict lookups and
+per-step logging:
+
+    run_greeting = compile_flow(greeting_flow)
+    store = run_greeting({"name": "ada"})
+
+Generated code is compiled with ``compile()`` and cached by a hash of the
+source, which is derived from the flow definition, so flows with the same
+shape share one code object.
+
+The compiled function returns the same store as ``run``. It skips the
+INFO-level step logging (errors are still logged), and with
+``record_path=False`` it also skips recording ``_flow_path``. Runs it
+cannot specialize are handed to ``run`` unchanged: runs of flows with
+hooks attached or a seed, runs whose store has a deadline or a seed, and
+``CowStore`` stores.
+
+Flows with fan-outs, async nodes, node timeouts or a checkpointer cannot be
+compiled, nor can flows created with ``parallel=True`` or ``debug=True``.
+"""
+
+import hashlib
+from collections.abc import Callable
+from types import CodeType
+from typing import Any
+
+from src.flows.instances import NodeProvider
+from src.flows.plan import END, STOP
+from src.utils.store import CowStore
+
+_code_cache: dict[bytes, CodeType] = {}
+
+
+def _check_compilable(flow: Any) -> None:
+    """Reject flows whose features the generated code does not implement."""
+    name = flow.name
+    if flow.supports_async:
+        msg = f"Flow {name} is async and cannot be compiled"
+        raise ValueError(msg)
+    if flow.checkpointer is not None:
+        msg = f"Flow {name} has a checkpointer and cannot be compiled"
+        raise ValueError(msg)
+    if flow.parallel or flow.debug:
+        msg = f"Flow {name} runs in parallel or debug mode and cannot be compiled"
+        raise ValueError(msg)
+    for node in flow.plan.nodes:
+        if node.fanout is not None:
+            msg = f"Flow {name} has fan-outs and cannot be compiled"
+            raise ValueError(msg)
+        if getattr(node.node_class, "node_timeout", None) is not None:
+            msg = f"Node '{node.node_id}' has a timeout and cannot be compiled"
+            raise ValueError(msg)
+
+
+def generate_source(flow: Any, *, record_path: bool = True) -> str:
+    """Generate the source of the specialized run function for a flow.
+
+    Args:
+        flow: The flow to compile
+        record_path: Record ``_flow_path`` like ``run`` does
+
+    Returns:
+        Source of a module defining ``run_flow(initial_store=None,
+        max_steps=100)``
+    """
+    _check_compilable(flow)
+    plan = flow.plan
+    providers = flow._providers
+    runners = flow._runners
+    shared = any(type(provider) is not NodeProvider for provider in providers)
+    delegate = " or ".join(
+        [
+            "isinstance(store, _CowStore)",
+            "store.get('_flow_deadline') is not None",
+            "store.get('_flow_seed') is not None",
+        ]
+    )
+
+    lines = [
+        "def run_flow(initial_store=None, max_steps=100):",
+        "    if _flow.hooks or _flow.seed is not None:",
+        "        return _flow.run(initial_store, max_steps)",
+        "    store = {} if initial_store is None else initial_store",
+        f"    if {delegate}:",
+        "        return _flow.run(store, max_steps)",
+        f"    store['_flow_name'] = {flow.name!r}",
+    ]
+    if record_path:
+        lines += [
+            "    path = _new_path()",
+            "    store['_flow_path'] = path",
+            "    append = path.append",
+        ]
+    if shared:
+        lines.append("    run_nodes = {}")
+    lines += [
+        "    steps = 0",
+        "    index = 0",
+        "    while index >= 0 and steps < max_steps:",
+    ]
+
+    for node in plan.nodes:
+        i = node.index
+        node_id = node.node_id
+        runner = "" if runners[i] is None else f", _runner_{i}"
+        lines += [
+            f"        if index == {i}:",
+            "            steps += 1",
+        ]
+        if record_path:
+            lines.append(f"            append({node_id!r})")
+        lines.append("            try:")
+        if type(providers[i]) is NodeProvider:
+            lines.append(f"                store = _node_{i}().run(store{runner})")
+        else:
+            lines += [
+                f"                instance = _provider_{i}.acquire(run_nodes)",
+                "                try:",
+                f"                    store = instance.run(store{runner})",
+                "                finally:",
+                f"                    _provider_{i}.release(instance)",
+            ]
+        lines += [
+            "            except Exception as e:",
+            f"                _logger.error('Error in node %s: %s', {node_id!r}, e)",
+            "                store['action'] = 'error'",
+            "                store['error'] = str(e)",
+            f"                store['error_node'] = {node_id!r}",
+            f"                index = {STOP}",
+            "                break",
+        ]
+        lines += _transition_chain(plan, node)
+
+    lines += [
+        "    if steps >= max_steps:",
+        "        _logger.error('Flow exceeded maximum steps (%d)', max_steps)",
+        "        store['action'] = 'error'",
+        "        store['error'] = f'Flow exceeded maximum steps ({max_steps})'",
+    ]
+    if record_path:
+        lines.append("    store['_flow_path'] = path")
+    lines += [
+        "    store['_flow_steps'] = steps",
+        f"    store['_flow_completed'] = index == {END}",
+        "    return store",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def _transition_chain(plan: Any, node: Any) -> list[str]:
+    """Unroll a node's transition table into an if/elif chain."""
+    fallback = node.targets[-1]
+    # Actions leading to the same target share a branch
+    cases: dict[int, list[str]] = {}
+    for action, target in zip(plan.actions, node.targets, strict=False):
+        if target != fallback:
+            cases.setdefault(target, []).append(action)
+
+    if not cases:
+        return _goto(node, fallback, "            ")
+
+    lines = ["            action = store.get('action', 'default')"]
+    for position, (target, actions) in enumerate(cases.items()):
+        keyword = "if" if position == 0 else "elif"
+        if len(actions) == 1:
+            condition = f"action == {actions[0]!r}"
+        else:
+            condition = f"action in {tuple(actions)!r}"
+        lines.append(f"            {keyword} {condition}:")
+        lines += _goto(node, target, "                ")
+    lines.append("            else:")
+    lines += _goto(node, fallback, "                ")
+    return lines
+
+
+def _goto(node: Any, target: int, indent: str) -> list[str]:
+    """Statements moving the generated loop to a target."""
+    if target == STOP:
+        message = "'Error in node %s, stopping flow'"
+        return [
+            f"{indent}_logger.error({message}, {node.node_id!r})",
+            f"{indent}index = {STOP}",
+            f"{indent}break",
+        ]
+    if target == END:
+        return [f"{indent}index = {END}", f"{indent}break"]
+    return [f"{indent}index = {target}", f"{indent}continue"]
+
+
+def compile_flow(flow: Any, *, record_path: bool = True) -> Callable[..., Any]:
+    """Compile a flow into a specialized function behaving like ``run``.
+
+    Args:
+        flow: The flow to compile
+        record_path: Record ``_flow_path`` like ``run`` does
+
+    Returns:
+        Function ``run_flow(initial_store=None, max_steps=100)``; its
+        generated source is available as ``run_flow.source``
+
+    Raises:
+        ValueError: If the flow uses features that cannot be compiled
+    """
+    source = generate_source(flow, record_path=record_path)
+    key = hashlib.blake2b(source.encode(), digest_size=16).digest()
+    code = _code_cache.get(key)
+    if code is None:
+        code = _code_cache[key] = compile(source, f"<flow {flow.name}>", "exec")
+
+    namespace: dict[str, Any] = {
+        "_flow": flow,
+        "_logger": flow.logger,
+        "_CowStore": CowStore,
+        "_new_path": flow._new_path,
+    }
+    for node in flow.plan.nodes:
+        i = node.index
+        namespace[f"_node_{i}"] = node.node_class
+        namespace[f"_provider_{i}"] = flow._providers[i]
+        namespace[f"_runner_{i}"] = flow._runners[i]
+
+    exec(code, namespace)  # noqa: S102
+    run_flow = namespace["run_flow"]
+    run_flow.source = source
+    return run_flow
@@ -0,0 +1,259 @@
+"""Automatic parallelization of nodes with declared store effects.
+
+Nodes may declare the store keys they read and write, in all phases:
+
+    class FetchUser(BaseNode):
+        reads = frozenset({"user_id"})
+        writes = frozenset({"user"})
+
+A flow created with ``parallel=True`` follows the success transitions of its
+plan from every node to find chains of nodes that declare both and are
+``speculative`` (the default), and builds the dependency DAG of each chain:
+a node depends on an earlier node of the chain if it reads a key the
+earlier one writes. When a chain node runs, the
+nodes after it that depend on none of the nodes in between are started
+along with it, each on a fork of the store, on the shared thread pool (sync
+flows) or as tasks on the event loop (async flows).
+
+Results are those of sequential execution. The run still takes one step at
+a time: a node started early has its writes applied when its turn comes if
+the run followed the chain to it and the previous node took the success
+action, which the early start assumed. Otherwise its result is discarded
+and it runs again. The nodes that ran in between wrote no key it reads, by
+construction of the DAG, and writes to the same key are applied in step
+order. A node started early may therefore run without its result being
+used: speculative nodes must have no effects outside the store and, as
+with fan-out branches, replace store values instead of mutating them;
+nodes that do have such effects set ``speculative = False``. A node is not
+started early either while a key it reads holds an iterator, such as a
+generator, which the early run would consume. Hook events of the phases of
+such runs are emitted all the same.
+
+``action``, ``error`` and ``error_node`` are read and written by every node
+and need not be declared, and ``_flow_`` keys belong to the engine. With
+``debug=True``, a flow checks the declarations at runtime: nodes declaring
+reads or writes run on a tracking proxy, and a node that reads or writes an
+undeclared key fails its step with an error naming the keys.
+"""
+
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from typing import Any
+
+from src.flows.incremental import ReadTracker
+from src.flows.parallel import fork_store
+from src.flows.plan import CompiledNode, ExecutionPlan
+
+IMPLICIT_KEYS = frozenset({"action", "error", "error_node"})
+PREDICTED_ACTION = "success"
+MAX_CHAIN = 8
+_ENGINE_PREFIX = "_flow_"
+_MISSING = object()
+
+
+def declares_effects(node: CompiledNode) -> bool:
+    """Check whether a node declares both the keys it reads and writes."""
+    node_class = node.node_class
+    return (
+        getattr(node_class, "reads", None) is not None
+        and getattr(node_class, "writes", None) is not None
+    )
+
+
+def is_speculative(node: CompiledNode) -> bool:
+    """Check whether a node may be started before its turn at all."""
+    speculative = getattr(node.node_class, "speculative", False) is True
+    return speculative and declares_effects(node)
+
+
+@dataclass(frozen=True)
+class Wave:
+    """Nodes to start along with a chain node.
+
+    Attributes:
+        chain: Indices of the nodes expected to run next, in order
+        ahead: Indices of the nodes of the chain to start early
+        reads: Keys read by each node of ``ahead``
+    """
+
+    chain: tuple[int, ...]
+    ahead: tuple[int, ...]
+    reads: tuple[frozenset[str], ...]
+
+
+def plan_waves(
+    plan: ExecutionPlan, eligible: Callable[[CompiledNode], bool]
+) -> tuple[Wave | None, ...] | None:
+    """Build the dependency DAG of the chain starting at every node.
+
+    Args:
+        plan: Execution plan of the flow
+        eligible: Whether a node may be started early; nodes must also be
+            speculative and declare their reads and writes
+
+    Returns:
+        The wave of every node, by node index (None for nodes with nothing
+        to start early), or None if no node has one
+    """
+    success = plan.action_index.get(PREDICTED_ACTION, -1)
+    nodes = plan.nodes
+
+    def member(index: int) -> bool:
+        return index >= 0 and is_speculative(nodes[index]) and eligible(nodes[index])
+
+    waves: list[Wave | None] = []
+    for node in nodes:
+        if not member(node.index):
+            waves.append(None)
+            continue
+
+        chain = [node.index]
+        target = node.targets[success]
+        while member(target) and target not in chain and len(chain) <= MAX_CHAIN:
+            chain.append(target)
+            target = nodes[target].targets[success]
+
+        ahead = []
+        written: set[str] = set()
+        for index in chain:
+            node_class = nodes[index].node_class
+            if index != node.index and written.isdisjoint(node_class.reads):
+                ahead.append(index)
+            written.update(node_class.writes - IMPLICIT_KEYS)
+        reads = tuple(nodes[index].node_class.reads for index in ahead)
+        waves.append(Wave(tuple(chain[1:]), tuple(ahead), reads) if ahead else None)
+
+    return tuple(waves) if any(waves) else None
+
+
+class Speculation:
+    """Nodes of one run that were started ahead of their turn."""
+
+    def __init__(self, waves: tuple[Wave | None, ...]):
+        """Initialize the state of a run.
+
+        Args:
+            waves: Waves of the flow's plan, from ``plan_waves``
+        """
+        self.waves = waves
+        self.started: dict[int, tuple[Any, ReadTracker]] = {}
+        self.expected: tuple[int, ...] = ()
+
+    def take(self, index: int, store: Any) -> tuple[Any, ReadTracker] | None:
+        """Advance the run to a node and claim its early start if still valid.
+
+        Args:
+            index: Index of the node the run is at
+            store: Store the node would run on
+
+        Returns:
+            ``(handle, tracker)`` of the early run, or None if the node must
+            run now
+        """
+        expected = self.expected
+        if expected and expected[0] == index:
+            self.expected = expected[1:]
+            started = self.started.pop(index, None)
+            if started is not None:
+                if store.get("action") == PREDICTED_ACTION:
+                    return started
+                _drop(started[0])
+        elif self.started or expected:
+            self.discard()  # The run left the chain
+        return None
+
+    def start(self, index: int, store: Any, start: Callable[[int, Any], Any]) -> None:
+        """Start the nodes of a node's wave that have not started yet.
+
+        Must be called before the node itself changes the store.
+
+        Args:
+            index: Index of the node about to run
+            store: Store the node runs on
+            start: Callable ``(node index, store)`` starting a node on a
+                store and returning a future or task
+        """
+        wave = self.waves[index]
+        if wave is None:
+            return
+        self.expected = wave.chain
+        for ahead, reads in zip(wave.ahead, wave.reads, strict=True):
+            if ahead not in self.started and not _reads_iterator(store, reads):
+                fork = fork_store(store)
+                fork["action"] = PREDICTED_ACTION
+                tracker = ReadTracker(fork)
+                self.started[ahead] = (start(ahead, tracker), tracker)
+
+    def discard(self) -> None:
+        """Give up on every node started early."""
+        for handle, _ in self.started.values():
+            _drop(handle)
+        self.started.clear()
+        self.expected = ()
+
+
+def _reads_iterator(store: Any, reads: frozenset[str]) -> bool:
+    """Check whether a node would read an iterator, which only runs once."""
+    return any(isinstance(store.get(key), Iterator) for key in reads)
+
+
+def _drop(handle: Any) -> None:
+    """Cancel an early run, or consume the outcome of a finished one."""
+    if not handle.cancel() and handle.done():
+        handle.exception()  # Not raised; keeps failures of unused runs quiet
+
+
+def commit(store: Any, tracker: ReadTracker, result: Any) -> bool:
+    """Apply the writes of a node that ran early to the run's store.
+
+    Args:
+        store: Store of the run, at the node's turn
+        tracker: Proxy around the fork the node ran on
+        result: Store returned by the node
+
+    Returns:
+        False if the node returned another store and must run again
+    """
+    if result is not tracker:
+        return False
+    fork = tracker.store
+    for key in tracker.written:
+        value = fork.get(key, _MISSING)
+        if value is _MISSING:
+            store.pop(key, None)
+        else:
+            store[key] = value
+    return True
+
+
+def check_effects(node: CompiledNode, tracker: ReadTracker) -> None:
+    """Check the keys a node used against its declarations.
+
+    Args:
+        node: The node that ran
+        tracker: Proxy around the store it ran on
+
+    Raises:
+        ValueError: If the node read or wrote keys it did not declare
+    """
+    problems = []
+    for kind, declared, used in (
+        ("read", getattr(node.node_class, "reads", None), tracker.reads),
+        ("wrote", getattr(node.node_class, "writes", None), tracker.written),
+    ):
+        if declared is None:
+            continue
+        if kind == "read" and tracker.read_all:
+            problems.append("read the whole store")
+        undeclared = sorted(
+            key
+            for key in used
+            if key not in declared
+            and key not in IMPLICIT_KEYS
+            and not key.startswith(_ENGINE_PREFIX)
+        )
+        if undeclared:
+            problems.append(f"{kind} undeclared keys {undeclared}")
+    if problems:
+        msg = f"Node {node.node_id} " + " and ".join(problems)
+        raise ValueError(msg)
@@ -0,0 +1,208 @@
+"""Shared executors used by flows to run blocking work off the caller.
+
+The thread pool is bounded so that offloaded sync nodes cannot spawn an
+unbounded number of threads, no matter how many flows are in flight.
+
+The process pool runs the exec phase of CPU-bound nodes (``cpu_bound =
+True``) so they do not hold the GIL of the flow's process. Workers are
+started eagerly and import the modules of every CPU-bound node class that
+was registered before the pool was created, so the first call does not pay
+for process start-up and imports.
+"""
+
+import importlib
+import os
+import queue
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any
+
+from src.flows.parallel import store_delta
+
+DEFAULT_THREAD_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+DEFAULT_PROCESS_WORKERS = os.cpu_count() or 1
+
+_lock = threading.Lock()
+_thread_pool: ThreadPoolExecutor | None = None
+_thread_pool_size = DEFAULT_THREAD_WORKERS
+_process_pool: ProcessPoolExecutor | None = None
+_process_pool_size = DEFAULT_PROCESS_WORKERS
+_worker_modules: set[str] = set()
+
+# Daemon threads wait this many seconds for more work before exiting
+DAEMON_IDLE_TIMEOUT = 30.0
+
+_daemon_lock = threading.Lock()
+_daemon_tasks: queue.SimpleQueue = queue.SimpleQueue()
+_idle_daemons = 0  # Idle daemon threads not yet claimed by a queued task
+
+# Node instances cached inside each worker process
+_worker_nodes: dict[type, Any] = {}
+
+
+def get_thread_pool() -> ThreadPoolExecutor:
+    """Get the shared, bounded thread pool, creating it on first use."""
+    global _thread_pool  # noqa: PLW0603
+    if _thread_pool is None:
+        with _lock:
+            if _thread_pool is None:
+                _thread_pool = ThreadPoolExecutor(
+                    max_workers=_thread_pool_size, thread_name_prefix="pocketflow"
+                )
+    return _thread_pool
+
+
+def configure_thread_pool(max_workers: int) -> None:
+    """Set the size of the shared thread pool.
+
+    An existing pool is shut down (without waiting) and replaced on next use.
+
+    Args:
+        max_workers: Maximum number of worker threads
+    """
+    global _thread_pool, _thread_pool_size  # noqa: PLW0603
+    if max_workers < 1:
+        msg = "max_workers must be at least 1"
+        raise ValueError(msg)
+
+    with _lock:
+        _thread_pool_size = max_workers
+        if _thread_pool is not None:
+            _thread_pool.shutdown(wait=False)
+            _thread_pool = None
+
+
+def run_in_daemon_thread(call: Callable[[Any], Any], arg: Any) -> Future:
+    """Run ``call(arg)`` on a daemon thread.
+
+    For work that may be abandoned while still running: a daemon thread,
+    unlike a pool worker, cannot keep the process alive or hold a slot of
+    the shared pool after it has been given up on. Threads are reused once
+    their work is done and a new one is started only when none is idle, so
+    there is no bound that abandoned work could exhaust.
+    """
+    global _idle_daemons  # noqa: PLW0603
+    future: Future = Future()
+    with _daemon_lock:
+        start = _idle_daemons == 0
+        if not start:
+            _idle_daemons -= 1
+    _daemon_tasks.put((future, call, arg))
+    if start:
+        threading.Thread(
+            target=_daemon_worker, name="pocketflow-detached", daemon=True
+        ).start()
+    return future
+
+
+def _daemon_worker() -> None:
+    """Run queued daemon tasks until idle for ``DAEMON_IDLE_TIMEOUT``."""
+    global _idle_daemons  # noqa: PLW0603
+    while True:
+        try:
+            future, call, arg = _daemon_tasks.get(timeout=DAEMON_IDLE_TIMEOUT)
+        except queue.Empty:
+            with _daemon_lock:
+                # Otherwise a task claimed this thread and is being queued
+                if _idle_daemons > 0:
+                    _idle_daemons -= 1
+                    return
+            continue
+
+        if future.set_running_or_notify_cancel():
+            try:
+                future.set_result(call(arg))
+            except BaseException as e:
+                future.set_exception(e)
+        del future, call, arg  # Do not keep the results alive while idle
+        with _daemon_lock:
+            _idle_daemons += 1
+
+
+def register_worker_modules(modules: Any) -> None:
+    """Register modules for process pool workers to import on start-up."""
+    with _lock:
+        _worker_modules.update(modules)
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Get the shared process pool, creating and warming it on first use."""
+    global _process_pool  # noqa: PLW0603
+    if _process_pool is None:
+        with _lock:
+            if _process_pool is None:
+                pool = ProcessPoolExecutor(
+                    max_workers=_process_pool_size,
+                    initializer=_init_worker,
+                    initargs=(sorted(_worker_modules),),
+                )
+                # Start every worker now instead of on the first real calls
+                for _ in range(_process_pool_size):
+                    pool.submit(_noop)
+                _process_pool = pool
+    return _process_pool
+
+
+def configure_process_pool(max_workers: int) -> None:
+    """Set the size of the shared process pool.
+
+    An existing pool is shut down (without waiting) and replaced on next use.
+
+    Args:
+        max_workers: Maximum number of worker processes
+    """
+    global _process_pool, _process_pool_size  # noqa: PLW0603
+    if max_workers < 1:
+        msg = "max_workers must be at least 1"
+        raise ValueError(msg)
+
+    with _lock:
+        _process_pool_size = max_workers
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
+
+
+def exec_in_process(node: Any, phase: str, method: Any, store: Any) -> Any:
+    """Phase runner that moves a node's exec phase to the process pool.
+
+    Only the keys listed in ``node.reads`` are sent to the worker, and only
+    the keys the worker changed are sent back and applied to the store.
+    """
+    if phase != "exec":
+        return method(store)
+
+    reads = node.reads
+    if reads is None:
+        payload = dict(store)
+    else:
+        payload = {key: store[key] for key in reads if key in store}
+
+    future = get_process_pool().submit(_exec_in_worker, type(node), payload)
+    writes, deleted = future.result()
+
+    store.update(writes)
+    for key in deleted:
+        store.pop(key, None)
+    return store
+
+
+def _init_worker(modules: list[str]) -> None:
+    """Import node modules when a worker process starts."""
+    for module in modules:
+        importlib.import_module(module)
+
+
+def _noop() -> None:
+    """Task used to start worker processes."""
+
+
+def _exec_in_worker(node_class: type, store: dict[str, Any]) -> tuple:
+    """Run a node's exec phase inside a worker process."""
+    node = _worker_nodes.get(node_class)
+    if node is None:
+        node = _worker_nodes[node_class] = node_class()
+
+    before = dict(store)
+    return store_delta(before, node.exec(store))
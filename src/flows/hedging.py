@@ -0,0 +1,227 @@
+"""Hedged execution of slow, idempotent nodes.
+
+Nodes that declare ``idempotent = True`` and ``hedge = True`` have their
+exec phase hedged when run by a flow: if an attempt has not returned
+within the node class's historical ``HEDGE_QUANTILE`` latency, a second
+attempt is started on another fork of the store, the first attempt to
+succeed wins, and the other is cancelled (async nodes) or abandoned (sync
+nodes, whose threads cannot be stopped):
+
+    class SummarizeNode(AsyncBaseNode):
+        idempotent = True
+        hedge = True
+        hedge_max_extra = 0.05  # at most 5% extra exec calls
+
+Latencies come from a ``LatencyHistogram`` per node class. Hedging starts
+once ``MIN_SAMPLES`` durations have been recorded, and a class starts at
+most ``hedge_max_extra`` second attempts per exec call, which caps the
+extra load on whatever the node calls.
+
+Sync attempts run on daemon threads once hedging is active, so only hedge
+nodes whose exec phase is slow compared to starting a thread.
+"""
+
+import asyncio
+import threading
+import time
+import weakref
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Any
+
+from src.flows.executors import run_in_daemon_thread
+from src.flows.parallel import apply_store_delta, fork_store
+from src.nodes.base import PhaseRunner
+from src.utils.histogram import LatencyHistogram
+
+HEDGE_QUANTILE = 0.95
+MIN_SAMPLES = 20
+
+_stats: "weakref.WeakKeyDictionary[type, HedgeStats]" = weakref.WeakKeyDictionary()
+_stats_lock = threading.Lock()
+
+
+class HedgeStats:
+    """Exec latencies and hedging budget of one node class."""
+
+    def __init__(self, max_extra: float):
+        """Initialize the statistics.
+
+        Args:
+            max_extra: Second attempts allowed per exec call
+        """
+        self.max_extra = max_extra
+        self.latency = LatencyHistogram()
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._lock = threading.Lock()
+
+    def delay(self) -> float | None:
+        """Count an exec call and return how long before hedging it.
+
+        Returns:
+            Seconds to wait for the first attempt, or None if the call must
+            not be hedged (too few samples)
+        """
+        with self._lock:
+            self.calls += 1
+        if self.latency.count < MIN_SAMPLES:
+            return None
+        return self.latency.quantile(HEDGE_QUANTILE)
+
+    def try_hedge(self) -> bool:
+        """Claim a second attempt if the budget allows it."""
+        with self._lock:
+            if self.hedges + 1 > self.max_extra * self.calls:
+                return False
+            self.hedges += 1
+            return True
+
+    def record_win(self) -> None:
+        """Count a call won by its second attempt."""
+        with self._lock:
+            self.hedge_wins += 1
+
+    def stats(self) -> dict[str, Any]:
+        """Return the counters and the hedging threshold."""
+        return {
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "samples": self.latency.count,
+            "threshold": self.latency.quantile(HEDGE_QUANTILE),
+        }
+
+
+def hedge_stats(node_class: type) -> HedgeStats:
+    """Get the hedging statistics of a node class, creating them on first use."""
+    stats = _stats.get(node_class)
+    if stats is None:
+        with _stats_lock:
+            stats = _stats.get(node_class)
+            if stats is None:
+                stats = _stats[node_class] = HedgeStats(node_class.hedge_max_extra)
+    return stats
+
+
+def _attempt(
+    stats: HedgeStats, node: Any, method: Any, runner: PhaseRunner | None
+) -> Callable[[Any], Any]:
+    """Callable running the exec phase on a store and recording its latency."""
+
+    def attempt(store: Any) -> Any:
+        start = time.monotonic()
+        if runner is None:
+            result = method(store)
+        else:
+            result = runner(node, "exec", method, store)
+        stats.latency.record(time.monotonic() - start)
+        return result
+
+    return attempt
+
+
+def _async_attempt(
+    stats: HedgeStats, node: Any, method: Any, runner: PhaseRunner | None
+) -> Callable[[Any], Any]:
+    """Awaitable form of ``_attempt``."""
+
+    async def attempt(store: Any) -> Any:
+        start = time.monotonic()
+        if runner is None:
+            result = await method(store)
+        else:
+            result = await runner(node, "exec", method, store)
+        stats.latency.record(time.monotonic() - start)
+        return result
+
+    return attempt
+
+
+def hedged_runner(runner: PhaseRunner | None = None) -> PhaseRunner:
+    """Wrap a sync phase runner so the exec phase is hedged.
+
+    Args:
+        runner: Runner to run each attempt with, or None to call phases
+            directly
+    """
+
+    def run_phase(node: Any, phase: str, method: Any, store: Any) -> Any:
+        if phase != "exec":
+            if runner is None:
+                return method(store)
+            return runner(node, phase, method, store)
+
+        stats = hedge_stats(type(node))
+        delay = stats.delay()
+        attempt = _attempt(stats, node, method, runner)
+        if delay is None:
+            return attempt(store)
+
+        primary = run_in_daemon_thread(attempt, fork_store(store))
+        done, _ = wait([primary], timeout=delay)
+        if done or not stats.try_hedge():
+            return apply_store_delta(store, primary.result())
+
+        backup = run_in_daemon_thread(attempt, fork_store(store))
+        winner = _first_success([primary, backup])
+        if winner is backup:
+            stats.record_win()
+        return apply_store_delta(store, winner.result())
+
+    return run_phase
+
+
+def _first_success(futures: list[Future]) -> Future:
+    """Wait for the first attempt that succeeds, or the last one to fail."""
+    pending = set(futures)
+    while True:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        # Prefer the earlier attempt when both finished together
+        for future in sorted(done, key=futures.index):
+            if future.exception() is None or not pending:
+                for other in pending:
+                    other.cancel()
+                return future
+
+
+def async_hedged_runner(runner: PhaseRunner | None = None) -> PhaseRunner:
+    """Wrap an async phase runner so the exec phase is hedged."""
+
+    async def run_phase(node: Any, phase: str, method: Any, store: Any) -> Any:
+        if phase != "exec":
+            if runner is None:
+                return await method(store)
+            return await runner(node, phase, method, store)
+
+        stats = hedge_stats(type(node))
+        delay = stats.delay()
+        attempt = _async_attempt(stats, node, method, runner)
+        if delay is None:
+            return await attempt(store)
+
+        primary = asyncio.ensure_future(attempt(fork_store(store)))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done or not stats.try_hedge():
+                return apply_store_delta(store, await primary)
+
+            tasks.append(asyncio.ensure_future(attempt(fork_store(store))))
+            pending = set(tasks)
+            while True:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in sorted(done, key=tasks.index):
+                    if task.exception() is None or not pending:
+                        if task is not primary:
+                            stats.record_win()
+                        return apply_store_delta(store, task.result())
+        finally:
+            # Cancel the losing attempt (or both, if the caller was cancelled)
+            for task in tasks:
+                task.cancel()
+
+    return run_phase
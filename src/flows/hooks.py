@@ -0,0 +1,375 @@
+"""Tracing hooks for PocketFlow flows.
+
+Subscribers derive from ``FlowHook``, override the events they care about,
+and are attached with ``BaseFlow.add_hook``:
+
+    recorder = SpanRecorder.from_config(config)
+    flow.add_hook(recorder)
+
+Every event receives the run ID first (``store["_flow_run_id"]``, assigned
+when the run starts if hooks are attached), so one subscriber can follow
+many concurrent runs. Flows only check whether their hook tuple is empty
+on each step, so flows without subscribers pay practically nothing.
+
+Phase timings come from a phase runner that wraps ``prep``/``exec``/
+``post``; flows build it once per node and only for hooks that time
+phases. Hooks can override ``on_phase``, which gets the start, wall-clock
+and CPU time of every phase; timing a phase for it costs about 1.7µs, most
+of it two ``time.thread_time_ns`` system calls. Hooks that only need
+durations, like the flow profiler, can instead return a recorder from
+``phase_recorder``. If no hook of the flow overrides ``on_phase``,
+recorders get integer nanoseconds and CPU time only for one phase in
+``CPU_SAMPLE_EVERY``, which brings the cost down to about 0.75µs per
+phase, the profiler's histogram updates included.
+CPU time is measured on the calling thread, so it is only meaningful for
+sync phases; for async phases it includes whatever else the event loop
+ran in the meantime.
+
+Exceptions raised by subscribers are logged and otherwise ignored.
+"""
+
+import itertools
+import json
+import logging
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from src.nodes.base import PhaseRunner
+
+logger = logging.getLogger(__name__)
+
+# Recorders get CPU time for one phase in this many. Coprime with the three
+# phases of a node, so every phase of a node gets sampled in turn.
+CPU_SAMPLE_EVERY = 8
+
+# Callable (phase, wall-clock ns, CPU ns or None if not sampled) -> None
+PhaseRecorder = Callable[[str, int, int | None], None]
+
+
+class PhaseTiming(NamedTuple):
+    """Timing of one node phase.
+
+    Attributes:
+        start: ``time.monotonic()`` when the phase started
+        wall: Wall-clock seconds the phase took
+        cpu: CPU seconds the calling thread spent in the phase
+    """
+
+    start: float
+    wall: float
+    cpu: float
+
+
+class FlowHook:
+    """Base class for flow event subscribers. All events default to no-ops."""
+
+    def on_flow_start(self, run_id: str, flow_name: str, store: Any) -> None:
+        """Called before the first step of a run."""
+
+    def on_node_start(self, run_id: str, node_id: str, store: Any) -> None:
+        """Called before a node (or fan-out) runs."""
+
+    def on_phase(
+        self, run_id: str, node_id: str, phase: str, timing: PhaseTiming
+    ) -> None:
+        """Called after a node phase ran.
+
+        Args:
+            run_id: ID of the run
+            node_id: ID of the node
+            phase: 'prep', 'exec' or 'post'
+            timing: Start, wall-clock and CPU time of the phase
+        """
+
+    def phase_recorder(self, node_id: str) -> PhaseRecorder | None:  # noqa: ARG002
+        """Get a cheaper alternative to ``on_phase`` for one node's phases.
+
+        Args:
+            node_id: ID of the node
+
+        Returns:
+            A callable taking the phase name and its wall-clock and CPU
+            nanoseconds (None when the phase's CPU time was not sampled),
+            or None (the default) for hooks without one
+        """
+        return None
+
+    def on_node_end(self, run_id: str, node_id: str, store: Any, wall: float) -> None:
+        """Called after a node (or fan-out) ran, with its wall-clock seconds."""
+
+    def on_transition(
+        self, run_id: str, node_id: str, action: str, target: str
+    ) -> None:
+        """Called when the flow moves from ``node_id`` to ``target``."""
+
+    def on_error(self, run_id: str, node_id: str | None, error: str) -> None:
+        """Called when a node fails or the run stops on an error."""
+
+    def on_flow_end(self, run_id: str, flow_name: str, store: Any) -> None:
+        """Called after the last step of a run."""
+
+
+def emit(hooks: tuple[FlowHook, ...], event: str, *args: Any) -> None:
+    """Deliver an event to every subscriber, logging subscriber errors."""
+    for hook in hooks:
+        try:
+            getattr(hook, event)(*args)
+        except Exception:
+            logger.exception("Flow hook %r failed in %s", hook, event)
+
+
+def _phase_subscribers(
+    hooks: tuple[FlowHook, ...], node_id: str
+) -> tuple[tuple[Any, ...], tuple[PhaseRecorder, ...]]:
+    """Bound ``on_phase`` methods and recorders of the hooks timing phases."""
+    handlers = []
+    recorders = []
+    for hook in hooks:
+        recorder = hook.phase_recorder(node_id)
+        if recorder is not None:
+            recorders.append(recorder)
+        elif type(hook).on_phase is not FlowHook.on_phase:
+            handlers.append(hook.on_phase)
+    return tuple(handlers), tuple(recorders)
+
+
+def _phase_reporter(
+    handlers: tuple[Any, ...], recorders: tuple[PhaseRecorder, ...], node_id: str
+) -> Callable[[str, Any, int, int, int], None]:
+    """Build the function that hands one timed phase to the hooks."""
+    new_timing = tuple.__new__  # Half the cost of calling PhaseTiming
+
+    def report(phase: str, store: Any, start: int, wall: int, cpu: int) -> None:
+        for record in recorders:
+            try:
+                record(phase, wall, cpu)
+            except Exception:
+                logger.exception("Flow hook %r failed in on_phase", record)
+        timing = new_timing(PhaseTiming, (start / 1e9, wall / 1e9, cpu / 1e9))
+        run_id = store.get("_flow_run_id")
+        for handler in handlers:
+            try:
+                handler(run_id, node_id, phase, timing)
+            except Exception:
+                logger.exception("Flow hook %r failed in on_phase", handler)
+
+    return report
+
+
+def _recorder(recorders: tuple[PhaseRecorder, ...]) -> PhaseRecorder:
+    """Combine recorders so that one failing does not skip the others."""
+    if len(recorders) == 1:
+        return recorders[0]
+
+    def record(phase: str, wall: int, cpu: int | None) -> None:
+        for recorder in recorders:
+            try:
+                recorder(phase, wall, cpu)
+            except Exception:
+                logger.exception("Flow hook %r failed in on_phase", recorder)
+
+    return record
+
+
+def phase_tracer(
+    hooks: tuple[FlowHook, ...], node_id: str, runner: PhaseRunner | None
+) -> PhaseRunner | None:
+    """Wrap a node's phase runner so it reports phase timings to the hooks.
+
+    The run ID is read from the store, so flows build one tracer per node
+    and reuse it for every step while their hooks stay the same. Hooks
+    that time no phases are left out, and if none does, the runner is
+    returned unwrapped.
+    """
+    handlers, recorders = _phase_subscribers(hooks, node_id)
+    if not handlers and not recorders:
+        return runner
+    monotonic_ns = time.monotonic_ns
+    thread_time_ns = time.thread_time_ns
+
+    if handlers:
+        report = _phase_reporter(handlers, recorders, node_id)
+
+        def run_phase(node: Any, phase: str, method: Any, store: Any) -> Any:
+            start = monotonic_ns()
+            cpu_start = thread_time_ns()
+            try:
+                if runner is None:
+                    return method(store)
+                return runner(node, phase, method, store)
+            finally:
+                cpu = thread_time_ns() - cpu_start
+                report(phase, store, start, monotonic_ns() - start, cpu)
+
+        return run_phase
+
+    record = _recorder(recorders)
+    sampled = itertools.cycle([True] + [False] * (CPU_SAMPLE_EVERY - 1))
+
+    def record_phase(node: Any, phase: str, method: Any, store: Any) -> Any:
+        cpu_start = thread_time_ns() if next(sampled) else None
+        start = monotonic_ns()
+        try:
+            if runner is None:
+                return method(store)
+            return runner(node, phase, method, store)
+        finally:
+            wall = monotonic_ns() - start
+            cpu = None if cpu_start is None else thread_time_ns() - cpu_start
+            try:
+                record(phase, wall, cpu)
+            except Exception:
+                logger.exception("Flow hook %r failed in on_phase", record)
+
+    return record_phase
+
+
+def async_phase_tracer(
+    hooks: tuple[FlowHook, ...], node_id: str, runner: PhaseRunner | None
+) -> PhaseRunner | None:
+    """Wrap an async node's phase runner so it reports phase timings."""
+    handlers, recorders = _phase_subscribers(hooks, node_id)
+    if not handlers and not recorders:
+        return runner
+    monotonic_ns = time.monotonic_ns
+    thread_time_ns = time.thread_time_ns
+
+    if handlers:
+        report = _phase_reporter(handlers, recorders, node_id)
+
+        async def run_phase(node: Any, phase: str, method: Any, store: Any) -> Any:
+            start = monotonic_ns()
+            cpu_start = thread_time_ns()
+            try:
+                if runner is None:
+                    return await method(store)
+                return await runner(node, phase, method, store)
+            finally:
+                cpu = thread_time_ns() - cpu_start
+                report(phase, store, start, monotonic_ns() - start, cpu)
+
+        return run_phase
+
+    record = _recorder(recorders)
+    sampled = itertools.cycle([True] + [False] * (CPU_SAMPLE_EVERY - 1))
+
+    async def record_phase(node: Any, phase: str, method: Any, store: Any) -> Any:
+        cpu_start = thread_time_ns() if next(sampled) else None
+        start = monotonic_ns()
+        try:
+            if runner is None:
+                return await method(store)
+            return await runner(node, phase, method, store)
+        finally:
+            wall = monotonic_ns() - start
+            cpu = None if cpu_start is None else thread_time_ns() - cpu_start
+            try:
+                record(phase, wall, cpu)
+            except Exception:
+                logger.exception("Flow hook %r failed in on_phase", record)
+
+    return record_phase
+
+
+class SpanRecorder(FlowHook):
+    """Records flow, node and phase spans and exports them as JSONL.
+
+    Spans of a run are buffered in memory and appended to the trace file
+    as one JSON object per line when the run ends. Each span has a
+    ``kind`` ('flow', 'node' or 'phase'), the run ID, a monotonic
+    ``start`` and a ``duration`` in seconds; flow spans also carry the
+    wall-clock ``timestamp`` the run started at.
+    """
+
+    def __init__(self, path: Path | str):
+        """Initialize the recorder.
+
+        Args:
+            path: JSONL file to append traces to (parent directories are
+                created if missing)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._runs: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Any) -> "SpanRecorder":
+        """Create a recorder writing to ``config.logs_dir / "traces.jsonl"``."""
+        return cls(Path(config.logs_dir) / "traces.jsonl")
+
+    def on_flow_start(self, run_id: str, flow_name: str, store: Any) -> None:  # noqa: ARG002
+        """Open the flow span of a run."""
+        span = {
+            "kind": "flow",
+            "run_id": run_id,
+            "name": flow_name,
+            "timestamp": time.time(),
+            "start": time.monotonic(),
+        }
+        with self._lock:
+            self._runs[run_id] = {"flow": span, "spans": []}
+
+    def on_phase(
+        self, run_id: str, node_id: str, phase: str, timing: PhaseTiming
+    ) -> None:
+        """Record a phase span."""
+        self._add(
+            run_id,
+            {
+                "kind": "phase",
+                "run_id": run_id,
+                "name": phase,
+                "node": node_id,
+                "start": timing.start,
+                "duration": timing.wall,
+                "cpu": timing.cpu,
+            },
+        )
+
+    def on_node_end(self, run_id: str, node_id: str, store: Any, wall: float) -> None:
+        """Record a node span."""
+        self._add(
+            run_id,
+            {
+                "kind": "node",
+                "run_id": run_id,
+                "name": node_id,
+                "start": time.monotonic() - wall,
+                "duration": wall,
+                "action": store.get("action"),
+            },
+        )
+
+    def on_error(self, run_id: str, node_id: str | None, error: str) -> None:
+        """Attach an error to the flow span."""
+        run = self._runs.get(run_id)
+        if run is not None:
+            run["flow"].setdefault("errors", []).append(
+                {"node": node_id, "error": error}
+            )
+
+    def on_flow_end(self, run_id: str, flow_name: str, store: Any) -> None:  # noqa: ARG002
+        """Close the flow span and export the run's spans."""
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+
+        flow = run["flow"]
+        flow["duration"] = time.monotonic() - flow["start"]
+        flow["steps"] = store.get("_flow_steps")
+        flow["completed"] = store.get("_flow_completed")
+        lines = [json.dumps(span, default=str) for span in [flow, *run["spans"]]]
+        with self._lock, self.path.open("a", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+
+    def _add(self, run_id: str, span: dict[str, Any]) -> None:
+        """Buffer a span for its run."""
+        run = self._runs.get(run_id)
+        if run is not None:
+            with self._lock:
+                run["spans"].append(span)
@@ -0,0 +1,262 @@
+"""Incremental re-execution of flows.
+
+A run started with ``BaseFlow.run(store, record=True)`` records, for every
+step, which store keys the node read and what it wrote, and keeps the
+record with a copy of the initial store in ``_flow_trace``. ``rerun`` then
+re-evaluates the flow for changed inputs without running every node again:
+
+    result = flow.run({"document": text, "style": "short"}, record=True)
+    result = flow.rerun(result, {"style": "long"})
+
+Steps are matched with the recorded run position by position. A step whose
+node read none of the changed keys is replayed: its recorded writes are
+applied and the node does not run. Other steps run again, and the keys they
+write become changed only if the new values differ from the recorded ones
+(compared with ``==``), so unaffected downstream nodes are still replayed.
+Once the run takes a different path than the recorded one, every further
+step runs.
+
+Reads are tracked with a proxy around the store; keys the node wrote before
+reading them are not inputs. Nodes that iterate over the whole store, fork
+it (fan-outs, timeouts, hedging) or copy it (nodes running in worker
+processes) are treated as reading everything and always run again. Keys
+starting with ``_flow_`` belong to the engine and are not tracked.
+
+Only side-effect-free nodes should be replayed: a replayed node does not
+run at all, and its writes are the objects recorded by the earlier run.
+"""
+
+from collections.abc import Iterable, Iterator, Mapping, MutableMapping
+from dataclasses import dataclass
+from typing import Any
+
+from src.flows.parallel import fork_store
+
+TRACE_KEY = "_flow_trace"
+_ENGINE_PREFIX = "_flow_"
+_MISSING = object()
+
+
+@dataclass(frozen=True)
+class StepRecord:
+    """Keys one step read and wrote.
+
+    Attributes:
+        node_id: ID of the node (or fan-out) that ran
+        reads: Keys the step read before writing them, or None if it may
+            have read every key
+        writes: Values the step wrote
+        deleted: Keys the step deleted
+    """
+
+    node_id: str
+    reads: frozenset[str] | None
+    writes: dict[str, Any]
+    deleted: frozenset[str]
+
+
+@dataclass
+class RunTrace:
+    """Record of a run, kept in ``store["_flow_trace"]``.
+
+    Attributes:
+        initial: Copy of the store the run started with
+        steps: One record per step, in order
+        replayed: Number of steps replayed instead of run
+    """
+
+    initial: Any
+    steps: list[StepRecord]
+    replayed: int = 0
+
+
+class ReadTracker(MutableMapping):
+    """Store proxy recording the keys a node reads and writes."""
+
+    __slots__ = ("read_all", "reads", "store", "written")
+
+    def __init__(self, store: Any):
+        """Wrap a store.
+
+        Args:
+            store: The store the node runs on
+        """
+        self.store = store
+        self.reads: set[str] = set()
+        self.written: dict[str, None] = {}  # Used as a set kept in write order
+        self.read_all = False
+
+    def _read(self, key: str) -> None:
+        if key not in self.written:
+            self.reads.add(key)
+
+    def __getitem__(self, key: str) -> Any:
+        """Record the read and look the key up."""
+        self._read(key)
+        return self.store[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Record the read and look the key up."""
+        self._read(key)
+        return self.store.get(key, default)
+
+    def __contains__(self, key: object) -> bool:
+        """Record the read and check for the key."""
+        self._read(key)  # type: ignore[arg-type]
+        return key in self.store
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        """Record the write and apply it."""
+        self.written[key] = None
+        self.store[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        """Record the deletion and apply it."""
+        self.written[key] = None
+        del self.store[key]
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterating reveals every key, so it counts as reading them all."""
+        self.read_all = True
+        return iter(self.store)
+
+    def __len__(self) -> int:
+        """Number of keys, which counts as reading them all."""
+        self.read_all = True
+        return len(self.store)
+
+    def fork(self) -> Any:
+        """Fork the underlying store; the fork may read every key."""
+        self.read_all = True
+        return fork_store(self.store)
+
+
+def _same(old: Any, new: Any) -> bool:
+    """Check whether a rewritten value equals the recorded one."""
+    if old is new:
+        return True
+    try:
+        return bool(old == new)
+    except Exception:
+        return False
+
+
+class IncrementalRun:
+    """Decides which steps of a run to replay and records the others."""
+
+    def __init__(self, previous: RunTrace | None, changed: Iterable[str]):
+        """Initialize the run.
+
+        Args:
+            previous: Trace of the run to reuse steps from, or None to run
+                and record every step
+            changed: Keys whose values differ from the recorded run
+        """
+        self.previous = [] if previous is None else previous.steps
+        self.dirty = set(changed)
+        self.steps: list[StepRecord] = []
+        self.replayed = 0
+        self._aligned = previous is not None
+
+    def _recorded(self, node_id: str) -> StepRecord | None:
+        """The recorded step at the current position, if it ran the same node."""
+        position = len(self.steps)
+        if self._aligned and position < len(self.previous):
+            record = self.previous[position]
+            if record.node_id == node_id:
+                return record
+        self._aligned = False  # The run took a different path
+        return None
+
+    def replay(self, node_id: str, store: Any) -> bool:
+        """Apply the recorded step if none of its inputs changed.
+
+        Returns:
+            True if the step was replayed and the node must not run
+        """
+        record = self._recorded(node_id)
+        if record is None:
+            return False
+        if record.reads is None or not self.dirty.isdisjoint(record.reads):
+            return False
+
+        for key, value in record.writes.items():
+            store[key] = value
+        for key in record.deleted:
+            store.pop(key, None)
+        self.steps.append(record)
+        self.replayed += 1
+        return True
+
+    def record(self, node_id: str, tracker: ReadTracker, result: Any) -> Any:
+        """Record a step that ran and mark the keys it changed.
+
+        Args:
+            node_id: ID of the node that ran
+            tracker: Proxy the node ran on
+            result: Store returned by the node
+
+        Returns:
+            The store to continue the run with
+        """
+        if result is tracker:
+            store = tracker.store
+            written = tracker.written
+        else:
+            # A node returning another store may have changed any key
+            store = result
+            written = set(store).union(tracker.written)
+        writes = {}
+        deleted = set()
+        for key in written:
+            if key.startswith(_ENGINE_PREFIX):
+                continue
+            value = store.get(key, _MISSING)
+            if value is _MISSING:
+                deleted.add(key)
+            else:
+                writes[key] = value
+        reads = None
+        if not tracker.read_all:
+            reads = frozenset(
+                key for key in tracker.reads if not key.startswith(_ENGINE_PREFIX)
+            )
+
+        previous = self._recorded(node_id)
+        if previous is None:
+            self.dirty.update(writes, deleted)
+        else:
+            old_writes = previous.writes
+            for key, value in writes.items():
+                if not _same(old_writes.get(key, _MISSING), value):
+                    self.dirty.add(key)
+            self.dirty.update(key for key in old_writes if key not in writes)
+            self.dirty.update(deleted.symmetric_difference(previous.deleted))
+
+        self.steps.append(StepRecord(node_id, reads, writes, frozenset(deleted)))
+        return store
+
+
+def start_rerun(
+    previous_result: Mapping[str, Any], changed_keys: Mapping[str, Any]
+) -> tuple[Any, IncrementalRun]:
+    """Build the initial store and replay state of a rerun.
+
+    Args:
+        previous_result: Final store of a recorded run
+        changed_keys: New values of the input keys that changed
+
+    Returns:
+        Tuple of (initial store, incremental run)
+
+    Raises:
+        ValueError: If the previous run was not recorded
+    """
+    trace = previous_result.get(TRACE_KEY)
+    if not isinstance(trace, RunTrace):
+        msg = "Only runs started with record=True can be rerun"
+        raise ValueError(msg)
+
+    store = fork_store(trace.initial)
+    store.update(changed_keys)
+    return store, IncrementalRun(trace, changed_keys)
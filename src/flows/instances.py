@@ -0,0 +1,219 @@
+"""Node instance lifecycle management for PocketFlow flows.
+
+Each ``FlowNode`` declares an instance scope that controls how ``BaseFlow``
+obtains node instances:
+
+- ``step``: a new instance for every visit (the default)
+- ``run``: one instance per ``BaseFlow.run`` call, reused on revisits
+- ``flow``: one instance shared by every run of the flow
+- ``pooled``: instances borrowed from a bounded, thread-safe pool
+
+Scopes other than ``step`` share instances between visits, so nodes using
+them must not keep per-run state on ``self``. Nodes in ``flow`` scope are
+also shared between concurrent runs and must be thread-safe.
+"""
+
+import asyncio
+import threading
+from collections import deque
+from typing import Any
+
+STEP_SCOPE = "step"
+RUN_SCOPE = "run"
+FLOW_SCOPE = "flow"
+POOLED_SCOPE = "pooled"
+
+NODE_SCOPES = frozenset({STEP_SCOPE, RUN_SCOPE, FLOW_SCOPE, POOLED_SCOPE})
+
+
+class NodeProvider:
+    """Hands out node instances for one node of a flow.
+
+    The base provider implements the ``step`` scope.
+    """
+
+    def __init__(self, node_class: type):
+        """Initialize the provider for a node class."""
+        self.node_class = node_class
+
+    def acquire(self, run_nodes: dict[Any, Any]) -> Any:  # noqa: ARG002
+        """Get a node instance.
+
+        Args:
+            run_nodes: Per-run instance cache owned by the calling run
+
+        Returns:
+            A node instance ready to run
+        """
+        return self.node_class()
+
+    def release(self, node: Any) -> None:
+        """Return a node instance obtained from ``acquire``."""
+
+    def discard(self, node: Any, run_nodes: dict[Any, Any]) -> None:
+        """Give up an instance that is still in use, such as by a timed-out step.
+
+        The instance is never handed out again.
+        """
+
+
+class RunScopeProvider(NodeProvider):
+    """One instance per flow run."""
+
+    def acquire(self, run_nodes: dict[Any, Any]) -> Any:
+        """Get the run's instance, creating it on first use."""
+        node = run_nodes.get(self)
+        if node is None:
+            node = run_nodes[self] = self.node_class()
+        return node
+
+    def discard(self, node: Any, run_nodes: dict[Any, Any]) -> None:
+        """Create a new instance for the rest of the run."""
+        if run_nodes.get(self) is node:
+            del run_nodes[self]
+
+
+class FlowScopeProvider(NodeProvider):
+    """One instance shared by every run of the flow."""
+
+    def __init__(self, node_class: type):
+        """Initialize the provider for a node class."""
+        super().__init__(node_class)
+        self._node: Any = None
+        self._lock = threading.Lock()
+
+    def acquire(self, run_nodes: dict[Any, Any]) -> Any:  # noqa: ARG002
+        """Get the shared instance, creating it on first use."""
+        node = self._node
+        if node is None:
+            with self._lock:
+                if self._node is None:
+                    self._node = self.node_class()
+                node = self._node
+        return node
+
+    def discard(self, node: Any, run_nodes: dict[Any, Any]) -> None:  # noqa: ARG002
+        """Create a new shared instance on next use."""
+        with self._lock:
+            if self._node is node:
+                self._node = None
+
+
+class PooledProvider(NodeProvider):
+    """Instances borrowed from a bounded pool.
+
+    At most ``max_size`` instances exist at any time. When all of them are
+    in use, ``acquire`` blocks until one is released; ``acquire_async``
+    waits on the event loop instead, so async flows never park a thread
+    on an exhausted pool. Released instances go to async waiters first.
+    """
+
+    def __init__(self, node_class: type, max_size: int):
+        """Initialize the provider for a node class.
+
+        Args:
+            node_class: Node class to instantiate
+            max_size: Maximum number of live instances
+        """
+        super().__init__(node_class)
+        self.max_size = max_size
+        self._idle: list[Any] = []
+        self._created = 0
+        self._available = threading.Condition()
+        # Futures of acquire_async calls waiting for an instance
+        self._waiters: deque[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+
+    @property
+    def size(self) -> int:
+        """Number of instances created so far."""
+        return self._created
+
+    def try_acquire(self) -> Any | None:
+        """Get an instance without blocking, or None if the pool is exhausted."""
+        with self._available:
+            return self._take()
+
+    def acquire(self, run_nodes: dict[Any, Any]) -> Any:  # noqa: ARG002
+        """Borrow an instance, waiting for one if the pool is exhausted."""
+        with self._available:
+            node = self._take()
+            while node is None:
+                self._available.wait()
+                node = self._take()
+            return node
+
+    async def acquire_async(self, run_nodes: dict[Any, Any]) -> Any:  # noqa: ARG002
+        """Borrow an instance, waiting on the event loop if the pool is exhausted."""
+        with self._available:
+            node = self._take()
+            if node is not None:
+                return node
+            loop = asyncio.get_running_loop()
+            waiter = loop.create_future()
+            self._waiters.append((loop, waiter))
+        try:
+            return await waiter
+        except asyncio.CancelledError:
+            with self._available:
+                if (loop, waiter) in self._waiters:
+                    self._waiters.remove((loop, waiter))
+            if waiter.done() and not waiter.cancelled():
+                self.release(waiter.result())
+            raise
+
+    def release(self, node: Any) -> None:
+        """Return a borrowed instance to the pool."""
+        with self._available:
+            if not self._hand_over(node):
+                self._idle.append(node)
+                self._available.notify()
+
+    def discard(self, node: Any, run_nodes: dict[Any, Any]) -> None:  # noqa: ARG002
+        """Free the instance's slot so the pool can create a replacement."""
+        with self._available:
+            self._created -= 1
+            if self._waiters:
+                replacement = self._take()
+                if replacement is not None and not self._hand_over(replacement):
+                    self._idle.append(replacement)
+            self._available.notify()
+
+    def _hand_over(self, node: Any) -> bool:
+        """Pass an instance to the oldest async waiter. Caller holds the lock."""
+        while self._waiters:
+            loop, waiter = self._waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(self._resolve, waiter, node)
+            except RuntimeError:
+                continue  # The waiter's loop is closed
+            return True
+        return False
+
+    def _resolve(self, waiter: asyncio.Future, node: Any) -> None:
+        """Complete a waiter on its loop, or take the instance back."""
+        if waiter.done():
+            self.release(node)
+        else:
+            waiter.set_result(node)
+
+    def _take(self) -> Any | None:
+        """Pop an idle instance or create one. Caller holds the lock."""
+        if self._idle:
+            return self._idle.pop()
+        if self._created < self.max_size:
+            node = self.node_class()
+            self._created += 1
+            return node
+        return None
+
+
+def make_provider(node_config: Any) -> NodeProvider:
+    """Create the provider for a ``FlowNode`` according to its scope."""
+    scope = node_config.scope
+    if scope == RUN_SCOPE:
+        return RunScopeProvider(node_config.node_class)
+    if scope == FLOW_SCOPE:
+        return FlowScopeProvider(node_config.node_class)
+    if scope == POOLED_SCOPE:
+        return PooledProvider(node_config.node_class, node_config.pool_size)
+    return NodeProvider(node_config.node_class)
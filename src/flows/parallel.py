@@ -0,0 +1,304 @@
+"""Fan-out transitions and branch merging for PocketFlow flows.
+
+A transition can target a ``FanOut`` instead of a single node ID. The flow
+then runs every branch concurrently on its own copy of the store. Each
+branch runs from its target until it transitions to the join node (or ends),
+and the join node's class decides how long to wait and how to merge:
+
+    "fetch": FlowNode(
+        FetchNode,
+        transitions={"success": FanOut(["lookup", "classify"], join="merge")},
+    ),
+    "lookup": FlowNode(LookupNode, transitions={"success": "merge"}),
+    "classify": FlowNode(ClassifyNode, transitions={"success": "merge"}),
+    "merge": FlowNode(MergeNode, transitions={"success": "end"}),
+
+Branches get a shallow copy of the store, so values they replace are
+isolated, but in-place mutation of shared objects is visible to all
+branches. Nodes running in branches should assign new values instead.
+
+Sync flows run each branch on a daemon thread. A branch the join stops
+waiting for (``wait="any"`` or a timeout) cannot be stopped: it runs on in
+the background and its result is ignored, but it does not keep the
+interpreter from exiting.
+"""
+
+import time
+from collections.abc import Iterable, Mapping, MutableMapping
+from dataclasses import dataclass, field
+from typing import Any
+
+from src.nodes.base import JoinNode
+
+# Keys that every branch writes, or that belong to the flow engine.
+# They are never merged back from branches.
+UNMERGED_KEYS = frozenset({"action", "error", "error_node", "_join"})
+
+WAIT_ALL = "all"
+WAIT_ANY = "any"
+CONFLICT_POLICIES = frozenset({"error", "first", "last"})
+
+_MISSING = object()
+
+
+@dataclass(frozen=True, init=False)
+class FanOut:
+    """Transition target that runs several branches concurrently.
+
+    Attributes:
+        targets: Node IDs where the branches start
+        join: Node ID of the ``JoinNode`` the branches lead to
+    """
+
+    targets: tuple[str, ...]
+    join: str
+
+    def __init__(self, targets: Iterable[str], join: str):
+        """Create a fan-out.
+
+        Args:
+            targets: Node IDs where the branches start, in branch order
+            join: Node ID of the ``JoinNode`` the branches lead to
+        """
+        object.__setattr__(self, "targets", tuple(targets))
+        object.__setattr__(self, "join", join)
+
+    def __str__(self) -> str:
+        """Format as ``[a | b] => join`` for visualizations."""
+        return f"[{' | '.join(self.targets)}] => {self.join}"
+
+
+@dataclass(frozen=True)
+class CompiledFanOut:
+    """Fan-out resolved against an execution plan.
+
+    Attributes:
+        branches: Node indices where the branches start
+        join: Node index of the join node
+        required: Number of branches that must succeed
+        timeout: Seconds to wait for branches, or None
+        conflict_policy: Conflict policy of the join node
+    """
+
+    branches: tuple[int, ...]
+    join: int
+    required: int
+    timeout: float | None
+    conflict_policy: Any
+
+
+@dataclass
+class BranchResult:
+    """Outcome of one fan-out branch.
+
+    Attributes:
+        store: The branch's copy of the store after it finished
+        path: Node IDs visited by the branch
+        ok: True if the branch reached the join node (or ended) cleanly
+    """
+
+    store: Any
+    path: list[str] = field(default_factory=list)
+    ok: bool = True
+
+
+def required_branches(wait: str | int, branch_count: int) -> int:
+    """Number of branches a join must wait for."""
+    if wait == WAIT_ALL:
+        return branch_count
+    if wait == WAIT_ANY:
+        return 1
+    if isinstance(wait, int) and 1 <= wait <= branch_count:
+        return wait
+    msg = f"Join wait must be 'all', 'any' or 1..{branch_count}, got {wait!r}"
+    raise ValueError(msg)
+
+
+def fork_store(store: Any) -> Any:
+    """Create a branch-local copy of the store."""
+    fork = getattr(store, "fork", None)
+    if fork is not None:
+        return fork()
+    return dict(store)
+
+
+def store_delta(base: Mapping[str, Any], branch: Mapping[str, Any]) -> tuple:
+    """Compute the writes and deletions a branch made relative to ``base``.
+
+    Values are compared by identity, so a value counts as written when it
+    was replaced (even by an equal value), not when it was mutated in place.
+
+    Returns:
+        Tuple of (written key/value dict, set of deleted keys)
+    """
+    delta = getattr(branch, "delta_since", None)
+    if delta is not None:
+        return delta(base)
+
+    writes = {
+        key: value
+        for key, value in branch.items()
+        if base.get(key, _MISSING) is not value
+    }
+    deleted = {key for key in base if key not in branch}
+    return writes, deleted
+
+
+def apply_store_delta(store: Any, fork: Mapping[str, Any]) -> Any:
+    """Copy the writes and deletions made on a fork of ``store`` back into it."""
+    writes, deleted = store_delta(store, fork)
+    store.update(writes)
+    for key in deleted:
+        store.pop(key, None)
+    return store
+
+
+class JoinState:
+    """Tracks branch completion while a fan-out is waiting."""
+
+    def __init__(self, fanout: CompiledFanOut):
+        """Start tracking a fan-out."""
+        self.fanout = fanout
+        self.results: list[BranchResult | None] = [None] * len(fanout.branches)
+        self.succeeded = 0
+        self.finished = 0
+        self.deadline = (
+            None if fanout.timeout is None else time.monotonic() + fanout.timeout
+        )
+
+    def record(self, branch: int, result: BranchResult) -> None:
+        """Record the result of a finished branch."""
+        self.results[branch] = result
+        self.finished += 1
+        if result.ok:
+            self.succeeded += 1
+
+    @property
+    def done(self) -> bool:
+        """True once the join is satisfied or can no longer be satisfied."""
+        remaining = len(self.results) - self.finished
+        required = self.fanout.required
+        return self.succeeded >= required or self.succeeded + remaining < required
+
+    def remaining_time(self) -> float | None:
+        """Seconds left until the join times out, or None without a timeout."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+
+def _is_mergeable(key: str) -> bool:
+    """Check whether a key written by a branch is merged into the store."""
+    return key not in UNMERGED_KEYS and not key.startswith("_flow")
+
+
+def _resolve_conflict(policy: Any, key: str, values: list[Any]) -> Any:
+    """Pick the merged value for a key written differently by branches."""
+    if policy == "first":
+        return values[0]
+    if policy == "last":
+        return values[-1]
+    return policy(key, values)
+
+
+def _all_equal(values: list[Any]) -> bool:
+    """Check whether all values compare equal."""
+    first = values[0]
+    try:
+        return all(value is first or value == first for value in values[1:])
+    except Exception:
+        # Values that cannot be compared are treated as conflicting
+        return False
+
+
+def merge_branches(
+    store: Any, state: JoinState, branch_ids: list[str]
+) -> MutableMapping[str, Any]:
+    """Merge the writes of successful branches back into ``store``.
+
+    Args:
+        store: The store the branches were forked from (updated in place)
+        state: Join state holding the branch results
+        branch_ids: Node IDs where the branches started, for reporting
+
+    Returns:
+        The ``_join`` status dictionary (also written to the store)
+    """
+    writes: dict[str, list[Any]] = {}
+    deleted: set[str] = set()
+    completed, failed, pending, path = [], {}, [], []
+
+    for branch_id, result in zip(branch_ids, state.results, strict=True):
+        if result is None:
+            pending.append(branch_id)
+            continue
+
+        path.extend(result.path)
+        if not result.ok:
+            failed[branch_id] = result.store.get("error", "unknown error")
+            continue
+
+        completed.append(branch_id)
+        branch_writes, branch_deleted = store_delta(store, result.store)
+        for key, value in branch_writes.items():
+            if _is_mergeable(key):
+                writes.setdefault(key, []).append(value)
+        deleted.update(key for key in branch_deleted if _is_mergeable(key))
+
+    conflicts = []
+    policy = state.fanout.conflict_policy
+    for key, values in writes.items():
+        if len(values) == 1 or _all_equal(values):
+            store[key] = values[0]
+        elif policy == "error":
+            conflicts.append(key)
+        else:
+            store[key] = _resolve_conflict(policy, key, values)
+
+    for key in deleted - writes.keys():
+        store.pop(key, None)
+
+    join = {
+        "completed": completed,
+        "failed": failed,
+        "pending": pending,
+        "conflicts": conflicts,
+        "satisfied": state.succeeded >= state.fanout.required,
+        # Waiting only stops before the join is decided when it times out
+        "timed_out": not state.done,
+        "path": path,
+    }
+    store["_join"] = join
+
+    if conflicts:
+        store["action"] = "error"
+        store["error"] = f"Conflicting branch writes to keys: {sorted(conflicts)}"
+
+    return join
+
+
+def validate_fanout(node_id: str, fanout: FanOut, flow_definition: Mapping) -> None:
+    """Validate a fan-out transition of ``node_id``.
+
+    Raises:
+        ValueError: If the fan-out is malformed
+    """
+    if not fanout.targets:
+        msg = f"Node '{node_id}' has a fan-out without targets"
+        raise ValueError(msg)
+
+    for target in (*fanout.targets, fanout.join):
+        if target not in flow_definition:
+            msg = f"Node '{node_id}' has a fan-out pointing to unknown node '{target}'"
+            raise ValueError(msg)
+
+    join_class = flow_definition[fanout.join].node_class
+    if not (isinstance(join_class, type) and issubclass(join_class, JoinNode)):
+        msg = f"Fan-out join node '{fanout.join}' must be a JoinNode"
+        raise ValueError(msg)
+
+    required_branches(join_class.wait, len(fanout.targets))
+    policy = join_class.conflict_policy
+    if not (callable(policy) or policy in CONFLICT_POLICIES):
+        msg = f"Join node '{fanout.join}' has unknown conflict policy {policy!r}"
+        raise ValueError(msg)
@@ -0,0 +1,357 @@
+"""Compact recording of the nodes a flow run visited.
+
+``store["_flow_path"]`` used to be a list of node ID strings with one entry
+per step, grown for the whole run. While a flow runs, ``FlowPath`` records
+the same sequence as node indices in small ``array``s, encoded as segments
+that each repeat a cycle of nodes: a node that loops on itself, or a
+polling loop that alternates between a few nodes, costs one segment however
+many times it goes round, and the pickled path is a few bytes per segment.
+
+Appends go to a short list of node IDs that is encoded in bulk every
+``_FLUSH_AFTER`` steps; a batch that goes on repeating the current cycle is
+checked with a single list comparison.
+
+With a ``limit``, the path works as a ring buffer that keeps only the last
+``limit`` steps; ``total`` still counts every step.
+
+``FlowPath`` is a read-only ``Sequence`` of node IDs decoded on access, so
+readers of a flow's store keep working: iteration, ``len``, indexing,
+``in``, and comparison with lists all behave as for a list. Result stores
+keep the ``FlowPath`` too, so pickled results stay small; ``to_list()``
+decodes it into a plain list for callers that need one, such as for JSON.
+"""
+
+from array import array
+from bisect import bisect_right
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from itertools import cycle, islice
+from typing import Any
+
+# Encode pending appends once this many have piled up
+_FLUSH_AFTER = 256
+# Longest cycle recognized when a segment of distinct visits repeats its end
+_MAX_PERIOD = 8
+# Segments of visits that do not repeat are closed at this length
+_MAX_LITERAL = 64
+# Compact the arrays once this many trimmed segments have piled up in front
+_COMPACT_AFTER = 64
+
+
+# Array typecodes for node indices, smallest first, with the nodes they fit
+_CODE_TYPES = (("B", 1 << 8), ("H", 1 << 16), ("I", 1 << 32))
+
+
+def _code_type(count: int) -> str:
+    """Smallest array typecode for the indices of ``count`` nodes."""
+    for typecode, size in _CODE_TYPES:
+        if count <= size:
+            return typecode
+    msg = f"Too many nodes to record: {count}"
+    raise ValueError(msg)
+
+
+class FlowPath(Sequence):
+    """Cycle-encoded sequence of visited node IDs."""
+
+    def __init__(
+        self,
+        names: Sequence[str] = (),
+        lookup: Mapping[str, int] | None = None,
+        *,
+        limit: int | None = None,
+    ):
+        """Initialize an empty path.
+
+        Args:
+            names: Node IDs indexed by node index
+            lookup: Mapping of node ID to index (built from ``names`` if
+                omitted); neither is copied or changed
+            limit: Keep only the last ``limit`` steps, or None to keep all
+        """
+        if limit is not None and limit < 1:
+            msg = "limit must be at least 1"
+            raise ValueError(msg)
+
+        self.limit = limit
+        self._names: Sequence[str] = names
+        self._lookup: Mapping[str, int] = (
+            lookup
+            if lookup is not None
+            else {name: index for index, name in enumerate(names)}
+        )
+        # Segment i repeats the cycle _codes[_offsets[i]:_offsets[i + 1]]
+        # from absolute step _bases[i]; the last segment is still open
+        self._codes = array(_code_type(len(self._names)))
+        self._offsets = array("I")
+        self._bases = array("Q")
+        self._total = 0  # Steps encoded so far
+        self._tail: list[str] = []  # Node IDs appended but not encoded yet
+        self._first = 0  # First segment that is still retained
+        self._start = 0  # Absolute step of the first retained step
+
+    @property
+    def total(self) -> int:
+        """Number of steps recorded, including steps dropped by ``limit``."""
+        return self._total + len(self._tail)
+
+    @property
+    def runs(self) -> int:
+        """Number of retained segments."""
+        self._flush()
+        return len(self._offsets) - self._first
+
+    def append(self, node_id: str) -> None:
+        """Record a visit to a node."""
+        tail = self._tail
+        tail.append(node_id)
+        if len(tail) >= _FLUSH_AFTER:
+            self._flush()
+
+    def extend(self, node_ids: Iterable[str]) -> None:
+        """Record visits to several nodes, in order."""
+        self._tail.extend(node_ids)
+        if len(self._tail) >= _FLUSH_AFTER:
+            self._flush()
+
+    def to_list(self) -> list[str]:
+        """Decode the retained steps into a list of node IDs."""
+        if not self._offsets:
+            # Nothing encoded yet: the retained steps are the pending ones
+            tail = self._tail
+            return tail[-self.limit :] if self.limit is not None else tail[:]
+        steps: list[str] = []
+        for names, phase, count in self._segments():
+            repeats = (phase + count) // len(names) + 1
+            steps.extend((names * repeats)[phase : phase + count])
+        return steps
+
+    def __len__(self) -> int:
+        """Number of retained steps."""
+        self._flush()
+        return self._total - self._start
+
+    def __iter__(self) -> Iterator[str]:
+        """Decode the retained steps lazily, oldest first."""
+        for names, phase, count in self._segments():
+            yield from islice(cycle(names), phase, phase + count)
+
+    def __getitem__(self, item: Any) -> Any:
+        """Return the node ID of a step (or a list of them for slices)."""
+        if isinstance(item, slice):
+            return self.to_list()[item]
+
+        length = len(self)
+        if item < 0:
+            item += length
+        if not 0 <= item < length:
+            msg = "FlowPath index out of range"
+            raise IndexError(msg)
+        step = self._start + item
+        segment = bisect_right(self._bases, step, lo=self._first) - 1
+        offset = self._offsets[segment]
+        period = self._cycle_end(segment) - offset
+        code = self._codes[offset + (step - self._bases[segment]) % period]
+        return self._names[code]
+
+    def __contains__(self, node_id: object) -> bool:
+        """Check whether a node was visited among the retained steps."""
+        if node_id not in self._lookup:
+            return False
+        for names, phase, count in self._segments():
+            visited = (
+                names
+                if count >= len(names)
+                else islice(cycle(names), phase, phase + count)
+            )
+            if node_id in visited:
+                return True
+        return False
+
+    def __eq__(self, other: object) -> bool:
+        """Compare with another path, list or tuple of node IDs."""
+        if isinstance(other, (FlowPath, list, tuple)):
+            return len(self) == len(other) and all(
+                a == b for a, b in zip(self, other, strict=True)
+            )
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        """Show the decoded steps."""
+        return f"{self.__class__.__name__}({self.to_list()!r})"
+
+    def __reduce__(self) -> tuple:
+        """Pickle the encoded segments, not the decoded steps."""
+        self._flush()
+        first = self._first
+        shift = self._offsets[first] if first < len(self._offsets) else 0
+        return (
+            _restore_path,
+            (
+                self._names,
+                self.limit,
+                (
+                    self._codes[shift:],
+                    array("I", [offset - shift for offset in self._offsets[first:]]),
+                    self._bases[first:],
+                    self._total,
+                    self._start,
+                ),
+            ),
+        )
+
+    def _cycle_end(self, segment: int) -> int:
+        """Offset in ``_codes`` just past a segment's cycle."""
+        offsets = self._offsets
+        return offsets[segment + 1] if segment + 1 < len(offsets) else len(self._codes)
+
+    def _segments(self) -> Iterator[tuple[list[str], int, int]]:
+        """Yield ``(cycle names, phase, steps)`` of each retained segment."""
+        self._flush()
+        names, codes, offsets, bases = (
+            self._names,
+            self._codes,
+            self._offsets,
+            self._bases,
+        )
+        last = len(offsets) - 1
+        for segment in range(self._first, last + 1):
+            begin = max(bases[segment], self._start)
+            end = bases[segment + 1] if segment < last else self._total
+            cycle_codes = codes[offsets[segment] : self._cycle_end(segment)]
+            phase = (begin - bases[segment]) % len(cycle_codes)
+            yield [names[code] for code in cycle_codes], phase, end - begin
+
+    def _flush(self) -> None:
+        """Encode the pending appends."""
+        tail = self._tail
+        if not tail:
+            return
+        self._tail = []
+
+        if self._offsets:
+            # Fast path: the batch goes on repeating the open segment's cycle
+            names = self._names
+            ring = [names[code] for code in self._codes[self._offsets[-1] :]]
+            phase = (self._total - self._bases[-1]) % len(ring)
+            ring = ring[phase:] + ring[:phase]
+            count = len(tail)
+            if (ring * (count // len(ring) + 1))[:count] == tail:
+                self._total += count
+                self._trim()
+                return
+
+        if not self._offsets and self._open_cycle(tail):
+            self._trim()
+            return
+
+        lookup = self._lookup
+        for node_id in tail:
+            code = lookup.get(node_id)
+            if code is None:
+                code = self._add_name(node_id)
+                lookup = self._lookup
+            self._push(code)
+        self._trim()
+
+    def _open_cycle(self, tail: list[str]) -> bool:
+        """Encode the first batch in one go if it repeats a short cycle."""
+        count = len(tail)
+        for period in range(1, min(_MAX_PERIOD, count // 2) + 1):
+            if tail[period:] == tail[:-period]:
+                lookup = self._lookup
+                if any(node_id not in lookup for node_id in tail[:period]):
+                    return False
+                self._offsets.append(0)
+                self._codes.extend(lookup[node_id] for node_id in tail[:period])
+                self._bases.append(0)
+                self._total = count
+                return True
+        return False
+
+    def _add_name(self, node_id: str) -> int:
+        """Give an index to a node ID that was not known up front."""
+        # Copied rather than changed in place, as they may be shared
+        code = len(self._names)
+        self._names = [*self._names, node_id]
+        self._lookup = {**self._lookup, node_id: code}
+        typecode = _code_type(len(self._names))
+        if typecode != self._codes.typecode:
+            self._codes = array(typecode, self._codes)
+        return code
+
+    def _push(self, code: int) -> None:
+        """Encode one visit."""
+        codes = self._codes
+        if not self._offsets:
+            self._open(code)
+            return
+
+        start = self._offsets[-1]
+        period = len(codes) - start
+        steps = self._total - self._bases[-1]
+        if codes[start + steps % period] == code:
+            self._total += 1
+        elif steps >= 2 * period or (steps == period and period >= _MAX_LITERAL):
+            # The cycle went round at least twice, or the visits that did
+            # not repeat are long enough: close the segment
+            self._open(code)
+        else:
+            # The segment's visits did not repeat (fully): grow them
+            codes.extend(codes[start : start + steps - period])
+            self._grow(code)
+
+    def _open(self, code: int) -> None:
+        """Start a new segment with a visit."""
+        self._offsets.append(len(self._codes))
+        self._codes.append(code)
+        self._bases.append(self._total)
+        self._total += 1
+
+    def _grow(self, code: int) -> None:
+        """Add a visit to the open segment of non-repeating visits.
+
+        If the visits now end with a cycle that went round twice, the cycle
+        becomes a segment of its own.
+        """
+        codes = self._codes
+        codes.append(code)
+        self._total += 1
+        start = self._offsets[-1]
+        for period in range(1, min(_MAX_PERIOD, (len(codes) - start) // 2) + 1):
+            if codes[-period:] == codes[-2 * period : -period]:
+                cut = len(codes) - 2 * period
+                del codes[-period:]
+                if cut > start:
+                    self._offsets.append(cut)
+                    self._bases.append(self._total - 2 * period)
+                return
+
+    def _trim(self) -> None:
+        """Drop steps beyond ``limit`` from the front."""
+        if self.limit is None or self._total - self._start <= self.limit:
+            return
+        self._start = self._total - self.limit
+        bases = self._bases
+        while self._first + 1 < len(bases) and bases[self._first + 1] <= self._start:
+            self._first += 1
+
+        first = self._first
+        if first >= _COMPACT_AFTER and first * 2 >= len(bases):
+            shift = self._offsets[first]
+            del self._codes[:shift]
+            self._offsets = array(
+                "I", [offset - shift for offset in self._offsets[first:]]
+            )
+            del bases[:first]
+            self._first = 0
+
+
+def _restore_path(
+    names: list[str], limit: int | None, state: tuple[array, array, array, int, int]
+) -> FlowPath:
+    """Rebuild a pickled ``FlowPath`` from its encoded segments."""
+    path = FlowPath(names, limit=limit)
+    path._codes, path._offsets, path._bases, path._total, path._start = state
+    return path
@@ -0,0 +1,306 @@
+"""Compiled execution plans for PocketFlow flows.
+
+A flow definition is a mapping of string node IDs to ``FlowNode`` configs.
+Walking that mapping directly means every step pays for string-keyed dict
+lookups and the ``action``/``default``/``error`` fallback chain. The plan
+compiled here resolves all of that once, when the flow is constructed:
+
+- every node gets a dense integer index (``start`` is always ``0``)
+- every action used anywhere in the flow gets an integer action id
+- every node gets a transition table indexed by action id, with the
+  ``default``/``end``/``error`` fallbacks already applied
+
+At runtime, finding the next node is one dict lookup (action -> action id)
+and one tuple index.
+
+A node whose ``node_class`` is itself a flow (a sub-flow) is inlined: its
+nodes become nodes of the parent plan with namespaced IDs such as
+``greet.start``, and its transitions to ``end`` are resolved through the
+sub-flow node's own transitions for the same action. An error the
+sub-flow does not handle is handled by the sub-flow node's ``error``
+transition. Nested flows therefore cost nothing extra per step.
+"""
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any
+
+from src.flows.instances import STEP_SCOPE
+from src.flows.parallel import CompiledFanOut, FanOut, required_branches
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+    from src.flows.base import FlowNode
+
+# Sentinel targets. Node indices are always >= 0.
+END = -1  # Flow completed normally
+STOP = -2  # Flow stopped on an unhandled error
+
+# Actions that are always present in the action table
+DEFAULT_ACTION = "default"
+ERROR_ACTION = "error"
+TIMEOUT_ACTION = "timeout"
+
+# Stands for any action that no transition declares
+_UNKNOWN_ACTION = object()
+
+# Separator between a sub-flow node's ID and the IDs of its inlined nodes
+SUBFLOW_SEPARATOR = "."
+
+
+@dataclass(frozen=True)
+class CompiledNode:
+    """A single node in an execution plan.
+
+    Attributes:
+        index: Dense integer ID of the node
+        node_id: Original string ID from the flow definition
+        config: The ``FlowNode`` this node was compiled from, or None for
+            fan-out nodes
+        targets: Transition table indexed by action ID. The last slot holds
+            the fallback target used for actions not in the action table.
+        fanout: Branches to run concurrently, for fan-out nodes only
+        direct: The node runs as a plain ``node_class().run(store)``: it is
+            not a fan-out, gets a new instance every step, and is not
+            offloaded to a process, hedged or limited by a ``node_timeout``
+    """
+
+    index: int
+    node_id: str
+    config: "FlowNode | None"
+    targets: tuple[int, ...]
+    fanout: CompiledFanOut | None = None
+    direct: bool = False
+
+    @property
+    def node_class(self) -> Any:
+        """Node class from the original configuration."""
+        return self.config.node_class if self.config is not None else None
+
+
+@dataclass(frozen=True)
+class ExecutionPlan:
+    """Immutable, index-based form of a flow definition.
+
+    Attributes:
+        nodes: Compiled nodes, indexed by node index
+        actions: Action names, indexed by action ID
+        action_index: Mapping of action name to action ID
+        node_index: Mapping of node ID to node index
+    """
+
+    nodes: tuple[CompiledNode, ...]
+    actions: tuple[str, ...]
+    action_index: "Mapping[str, int]"
+    node_index: "Mapping[str, int]"
+
+    def next_index(self, node: CompiledNode, action: str) -> int:
+        """Resolve the target index for an action taken by a node."""
+        return node.targets[self.action_index.get(action, -1)]
+
+    def target_name(self, target: int) -> str:
+        """Return the node ID for a target index (``end`` for sentinels)."""
+        return self.nodes[target].node_id if target >= 0 else "end"
+
+
+def _resolve_target(
+    transitions: dict[str, Any], action: str, *, timeout_is_error: bool = False
+) -> Any:
+    """Apply the flow's transition rules for one action.
+
+    Args:
+        transitions: The node's transitions
+        action: Action taken by the node
+        timeout_is_error: Route ``timeout`` without a transition of its own
+            as an error, for nodes declaring ``node_timeout``; otherwise it
+            falls back like any other action
+
+    Returns the target node ID or ``FanOut``, or None if the flow should stop.
+    """
+    if action in transitions:
+        return transitions[action]
+    if action == TIMEOUT_ACTION and timeout_is_error:
+        # A timeout without a timeout transition is handled as an error
+        action = ERROR_ACTION
+        if action in transitions:
+            return transitions[action]
+    if action == ERROR_ACTION:
+        # An error without an error transition stops the flow
+        return None
+    return transitions.get(DEFAULT_ACTION, "end")
+
+
+def _runs_directly(config: "FlowNode") -> bool:
+    """Check whether a node needs nothing but ``node_class().run(store)``."""
+    node_class = config.node_class
+    return (
+        config.scope == STEP_SCOPE
+        and getattr(node_class, "node_timeout", None) is None
+        and getattr(node_class, "cpu_bound", False) is not True
+        and getattr(node_class, "hedge", False) is not True
+    )
+
+
+def subflow_definition(node_class: Any) -> "Mapping[str, FlowNode] | None":
+    """Return the definition of a sub-flow node, or None for regular nodes."""
+    if isinstance(node_class, type):
+        return None
+    return getattr(node_class, "flow_definition", None)
+
+
+# Resolves an action taken by a node to its target in the flattened flow
+Resolver = Callable[[Any], Any]
+
+
+def _flatten(
+    definition: "Mapping[str, FlowNode]",
+    prefix: str,
+    outer: Resolver | None,
+    nodes: dict[str, tuple["FlowNode", Resolver]],
+    actions: list[str],
+) -> None:
+    """Inline sub-flows, adding leaf nodes with their resolvers to ``nodes``.
+
+    Args:
+        definition: Flow definition to flatten
+        prefix: Namespace of the definition's node IDs
+        outer: Resolver of the enclosing sub-flow node, None at top level
+        nodes: Collects ``flat ID -> (FlowNode, resolver)``
+        actions: Collects every action declared anywhere
+    """
+
+    def entry(node_id: str) -> str:
+        """Flat ID of the first node run when entering ``node_id``."""
+        flat_id = prefix + node_id
+        inner = subflow_definition(definition[node_id].node_class)
+        while inner is not None:
+            flat_id += SUBFLOW_SEPARATOR + "start"
+            inner = subflow_definition(inner["start"].node_class)
+        return flat_id
+
+    def place(target: Any, action: Any) -> Any:
+        """Map a target of this definition into the flattened flow."""
+        if outer is not None:
+            if target is None:
+                # Errors the sub-flow does not handle go to its parent
+                return outer(ERROR_ACTION)
+            if target == "end":
+                return outer(action)
+        if target is None or target == "end":
+            return target
+        if isinstance(target, FanOut):
+            return FanOut([entry(t) for t in target.targets], join=entry(target.join))
+        return entry(target)
+
+    for node_id, config in definition.items():
+        for action in config.transitions:
+            if action not in actions:
+                actions.append(action)
+
+        def resolve(
+            action: Any,
+            transitions: dict[str, Any] = config.transitions,
+            *,
+            timeout_is_error: bool = (
+                getattr(config.node_class, "node_timeout", None) is not None
+            ),
+        ):
+            target = _resolve_target(
+                transitions, action, timeout_is_error=timeout_is_error
+            )
+            return place(target, action)
+
+        flat_id = prefix + node_id
+        inner = subflow_definition(config.node_class)
+        if inner is not None:
+            _flatten(inner, flat_id + SUBFLOW_SEPARATOR, resolve, nodes, actions)
+            continue
+
+        if flat_id in nodes:
+            msg = f"Node ID '{flat_id}' is defined more than once after inlining"
+            raise ValueError(msg)
+        nodes[flat_id] = (config, resolve)
+
+
+def compile_plan(flow_definition: "Mapping[str, FlowNode]") -> ExecutionPlan:
+    """Compile a validated flow definition into an execution plan.
+
+    Args:
+        flow_definition: Dictionary mapping node IDs to FlowNode configs
+
+    Returns:
+        The compiled execution plan
+    """
+    # Inline sub-flows and collect the actions declared at every level
+    flat: dict[str, tuple[FlowNode, Resolver]] = {}
+    actions = [DEFAULT_ACTION, ERROR_ACTION, TIMEOUT_ACTION]
+    _flatten(flow_definition, "", None, flat, actions)
+    action_index = {action: index for index, action in enumerate(actions)}
+
+    # Assign node indices, making sure the entry node is index 0
+    start = "start"
+    while start not in flat:
+        start += SUBFLOW_SEPARATOR + "start"
+    node_ids = [start] + [nid for nid in flat if nid != start]
+    node_index = {node_id: index for index, node_id in enumerate(node_ids)}
+
+    # Resolve every transition once; fallback slot last
+    resolved = {
+        node_id: [resolve(a) for a in actions] + [resolve(_UNKNOWN_ACTION)]
+        for node_id, (_, resolve) in flat.items()
+    }
+
+    # Fan-out targets become extra nodes after the regular ones
+    fanouts: dict[FanOut, int] = {}
+    for targets in resolved.values():
+        for target in targets:
+            if isinstance(target, FanOut) and target not in fanouts:
+                fanouts[target] = len(node_ids) + len(fanouts)
+
+    def to_index(target: Any) -> int:
+        if target is None:
+            return STOP
+        if isinstance(target, FanOut):
+            return fanouts[target]
+        if target == "end":
+            return END
+        return node_index[target]
+
+    nodes = [
+        CompiledNode(
+            index=node_index[node_id],
+            node_id=node_id,
+            config=flat[node_id][0],
+            targets=tuple(to_index(target) for target in resolved[node_id]),
+            direct=_runs_directly(flat[node_id][0]),
+        )
+        for node_id in node_ids
+    ]
+
+    for fanout, index in fanouts.items():
+        join_class = flat[fanout.join][0].node_class
+        compiled = CompiledFanOut(
+            branches=tuple(node_index[target] for target in fanout.targets),
+            join=node_index[fanout.join],
+            required=required_branches(join_class.wait, len(fanout.targets)),
+            timeout=join_class.timeout,
+            conflict_policy=join_class.conflict_policy,
+        )
+        nodes.append(
+            CompiledNode(
+                index=index,
+                node_id=str(fanout),
+                config=None,
+                targets=(compiled.join,) * (len(actions) + 1),
+                fanout=compiled,
+            )
+        )
+
+    return ExecutionPlan(
+        nodes=tuple(nodes),
+        actions=tuple(actions),
+        action_index=MappingProxyType(action_index),
+        node_index=MappingProxyType(node_index),
+    )
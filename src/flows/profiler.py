@@ -0,0 +1,229 @@
+"""Always-available latency profiler for PocketFlow flows.
+
+Every flow has a ``profiler`` that is off until enabled, and can be turned
+on and off while the flow is in use:
+
+    random_conditional_flow.profiler.enable()
+    for store in stores:
+        random_conditional_flow.run(store)
+    print(random_conditional_flow.profiler.report())
+    random_conditional_flow.profiler.disable()
+
+While enabled, the profiler is a ``FlowHook`` of its flow and keeps one
+``LatencyHistogram`` (a fixed few hundred counters) per node, per node
+phase for wall-clock and CPU time, and per transition edge, so its memory
+does not grow with the number of runs. Phases reach it through a
+``phase_recorder``, so unless another hook of the flow overrides
+``on_phase``, wall-clock time is recorded for every phase and CPU time for
+one phase in ``CPU_SAMPLE_EVERY`` (see ``src.flows.hooks``). That keeps
+profiling under 1µs per phase; the phase quantiles are computed from the
+sampled phases, and the call counts from all of them.
+
+Edges are keyed by ``(node_id, action, target)`` and record the wall-clock
+time of the steps that took them. The critical path is the sequence of
+top-level steps of the slowest run seen; a fan-out appears as one step
+lasting until its join, whose own time covers its slowest branch.
+"""
+
+import threading
+import time
+from typing import Any
+
+from src.flows.hooks import FlowHook, PhaseRecorder
+from src.utils.histogram import LatencyHistogram
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class _Run:
+    """Steps of a run in progress."""
+
+    __slots__ = ("fanouts", "start", "steps")
+
+    def __init__(self) -> None:
+        self.start = time.monotonic()
+        self.steps: list[tuple[str, float]] = []
+        self.fanouts = 0  # Open fan-outs; their branch steps are not recorded
+
+
+class FlowProfiler(FlowHook):
+    """Collects latency histograms for the runs of one flow.
+
+    Attributes:
+        nodes: Wall-clock histogram per node ID
+        transitions: Wall-clock histogram per ``(node_id, action, target)``
+        runs: Histogram of whole-run durations
+    """
+
+    def __init__(self, flow: Any):
+        """Initialize a disabled profiler.
+
+        Args:
+            flow: The flow to profile
+        """
+        self.flow = flow
+        self._fanouts = frozenset(
+            node.node_id for node in flow.plan.nodes if node.fanout is not None
+        )
+        self._active: dict[str, _Run] = {}
+        self._phases: dict[str, dict[str, tuple[LatencyHistogram, ...]]] = {}
+        self._last_step = threading.local()
+        self._lock = threading.Lock()
+        self.reset()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the profiler is subscribed to the flow's runs."""
+        return any(hook is self for hook in self.flow.hooks)
+
+    def enable(self) -> None:
+        """Start profiling runs that start from now on."""
+        if not self.enabled:
+            self.flow.add_hook(self)
+
+    def disable(self) -> None:
+        """Stop profiling; the data collected so far is kept."""
+        self.flow.remove_hook(self)
+
+    def reset(self) -> None:
+        """Drop all collected data."""
+        with self._lock:
+            self.nodes: dict[str, LatencyHistogram] = {}
+            # Cleared in place: phase recorders hold on to their node's dict
+            for phases in self._phases.values():
+                phases.clear()
+            self.transitions: dict[tuple[str, str, str], LatencyHistogram] = {}
+            self.runs = LatencyHistogram()
+            self._slowest: list[tuple[str, float]] = []
+            self._slowest_wall = -1.0
+
+    @property
+    def phases(self) -> dict[tuple[str, str], tuple[LatencyHistogram, ...]]:
+        """``(wall, cpu)`` histograms per ``(node_id, phase)``.
+
+        The CPU histograms only hold the phases whose CPU time was sampled.
+        """
+        return {
+            (node_id, phase): histograms
+            for node_id, phases in self._phases.items()
+            for phase, histograms in phases.items()
+        }
+
+    @property
+    def critical_path(self) -> list[tuple[str, float]]:
+        """``(node_id, seconds)`` steps of the slowest run seen."""
+        return list(self._slowest)
+
+    def on_flow_start(self, run_id: str, flow_name: str, store: Any) -> None:  # noqa: ARG002
+        """Start tracing a run's steps."""
+        self._active[run_id] = _Run()
+
+    def on_node_start(self, run_id: str, node_id: str, store: Any) -> None:  # noqa: ARG002
+        """Count fan-outs opening, so branch steps stay off the path."""
+        if node_id in self._fanouts:
+            run = self._active.get(run_id)
+            if run is not None:
+                run.fanouts += 1
+
+    def phase_recorder(self, node_id: str) -> PhaseRecorder:
+        """Get the recorder of a node's phase wall-clock and CPU times."""
+        phases = self._phases.setdefault(node_id, {})
+
+        def record(phase: str, wall: int, cpu: int | None) -> None:
+            histograms = phases.get(phase)
+            if histograms is None:
+                histograms = phases.setdefault(
+                    phase, (LatencyHistogram(), LatencyHistogram())
+                )
+            histograms[0].record_ns(wall)
+            if cpu is not None:
+                histograms[1].record_ns(cpu)
+
+        return record
+
+    def on_node_end(self, run_id: str, node_id: str, store: Any, wall: float) -> None:  # noqa: ARG002
+        """Record a node's wall-clock time and add it to the run's steps."""
+        histogram = self.nodes.get(node_id)
+        if histogram is None:
+            histogram = self.nodes.setdefault(node_id, LatencyHistogram())
+        histogram.record(wall)
+        # The transition event for this step follows on the same thread
+        self._last_step.wall = wall
+
+        run = self._active.get(run_id)
+        if run is None:
+            return
+        if node_id in self._fanouts:
+            run.fanouts -= 1
+        if not run.fanouts:
+            run.steps.append((node_id, wall))
+
+    def on_transition(
+        self,
+        run_id: str,  # noqa: ARG002
+        node_id: str,
+        action: str,
+        target: str,
+    ) -> None:
+        """Record the step's wall-clock time on the edge it took."""
+        key = (node_id, action, target)
+        histogram = self.transitions.get(key)
+        if histogram is None:
+            histogram = self.transitions.setdefault(key, LatencyHistogram())
+        histogram.record(getattr(self._last_step, "wall", 0.0))
+
+    def on_flow_end(self, run_id: str, flow_name: str, store: Any) -> None:  # noqa: ARG002
+        """Record the run's duration and keep its steps if it was the slowest."""
+        run = self._active.pop(run_id, None)
+        if run is None:
+            return
+        wall = time.monotonic() - run.start
+        self.runs.record(wall)
+        with self._lock:
+            if wall > self._slowest_wall:
+                self._slowest_wall = wall
+                self._slowest = run.steps
+
+    def report(self) -> str:
+        """Format the collected data as a text report.
+
+        Returns:
+            Tables of call counts and p50/p90/p99 in milliseconds per node,
+            phase and transition, followed by the critical path
+        """
+        lines = [f"Profile of {self.flow.name} ({self.runs.count} runs)"]
+        if self.runs.count:
+            lines.append(_row("run", self.runs))
+
+        lines += ["", "Nodes:"]
+        lines += [_row(node_id, h) for node_id, h in sorted(self.nodes.items())]
+
+        lines += ["", "Phases (wall / cpu):"]
+        for (node_id, phase), (wall, cpu) in sorted(self.phases.items()):
+            lines.append(_row(f"{node_id}.{phase}", wall, cpu))
+
+        lines += ["", "Transitions:"]
+        for (node_id, action, target), h in sorted(self.transitions.items()):
+            lines.append(_row(f"{node_id} --[{action}]--> {target}", h))
+
+        path = self.critical_path
+        lines += ["", f"Critical path ({_ms(self._slowest_wall)} ms):"]
+        lines += [f"  {node_id:<40} {_ms(wall):>9} ms" for node_id, wall in path]
+        return "\n".join(lines)
+
+
+def _ms(seconds: float | None) -> str:
+    """Format seconds as milliseconds."""
+    return "-" if seconds is None or seconds < 0 else f"{seconds * 1000:.3f}"
+
+
+def _row(
+    label: str, wall: LatencyHistogram, cpu: LatencyHistogram | None = None
+) -> str:
+    """Format one report line: calls and quantiles of one or two histograms."""
+    columns = [f"  {label:<40} calls={wall.count:<7}"]
+    for name, histogram in (("", wall), ("cpu ", cpu)):
+        if histogram is not None:
+            p50, p90, p99 = histogram.quantiles(QUANTILES)
+            columns.append(f"{name}p50={_ms(p50)} p90={_ms(p90)} p99={_ms(p99)} ms")
+    return " ".join(columns).rstrip()
@@ -0,0 +1,230 @@
+"""Deadlines and per-node timeouts for PocketFlow flows.
+
+A run gets a deadline from ``BaseFlow.run(timeout=...)`` (or from whoever
+prepared its store, such as the daemon applying ``Config.flow_timeout``).
+The deadline is an absolute ``time.time()`` stored in ``_flow_deadline``,
+so it travels with the store into fan-out branches, worker processes and
+checkpoints, and nodes can read it to budget their own work.
+
+Nodes may also declare a ``node_timeout`` of their own in seconds. Every
+step of such a node is limited by the shorter of its timeout and the time
+left until the deadline. Other steps are only limited by the deadline once
+it is close: the flow keeps the longest step seen for each node, and runs a
+step without a limit while the time left is more than ``DEADLINE_MARGIN``
+times that (a node's first step under a deadline is always limited). A step
+run without a limit may overrun the deadline; nodes that need a hard limit
+declare ``node_timeout``. Once the deadline has passed, the flow stops
+before running another node.
+
+Limited steps run on a copy-on-write view of the store, so their writes can
+be dropped without copying it:
+
+- sync nodes run on a pooled daemon thread, in sync and async flows alike;
+  when time runs out the thread is abandoned (Python threads cannot be
+  killed) and its writes are dropped
+- async nodes are cancelled
+
+Either way the step ends with the ``timeout`` action. For nodes declaring
+``node_timeout`` it follows the node's ``timeout`` transition, or its
+``error`` transition if it has none; for other nodes, ``timeout`` is routed
+like any action without a transition of its own.
+"""
+
+import asyncio
+import concurrent.futures
+import time
+from collections.abc import Awaitable, Callable, Iterator, MutableMapping
+from typing import Any
+
+from src.flows.executors import run_in_daemon_thread
+from src.flows.parallel import apply_store_delta
+from src.flows.plan import TIMEOUT_ACTION
+
+DEADLINE_KEY = "_flow_deadline"
+
+# Steps run without a limit while the deadline is further away than this
+# many times the node's longest step
+DEADLINE_MARGIN = 2.0
+
+_MISSING = object()
+
+
+def set_deadline(store: MutableMapping[str, Any], timeout: float | None) -> None:
+    """Give a run ``timeout`` seconds from now, if a timeout is set."""
+    if timeout is not None:
+        store[DEADLINE_KEY] = time.time() + timeout
+
+
+class StepDurations:
+    """Longest step seen per node, to decide which steps need a limit."""
+
+    __slots__ = ("longest",)
+
+    def __init__(self, count: int):
+        """Start with no steps seen for ``count`` nodes."""
+        self.longest: list[float | None] = [None] * count
+
+    def limit(self, index: int, node: Any, store: Any) -> float | None:
+        """Seconds a step may run for, or None if the step is not limited.
+
+        Args:
+            index: Index of the node in the execution plan
+            node: Node instance, whose ``node_timeout`` attribute is honoured
+            store: Store of the run, whose deadline is honoured
+        """
+        timeout = getattr(node, "node_timeout", None)
+        deadline = store.get(DEADLINE_KEY)
+        if deadline is None:
+            return timeout
+        remaining = max(deadline - time.time(), 0.0)
+        if timeout is not None:
+            return min(timeout, remaining)
+        longest = self.longest[index]
+        if longest is not None and remaining > DEADLINE_MARGIN * longest:
+            return None
+        return remaining
+
+    def record(self, index: int, seconds: float) -> None:
+        """Record how long a step of a node took."""
+        longest = self.longest[index]
+        if longest is None or seconds > longest:
+            self.longest[index] = seconds
+
+
+class StoreOverlay(MutableMapping):
+    """Copy-on-write view of a store for a step that may be abandoned.
+
+    Reads fall through to the store; writes and deletions stay in the
+    overlay until ``apply_store_delta`` copies them back.
+    """
+
+    __slots__ = ("deleted", "store", "writes")
+
+    def __init__(self, store: Any):
+        """Wrap a store without copying it."""
+        self.store = store
+        self.writes: dict[str, Any] = {}
+        self.deleted: set[str] = set()
+
+    def __getitem__(self, key: str) -> Any:
+        """Look a key up in the writes, then in the store."""
+        value = self.writes.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if key in self.deleted:
+            raise KeyError(key)
+        return self.store[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Look a key up in the writes, then in the store."""
+        value = self.writes.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if key in self.deleted:
+            return default
+        return self.store.get(key, default)
+
+    def __contains__(self, key: object) -> bool:
+        """Check for a key in the writes, then in the store."""
+        if key in self.writes:
+            return True
+        return key not in self.deleted and key in self.store
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        """Record a write."""
+        self.writes[key] = value
+        self.deleted.discard(key)
+
+    def __delitem__(self, key: str) -> None:
+        """Record a deletion."""
+        if key not in self:
+            raise KeyError(key)
+        self.writes.pop(key, None)
+        self.deleted.add(key)
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the store's remaining keys, then the new ones."""
+        writes, deleted = self.writes, self.deleted
+        for key in self.store:
+            if key not in deleted and key not in writes:
+                yield key
+        yield from writes
+
+    def __len__(self) -> int:
+        """Number of keys seen through the overlay."""
+        return sum(1 for _ in self)
+
+    def fork(self) -> dict[str, Any]:
+        """Copy the keys seen through the overlay into a new dict."""
+        return dict(self)
+
+    copy = fork
+
+    def delta_since(self, base: Any) -> tuple[dict[str, Any], set[str]]:
+        """Writes and deletions made through the overlay, for ``store_delta``."""
+        return dict(self.writes), {key for key in self.deleted if key in base}
+
+
+def overlay_store(store: Any) -> Any:
+    """View a store for a limited step: its own fork, or a ``StoreOverlay``."""
+    fork = getattr(store, "fork", None)
+    if fork is not None:
+        return fork()
+    return StoreOverlay(store)
+
+
+def mark_timeout(store: Any, node_id: str, timeout: float) -> Any:
+    """Record that a node ran out of time."""
+    store["action"] = TIMEOUT_ACTION
+    store["error"] = f"Node {node_id} timed out after {timeout:.3g}s"
+    store["error_node"] = node_id
+    return store
+
+
+def run_limited(
+    call: Callable[[Any], Any], store: Any, timeout: float
+) -> tuple[Any, bool]:
+    """Run a sync step with a time limit.
+
+    Args:
+        call: Runs the node on the store it is given and returns the result
+        store: Store of the run
+        timeout: Seconds the step may take
+
+    Returns:
+        Tuple of (store, completed). The store is unchanged if the step
+        did not complete in time.
+    """
+    future = run_in_daemon_thread(call, overlay_store(store))
+    try:
+        result = future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        return store, False
+    return apply_store_delta(store, result), True
+
+
+async def run_limited_async(
+    call: Callable[[Any], Awaitable[Any]], store: Any, timeout: float
+) -> tuple[Any, bool]:
+    """Awaitable form of ``run_limited``; the step is cancelled on expiry."""
+    try:
+        result = await asyncio.wait_for(call(overlay_store(store)), timeout)
+    except asyncio.TimeoutError:
+        return store, False
+    return apply_store_delta(store, result), True
+
+
+def run_limited_in_thread(
+    call: Callable[[Any], Any], store: Any, timeout: float
+) -> Awaitable[tuple[Any, bool]]:
+    """Awaitable form of ``run_limited`` for sync steps of async flows.
+
+    Like ``run_limited``, the step runs on a daemon thread, so a step that
+    hangs past its limit is abandoned without holding a worker of the
+    shared pool.
+    """
+    return run_limited_async(
+        lambda view: asyncio.wrap_future(run_in_daemon_thread(call, view)),
+        store,
+        timeout,
+    )
@@ -2,10 +2,16 @@
 
 import logging
 from abc import ABC, abstractmethod
+from collections.abc import Callable, MutableMapping
 from typing import Any
 
+from src.utils.memo import cache_for, diff_writes, fingerprint
+
 logger = logging.getLogger(__name__)
 
+# Callable (node, phase name, phase method, store) -> store
+PhaseRunner = Callable[[Any, str, Callable[[Any], Any], Any], Any]
+
 
 class BaseNode(ABC):
     """Base class for all PocketFlow nodes.
@@ -14,14 +20,72 @@ class BaseNode(ABC):
     1. prep() - Preparation and validation
     2. exec() - Main execution logic
     3. post() - Cleanup and finalization
+
+    Attributes:
+        reads: Store keys the node reads, or None if unknown
+        writes: Store keys the node writes or deletes, or None if unknown.
+            Together with ``reads``, lets flows run the node concurrently
+            with nodes it does not depend on (see ``src.flows.dataflow``).
+            ``action``, ``error`` and ``error_node`` need not be declared.
+        speculative: Flows may start the node before its turn and drop its
+            result (see ``src.flows.dataflow``); set to False for nodes with
+            effects outside the store, which must only run at their turn
+        cpu_bound: Run the exec phase in a worker process when run by a
+            flow. The exec phase then only sees the keys in ``reads`` (or a
+            copy of the whole store if ``reads`` is None), and its writes
+            are copied back. Async nodes cannot be CPU-bound.
+        memoize: Cache the writes of the exec phase by a fingerprint of the
+            keys in ``reads`` and replay them instead of calling ``exec``
+            when the same inputs are seen again (see ``src.utils.memo``).
+            The exec phase then only sees the keys in ``reads``.
+        memo_maxsize: Maximum number of cached results for this class
+        memo_ttl: Seconds a cached result stays valid, or None
+        node_timeout: Seconds a flow lets the node run before ending the
+            step with the 'timeout' action, or None for no limit (see
+            ``src.flows.timeouts``)
+        idempotent: Running exec more than once for the same inputs is safe
+        hedge: Start a second exec attempt when the first is slower than
+            usual and take whichever succeeds first (see
+            ``src.flows.hedging``). Requires ``idempotent``.
+        hedge_max_extra: Second attempts allowed per exec call
     """
 
+    reads: frozenset[str] | None = None
+    writes: frozenset[str] | None = None
+    speculative: bool = True
+    cpu_bound: bool = False
+    memoize: bool = False
+    memo_maxsize: int = 256
+    memo_ttl: float | None = None
+    node_timeout: float | None = None
+    idempotent: bool = False
+    hedge: bool = False
+    hedge_max_extra: float = 0.1
+
+    def __init_subclass__(cls, **kwargs: Any):
+        """Check memoization and hedging settings."""
+        super().__init_subclass__(**kwargs)
+        if cls.memoize and cls.reads is None:
+            msg = f"Node {cls.__name__} must declare reads to be memoized"
+            raise ValueError(msg)
+        if cls.hedge and not cls.idempotent:
+            msg = f"Node {cls.__name__} must be idempotent to be hedged"
+            raise ValueError(msg)
+        if cls.hedge_max_extra < 0:
+            msg = f"Node {cls.__name__} must have a hedge_max_extra of at least 0"
+            raise ValueError(msg)
+
+    @classmethod
+    def memo_cache(cls) -> Any:
+        """The ``MemoCache`` of this node class, with hit/miss counters."""
+        return cache_for(cls)
+
     def __init__(self, name: str | None = None):
         """Initialize the node with an optional name."""
         self.name = name or self.__class__.__name__
         self.logger = logging.getLogger(f"{__name__}.{self.name}")
 
-    def prep(self, store: dict[str, Any]) -> dict[str, Any]:
+    def prep(self, store: MutableMapping[str, Any]) -> MutableMapping[str, Any]:
         """Preparation phase - validate inputs and setup.
 
         Override this method to:
@@ -35,11 +99,11 @@ class BaseNode(ABC):
         Returns:
             Updated store dictionary
         """
-        self.logger.debug(f"Preparing {self.name}")
+        self.logger.debug("Preparing %s", self.name)
         return store
 
     @abstractmethod
-    def exec(self, store: dict[str, Any]) -> dict[str, Any]:
+    def exec(self, store: MutableMapping[str, Any]) -> MutableMapping[str, Any]:
         """Execution phase - main logic implementation.
 
         This method must be implemented by all nodes.
@@ -52,7 +116,7 @@ class BaseNode(ABC):
         """
         pass
 
-    def post(self, store: dict[str, Any]) -> dict[str, Any]:
+    def post(self, store: MutableMapping[str, Any]) -> MutableMapping[str, Any]:
         """Post-processing phase - cleanup and finalization.
 
         Override this method to:
@@ -66,48 +130,247 @@ class BaseNode(ABC):
         Returns:
             Final store state
         """
-        self.logger.debug(f"Post-processing {self.name}")
+        self.logger.debug("Post-processing %s", self.name)
         return store
 
-    def run(self, store: dict[str, Any]) -> dict[str, Any]:
+    def run(
+        self, store: MutableMapping[str, Any], runner: PhaseRunner | None = None
+    ) -> MutableMapping[str, Any]:
         """Execute the complete node lifecycle.
 
         Runs all three phases in order: prep → exec → post
 
         Args:
             store: The shared state dictionary
+            runner: Optional callable ``(node, phase, method, store)`` that
+                invokes each phase method in place of a direct call. Flows
+                use it to move phases elsewhere or to instrument them.
 
         Returns:
             Final store state after all phases
         """
         try:
-            self.logger.info(f"Running {self.name}")
-            store = self.prep(store)
-
-            # Skip execution if prep phase set an error
-            if store.get("action") != "error":
-                store = self.exec(store)
+            self.logger.info("Running %s", self.name)
+            if runner is None and not self.memoize:
+                store = self.prep(store)
+
+                # Skip execution if prep phase set an error
+                if store.get("action") != "error":
+                    store = self.exec(store)
+
+                store = self.post(store)
+            else:
+                store = self._run_phase(runner, "prep", self.prep, store)
+                if store.get("action") != "error":
+                    if self.memoize:
+                        store = self._memo_exec(store, runner)
+                    else:
+                        store = runner(self, "exec", self.exec, store)
+                store = self._run_phase(runner, "post", self.post, store)
+
+            if self.logger.isEnabledFor(logging.INFO):
+                self.logger.info(
+                    "Completed %s with action: %s",
+                    self.name,
+                    store.get("action", "none"),
+                )
+            return store
 
-            store = self.post(store)
+        except Exception as e:
+            self.logger.error("Error in %s: %s", self.name, e)
+            store["action"] = "error"
+            store["error"] = str(e)
+            store["error_node"] = self.name
+            return store
 
-            self.logger.info(
-                f"Completed {self.name} with action: {store.get('action', 'none')}"
+    def _run_phase(
+        self, runner: PhaseRunner | None, phase: str, method: Any, store: Any
+    ) -> Any:
+        """Call a phase method, through the runner if there is one."""
+        if runner is None:
+            return method(store)
+        return runner(self, phase, method, store)
+
+    def _memo_exec(self, store: Any, runner: PhaseRunner | None) -> Any:
+        """Run the exec phase through the memo cache and apply its writes."""
+        inputs = {key: store[key] for key in self.reads if key in store}
+
+        def compute() -> tuple[dict[str, Any], set[str]]:
+            result = self._run_phase(runner, "exec", self.exec, dict(inputs))
+            return diff_writes(inputs, result)
+
+        key = fingerprint(inputs)
+        if key is None:
+            writes, deleted = compute()
+        else:
+            writes, deleted = self.memo_cache().get_or_compute(
+                key, compute, cacheable=_is_cacheable
             )
+        return _apply_writes(store, writes, deleted)
+
+
+def _is_cacheable(delta: tuple[dict[str, Any], set[str]]) -> bool:
+    """Only cache exec results that did not fail."""
+    return delta[0].get("action") != "error"
+
+
+def _apply_writes(store: Any, writes: dict[str, Any], deleted: set[str]) -> Any:
+    """Apply recorded exec writes and deletions to the store."""
+    store.update(writes)
+    for key in deleted:
+        store.pop(key, None)
+    return store
+
+
+class AsyncBaseNode(BaseNode):
+    """Base class for nodes with awaitable lifecycle phases.
+
+    Use this for I/O-bound nodes (such as Claude calls) so they do not block
+    the event loop. Async nodes must be run by an ``AsyncBaseFlow``.
+    """
+
+    async def prep(self, store: MutableMapping[str, Any]) -> MutableMapping[str, Any]:  # type: ignore[override]
+        """Preparation phase - validate inputs and setup.
+
+        Args:
+            store: The shared state dictionary
+
+        Returns:
+            Updated store dictionary
+        """
+        self.logger.debug("Preparing %s", self.name)
+        return store
+
+    @abstractmethod
+    async def exec(self, store: MutableMapping[str, Any]) -> MutableMapping[str, Any]:  # type: ignore[override]
+        """Execution phase - main logic implementation.
+
+        Args:
+            store: The shared state dictionary
+
+        Returns:
+            Updated store dictionary with results
+        """
+
+    async def post(self, store: MutableMapping[str, Any]) -> MutableMapping[str, Any]:  # type: ignore[override]
+        """Post-processing phase - cleanup and finalization.
+
+        Args:
+            store: The shared state dictionary
+
+        Returns:
+            Final store state
+        """
+        self.logger.debug("Post-processing %s", self.name)
+        return store
+
+    async def run(  # type: ignore[override]
+        self, store: MutableMapping[str, Any], runner: PhaseRunner | None = None
+    ) -> MutableMapping[str, Any]:
+        """Execute the complete node lifecycle, awaiting each phase.
+
+        Args:
+            store: The shared state dictionary
+            runner: Optional async phase runner, see ``BaseNode.run``
+
+        Returns:
+            Final store state after all phases
+        """
+        try:
+            self.logger.info("Running %s", self.name)
+            if runner is None and not self.memoize:
+                store = await self.prep(store)
+
+                # Skip execution if prep phase set an error
+                if store.get("action") != "error":
+                    store = await self.exec(store)
+
+                store = await self.post(store)
+            else:
+                store = await self._run_phase(runner, "prep", self.prep, store)
+                if store.get("action") != "error":
+                    if self.memoize:
+                        store = await self._memo_exec(store, runner)
+                    else:
+                        store = await runner(self, "exec", self.exec, store)
+                store = await self._run_phase(runner, "post", self.post, store)
+
+            if self.logger.isEnabledFor(logging.INFO):
+                self.logger.info(
+                    "Completed %s with action: %s",
+                    self.name,
+                    store.get("action", "none"),
+                )
             return store
 
         except Exception as e:
-            self.logger.error(f"Error in {self.name}: {e!s}")
+            self.logger.error("Error in %s: %s", self.name, e)
             store["action"] = "error"
             store["error"] = str(e)
             store["error_node"] = self.name
             return store
 
+    async def _memo_exec(  # type: ignore[override]
+        self, store: Any, runner: PhaseRunner | None
+    ) -> Any:
+        """Await the exec phase through the memo cache and apply its writes."""
+        inputs = {key: store[key] for key in self.reads if key in store}
+
+        async def compute() -> tuple[dict[str, Any], set[str]]:
+            result = await self._run_phase(runner, "exec", self.exec, dict(inputs))
+            return diff_writes(inputs, result)
+
+        key = fingerprint(inputs)
+        if key is None:
+            writes, deleted = await compute()
+        else:
+            writes, deleted = await self.memo_cache().get_or_compute_async(
+                key, compute, cacheable=_is_cacheable
+            )
+        return _apply_writes(store, writes, deleted)
+
+
+class JoinNode(BaseNode):
+    """Node that joins the branches of a fan-out transition.
+
+    The flow runs all fan-out branches concurrently, waits for them
+    according to the class attributes below, merges their store writes and
+    then runs the join node on the merged store. Join status is available
+    in ``store["_join"]``.
+
+    Attributes:
+        wait: 'all', 'any', or the number of branches that must succeed
+        timeout: Seconds to wait for branches, or None to wait indefinitely
+        conflict_policy: How to resolve different values written to the same
+            key by several branches - 'error', 'first', 'last' (in branch
+            declaration order), or a callable ``(key, values) -> value``
+    """
+
+    wait: str | int = "all"
+    timeout: float | None = None
+    conflict_policy: Any = "error"
+
+    def exec(self, store: MutableMapping[str, Any]) -> MutableMapping[str, Any]:
+        """Set the action from the join status."""
+        join = store.get("_join", {})
+
+        if join.get("satisfied", True):
+            store["action"] = "success"
+        elif join.get("timed_out"):
+            store["action"] = "timeout"
+            store["error"] = f"Timed out waiting for branches: {join['pending']}"
+        else:
+            store["action"] = "error"
+            store["error"] = f"Branches failed: {join.get('failed', {})}"
+
+        return store
+
 
 class ValidationMixin:
     """Mixin for common validation patterns."""
 
     def validate_required_fields(
-        self, store: dict[str, Any], required_fields: list[str]
+        self, store: MutableMapping[str, Any], required_fields: list[str]
     ) -> tuple[bool, str | None]:
         """Validate that required fields exist in store.
 
@@ -126,7 +389,7 @@ class ValidationMixin:
         return True, None
 
     def validate_field_types(
-        self, store: dict[str, Any], field_types: dict[str, type]
+        self, store: MutableMapping[str, Any], field_types: dict[str, type]
     ) -> tuple[bool, str | None]:
         """Validate that fields have correct types.
 
@@ -0,0 +1,334 @@
+"""Map-reduce nodes over collections in the store.
+
+A ``BatchNode`` splits the collection in ``store[items_key]`` into chunks,
+maps ``exec_chunk`` over them concurrently and reduces the results, in
+input order, into ``store[output_key]``:
+
+    class SummarizeDocuments(BatchNode):
+        items_key = "documents"
+        output_key = "summaries"
+        chunk_size = 10
+        max_workers = 8
+
+        def exec_item(self, document):
+            return summarize(document)
+
+``exec_chunk`` calls ``exec_item`` for each item of a chunk by default;
+override it instead for work that is cheaper in bulk. A subclass must
+implement one of the two, which is checked when the class is defined. Chunks run on a
+thread pool of ``max_workers`` threads per node run, on the shared process
+pool (``executor = "process"``, for CPU-bound work; the node class must be
+importable by worker processes) or one after the other (``executor =
+None``). ``AsyncBatchNode`` awaits an async ``exec_item`` with at most
+``max_workers`` chunks in flight on the event loop.
+
+At most ``max_workers`` chunks are in flight and results are collected in
+order, so the input may be any iterable, including a generator that is
+consumed as the chunks are submitted.
+
+A chunk whose ``exec_chunk`` raises fails all of its items. With
+``on_error = "fail"`` the first failure fails the node. With ``on_error =
+"skip"`` failed items are left out of the results and their errors are
+written to ``store[errors_key]`` as ``{item index: message}``; the node
+still fails if more than ``max_failures`` items failed.
+"""
+
+import asyncio
+import inspect
+from collections import deque
+from collections.abc import Awaitable, Callable, Iterable, Iterator, MutableMapping
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from typing import Any
+
+from src.flows.executors import get_process_pool, register_worker_modules
+from src.nodes.base import AsyncBaseNode, BaseNode
+
+BATCH_EXECUTORS = ("thread", "process", None)
+ERROR_POLICIES = ("fail", "skip")
+
+# Node instances cached inside each worker process
+_worker_nodes: dict[type, Any] = {}
+
+# (index of the chunk's first item, chunk length, results or None, error or None)
+ChunkOutcome = tuple[int, int, list[Any] | None, BaseException | None]
+
+
+class _BatchSettings:
+    """Settings and result handling shared by sync and async batch nodes.
+
+    Attributes:
+        items_key: Store key of the collection to map over
+        output_key: Store key the reduced results are written to
+        errors_key: Store key failed items are reported in
+        chunk_size: Items per ``exec_chunk`` call
+        max_workers: Chunks in flight at once
+        on_error: 'fail' or 'skip', see the module docstring
+        max_failures: Failed items tolerated with 'skip', or None for any
+            number
+    """
+
+    items_key: str = "items"
+    output_key: str = "results"
+    errors_key: str = "batch_errors"
+    chunk_size: int = 1
+    max_workers: int = 4
+    on_error: str = "fail"
+    max_failures: int | None = None
+
+    def __init_subclass__(cls, **kwargs: Any):
+        """Check the batch settings."""
+        super().__init_subclass__(**kwargs)
+        if cls.chunk_size < 1:
+            msg = f"Node {cls.__name__} must have a chunk_size of at least 1"
+            raise ValueError(msg)
+        if cls.max_workers < 1:
+            msg = f"Node {cls.__name__} must have max_workers of at least 1"
+            raise ValueError(msg)
+        if cls.on_error not in ERROR_POLICIES:
+            msg = f"Node {cls.__name__} has unknown on_error '{cls.on_error}'"
+            raise ValueError(msg)
+
+    def prep(self, store: MutableMapping[str, Any]) -> MutableMapping[str, Any]:
+        """Check that the collection is present and iterable."""
+        items = store.get(self.items_key)
+        if items is None:
+            store["action"] = "error"
+            store["error"] = f"Missing required fields: {self.items_key}"
+        elif not isinstance(items, Iterable) or isinstance(items, str | bytes):
+            store["action"] = "error"
+            store["error"] = f"Field '{self.items_key}' must be a collection"
+        return store
+
+    def _chunks(self, items: Iterable[Any]) -> Iterator[tuple[int, list[Any]]]:
+        """Split the items into ``(first item index, chunk)`` pairs."""
+        iterator = iter(items)
+        start = 0
+        while chunk := list(islice(iterator, self.chunk_size)):
+            yield start, chunk
+            start += len(chunk)
+
+    def reduce(self, results: list[Any], store: MutableMapping[str, Any]) -> Any:  # noqa: ARG002
+        """Combine the item results, in input order, into the output.
+
+        Args:
+            results: One result per successful item, in input order
+            store: The shared state dictionary
+
+        Returns:
+            The value to write to ``output_key``; the results by default
+        """
+        return results
+
+    def _finish(
+        self, store: MutableMapping[str, Any], outcomes: list[ChunkOutcome]
+    ) -> Any:
+        """Reduce the chunk outcomes into the store and set the action."""
+        results: list[Any] = []
+        errors: dict[int, str] = {}
+        for start, count, values, error in outcomes:
+            if error is not None:
+                errors.update(dict.fromkeys(range(start, start + count), str(error)))
+            elif values is not None:
+                results.extend(values)
+
+        if errors:
+            store[self.errors_key] = errors
+            if self.on_error == "fail" or (
+                self.max_failures is not None and len(errors) > self.max_failures
+            ):
+                index = min(errors)
+                store["action"] = "error"
+                store["error"] = (
+                    f"{len(errors)} items failed; item {index}: {errors[index]}"
+                )
+                return store
+
+        store[self.output_key] = self.reduce(results, store)
+        store["action"] = "success"
+        return store
+
+
+def _check_hooks(cls: type, base: type) -> None:
+    """Check that a batch node class implements ``exec_item`` or ``exec_chunk``.
+
+    Raises:
+        TypeError: If it implements neither
+    """
+    if (
+        not hasattr(cls, "exec_item")
+        and getattr(cls, "exec_chunk", None) is getattr(base, "exec_chunk", None)
+        and not inspect.isabstract(cls)
+    ):
+        msg = f"Node {cls.__name__} must implement exec_item or exec_chunk"
+        raise TypeError(msg)
+
+
+def _check_results(chunk: list[Any], results: list[Any]) -> list[Any]:
+    """Check that a chunk produced one result per item."""
+    if len(results) != len(chunk):
+        msg = f"exec_chunk returned {len(results)} results for {len(chunk)} items"
+        raise ValueError(msg)
+    return results
+
+
+class BatchNode(_BatchSettings, BaseNode):
+    """Node mapping ``exec_chunk`` over a collection and reducing the results.
+
+    Subclasses implement ``exec_item(item)``, returning one item's result,
+    or override ``exec_chunk``.
+
+    Attributes:
+        executor: 'thread', 'process' or None to run chunks one at a time
+    """
+
+    executor: str | None = "thread"
+    exec_item: Callable[[Any], Any]
+
+    def __init_subclass__(cls, **kwargs: Any):
+        """Check the hooks and executor and register process workers' imports."""
+        super().__init_subclass__(**kwargs)
+        _check_hooks(cls, BatchNode)
+        if cls.executor not in BATCH_EXECUTORS:
+            msg = f"Node {cls.__name__} has unknown executor '{cls.executor}'"
+            raise ValueError(msg)
+        if cls.executor == "process":
+            register_worker_modules({cls.__module__})
+
+    def exec_chunk(self, chunk: list[Any]) -> list[Any]:
+        """Process a chunk of items.
+
+        Args:
+            chunk: Up to ``chunk_size`` consecutive items
+
+        Returns:
+            One result per item, in order
+        """
+        return [self.exec_item(item) for item in chunk]
+
+    def exec(self, store: MutableMapping[str, Any]) -> MutableMapping[str, Any]:
+        """Map the chunks and reduce their results into the store."""
+        outcomes = list(self._map(self._chunks(store[self.items_key])))
+        return self._finish(store, outcomes)
+
+    def _map(self, chunks: Iterator[tuple[int, list[Any]]]) -> Iterator[ChunkOutcome]:
+        """Run the chunks, keeping at most ``max_workers`` in flight."""
+        if self.executor is None:
+            for start, chunk in chunks:
+                try:
+                    yield (
+                        start,
+                        len(chunk),
+                        _check_results(chunk, self.exec_chunk(chunk)),
+                        None,
+                    )
+                except Exception as e:
+                    yield start, len(chunk), None, e
+                    if self.on_error == "fail":
+                        return
+            return
+
+        if self.executor == "process":
+            owned = None
+            submit = partial(
+                get_process_pool().submit, _exec_chunk_in_worker, type(self)
+            )
+        else:
+            # A pool per run cannot deadlock with the pool the flow runs on
+            owned = ThreadPoolExecutor(max_workers=self.max_workers)
+            submit = partial(owned.submit, self.exec_chunk)
+
+        in_flight: deque = deque()
+        try:
+            for start, chunk in chunks:
+                in_flight.append((start, chunk, submit(chunk)))
+                if len(in_flight) >= self.max_workers:
+                    outcome = _collect(*in_flight.popleft())
+                    yield outcome
+                    if outcome[3] is not None and self.on_error == "fail":
+                        return
+            while in_flight:
+                outcome = _collect(*in_flight.popleft())
+                yield outcome
+                if outcome[3] is not None and self.on_error == "fail":
+                    return
+        finally:
+            for _, _, future in in_flight:
+                future.cancel()
+            if owned is not None:
+                owned.shutdown(wait=False, cancel_futures=True)
+
+
+def _collect(start: int, chunk: list[Any], future: Any) -> ChunkOutcome:
+    """Wait for a chunk submitted to an executor."""
+    try:
+        return start, len(chunk), _check_results(chunk, future.result()), None
+    except Exception as e:
+        return start, len(chunk), None, e
+
+
+def _exec_chunk_in_worker(node_class: type, chunk: list[Any]) -> list[Any]:
+    """Run a batch node's ``exec_chunk`` inside a worker process."""
+    node = _worker_nodes.get(node_class)
+    if node is None:
+        node = _worker_nodes[node_class] = node_class()
+    return node.exec_chunk(chunk)
+
+
+class AsyncBatchNode(_BatchSettings, AsyncBaseNode):
+    """Batch node awaiting ``exec_chunk`` on the event loop.
+
+    Subclasses implement an async ``exec_item(item)`` or override
+    ``exec_chunk``.
+    """
+
+    exec_item: Callable[[Any], Awaitable[Any]]
+
+    def __init_subclass__(cls, **kwargs: Any):
+        """Check that the node implements one of the hooks."""
+        super().__init_subclass__(**kwargs)
+        _check_hooks(cls, AsyncBatchNode)
+
+    async def prep(self, store: MutableMapping[str, Any]) -> MutableMapping[str, Any]:  # type: ignore[override]
+        """Check that the collection is present and iterable."""
+        return _BatchSettings.prep(self, store)
+
+    async def exec_chunk(self, chunk: list[Any]) -> list[Any]:
+        """Process a chunk of items, one after the other.
+
+        Args:
+            chunk: Up to ``chunk_size`` consecutive items
+
+        Returns:
+            One result per item, in order
+        """
+        return [await self.exec_item(item) for item in chunk]
+
+    async def exec(self, store: MutableMapping[str, Any]) -> MutableMapping[str, Any]:  # type: ignore[override]
+        """Map the chunks as tasks and reduce their results into the store."""
+        outcomes: list[ChunkOutcome] = []
+        in_flight: deque = deque()
+
+        async def collect() -> bool:
+            start, chunk, task = in_flight.popleft()
+            try:
+                outcome = start, len(chunk), _check_results(chunk, await task), None
+            except Exception as e:
+                outcome = start, len(chunk), None, e
+            outcomes.append(outcome)
+            return outcome[3] is None or self.on_error != "fail"
+
+        try:
+            for start, chunk in self._chunks(store[self.items_key]):
+                task = asyncio.ensure_future(self.exec_chunk(chunk))
+                in_flight.append((start, chunk, task))
+                if len(in_flight) >= self.max_workers and not await collect():
+                    break
+            while in_flight and await collect():
+                pass
+        finally:
+            for _, _, task in in_flight:
+                if not task.cancel():
+                    task.exception()  # Consumed so it is not reported as lost
+        return self._finish(store, outcomes)
@@ -1,15 +1,24 @@
 """Example node implementations."""
 
-import random
+from collections.abc import MutableMapping
 from typing import Any
 
 from src.nodes.base import BaseNode, ValidationMixin
+from src.utils.columns import HAS_NUMPY, is_column, to_column, transform_column
+from src.utils.rng import randints, rng_for
+from src.utils.streams import (
+    DEFAULT_CHUNK_SIZE,
+    is_stream,
+    iter_chunks,
+    reversed_chunks,
+    sink_writer,
+)
 
 
 class GreetingNode(BaseNode, ValidationMixin):
     """Example node that creates personalized greetings."""
 
-    def prep(self, store: dict[str, Any]) -> dict[str, Any]:
+    def prep(self, store: MutableMapping[str, Any]) -> MutableMapping[str, Any]:
         """Validate that name is provided."""
         # Use validation mixin for common patterns
         is_valid, error = self.validate_required_fields(store, ["name"])
@@ -22,7 +31,7 @@ class GreetingNode(BaseNode, ValidationMixin):
         store["name"] = store["name"].strip().title()
         return store
 
-    def exec(self, store: dict[str, Any]) -> dict[str, Any]:
+    def exec(self, store: MutableMapping[str, Any]) -> MutableMapping[str, Any]:
         """Generate the greeting based on time of day."""
         if store.get("action") == "error":
             return store
@@ -41,7 +50,7 @@ class GreetingNode(BaseNode, ValidationMixin):
         store["action"] = "success"
         return store
 
-    def post(self, store: dict[str, Any]) -> dict[str, Any]:
+    def post(self, store: MutableMapping[str, Any]) -> MutableMapping[str, Any]:
         """Add metadata about the greeting."""
         if store.get("action") == "success":
             store["greeting_metadata"] = {
@@ -53,9 +62,15 @@ class GreetingNode(BaseNode, ValidationMixin):
 
 
 class RandomNumberNode(BaseNode):
-    """Example node that generates random numbers."""
+    """Example node that generates random numbers.
 
-    def prep(self, store: dict[str, Any]) -> dict[str, Any]:
+    Numbers come from the run's random stream (see ``src.utils.rng``). If
+    ``random_count`` is set, the node generates that many numbers at once
+    into ``random_numbers``, an ``array`` of 64-bit integers, instead of a
+    single ``random_number``.
+    """
+
+    def prep(self, store: MutableMapping[str, Any]) -> MutableMapping[str, Any]:
         """Set default range if not provided."""
         if "min_value" not in store:
             store["min_value"] = 1
@@ -67,32 +82,70 @@ class RandomNumberNode(BaseNode):
             store["action"] = "error"
             store["error"] = "min_value must be less than max_value"
 
+        count = store.get("random_count")
+        if count is not None and (not isinstance(count, int) or count < 1):
+            store["action"] = "error"
+            store["error"] = "random_count must be a positive integer"
+
         return store
 
-    def exec(self, store: dict[str, Any]) -> dict[str, Any]:
-        """Generate a random number within the specified range."""
+    def exec(self, store: MutableMapping[str, Any]) -> MutableMapping[str, Any]:
+        """Generate random numbers within the specified range."""
         if store.get("action") == "error":
             return store
 
         min_val = store["min_value"]
         max_val = store["max_value"]
+        rng = rng_for(store)
 
-        store["random_number"] = random.randint(min_val, max_val)  # noqa: S311
+        count = store.get("random_count")
+        if count is None:
+            store["random_number"] = rng.randint(min_val, max_val)
+        else:
+            store["random_numbers"] = randints(rng, min_val, max_val, count)
         store["action"] = "success"
 
         return store
 
 
 class DataTransformNode(BaseNode, ValidationMixin):
-    """Example node that transforms data structures."""
-
-    def prep(self, store: dict[str, Any]) -> dict[str, Any]:
+    """Example node that transforms data structures.
+
+    ``input_data`` is a list, or a column (a NumPy array or ``array.array``)
+    that is transformed in bulk into a column (see ``src.utils.columns``).
+    Any other iterable is streamed chunk by chunk to ``output_sink``
+    instead of being written to ``transformed_data`` (see
+    ``src.utils.streams``). Streaming writes outside the store, so the node
+    is not ``speculative``: flows with ``parallel=True`` only run it at its
+    turn.
+
+    Attributes:
+        vectorize_min_items: With NumPy installed, convert input lists of
+            at least this many numbers or strings to a column and return a
+            column; None to keep lists as lists
+        stream_chunk_size: Items per chunk when streaming
+    """
+
+    reads = frozenset({"input_data", "transform_type", "output_sink"})
+    writes = frozenset({"transformed_data", "transform_stats"})
+    speculative = False
+    vectorize_min_items: int | None = None
+    stream_chunk_size: int = DEFAULT_CHUNK_SIZE
+
+    def prep(self, store: MutableMapping[str, Any]) -> MutableMapping[str, Any]:
         """Validate input data exists."""
         is_valid, error = self.validate_required_fields(store, ["input_data"])
         if not is_valid:
             store["action"] = "error"
             store["error"] = error
             return store
+        if is_column(store["input_data"]):
+            return store
+        if is_stream(store["input_data"]):
+            if "output_sink" not in store:
+                store["action"] = "error"
+                store["error"] = "Streaming input_data needs an output_sink"
+            return store
 
         # Validate it's a list
         is_valid, error = self.validate_field_types(store, {"input_data": list})
@@ -102,7 +155,7 @@ class DataTransformNode(BaseNode, ValidationMixin):
 
         return store
 
-    def exec(self, store: dict[str, Any]) -> dict[str, Any]:
+    def exec(self, store: MutableMapping[str, Any]) -> MutableMapping[str, Any]:
         """Transform the input data."""
         if store.get("action") == "error":
             return store
@@ -110,6 +163,20 @@ class DataTransformNode(BaseNode, ValidationMixin):
         input_data = store["input_data"]
         transform_type = store.get("transform_type", "uppercase")
 
+        if is_stream(input_data):
+            return self._stream(store, input_data, transform_type)
+
+        column = input_data if is_column(input_data) else self._vectorize(input_data)
+        if column is not None:
+            try:
+                store["transformed_data"] = transform_column(column, transform_type)
+            except ValueError as e:
+                store["action"] = "error"
+                store["error"] = str(e)
+                return store
+            store["action"] = "success"
+            return store
+
         if transform_type == "uppercase":
             transformed = [str(item).upper() for item in input_data]
         elif transform_type == "reverse":
@@ -126,9 +193,61 @@ class DataTransformNode(BaseNode, ValidationMixin):
 
         return store
 
-    def post(self, store: dict[str, Any]) -> dict[str, Any]:
-        """Add transformation statistics."""
-        if store.get("action") == "success":
+    def _stream(
+        self, store: MutableMapping[str, Any], source: Any, transform_type: str
+    ) -> MutableMapping[str, Any]:
+        """Transform a stream chunk by chunk into the output sink."""
+        if transform_type == "uppercase":
+            chunks = iter_chunks(source, self.stream_chunk_size)
+        elif transform_type == "reverse":
+            chunks = reversed_chunks(source, self.stream_chunk_size)
+        else:
+            store["action"] = "error"
+            if transform_type == "sort":
+                store["error"] = "Transform type sort cannot be streamed"
+            else:
+                store["error"] = f"Unknown transform type: {transform_type}"
+            return store
+
+        try:
+            write = sink_writer(store["output_sink"])
+        except TypeError as e:
+            store["action"] = "error"
+            store["error"] = str(e)
+            return store
+
+        count = 0
+        chunk_count = 0
+        for chunk in chunks:
+            output = chunk
+            if transform_type == "uppercase":
+                if is_column(chunk):
+                    output = transform_column(chunk, transform_type)
+                else:
+                    output = [str(item).upper() for item in chunk]
+            write(output)
+            count += len(output)
+            chunk_count += 1
+
+        store["transform_stats"] = {
+            "input_count": count,
+            "output_count": count,
+            "transform_type": transform_type,
+            "chunks": chunk_count,
+        }
+        store["action"] = "success"
+        return store
+
+    def _vectorize(self, input_data: list[Any]) -> Any:
+        """Convert a large input list to a column, if configured to."""
+        minimum = self.vectorize_min_items
+        if not HAS_NUMPY or minimum is None or len(input_data) < minimum:
+            return None
+        return to_column(input_data)
+
+    def post(self, store: MutableMapping[str, Any]) -> MutableMapping[str, Any]:
+        """Add transformation statistics; streams count them as they go."""
+        if store.get("action") == "success" and not is_stream(store["input_data"]):
             store["transform_stats"] = {
                 "input_count": len(store["input_data"]),
                 "output_count": len(store["transformed_data"]),
@@ -140,7 +259,10 @@ class DataTransformNode(BaseNode, ValidationMixin):
 class ConditionalNode(BaseNode):
     """Example node that demonstrates conditional branching."""
 
-    def exec(self, store: dict[str, Any]) -> dict[str, Any]:
+    reads = frozenset({"value", "threshold"})
+    writes = frozenset({"message"})
+
+    def exec(self, store: MutableMapping[str, Any]) -> MutableMapping[str, Any]:
         """Evaluate condition and set appropriate action."""
         value = store.get("value", 0)
         threshold = store.get("threshold", 50)
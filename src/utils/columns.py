@@ -0,0 +1,96 @@
+"""Column-backed data for bulk transforms.
+
+A column is a NumPy array or an ``array.array``: values of one type stored
+contiguously, without a Python object per element. ``DataTransformNode``
+transforms columns in bulk and returns a column of the same kind:
+
+    store = {"input_data": np.array(names), "transform_type": "uppercase"}
+    DataTransformNode().run(store)["transformed_data"]  # NumPy array
+
+NumPy is optional. With NumPy installed (``pip install
+claude-pocketflow-template[vector]``) every transform runs as one bulk
+operation on NumPy arrays, and ``to_column`` converts lists of numbers or
+strings to arrays. Without it, ``array.array`` columns of numbers are
+reversed in bulk and sorted and uppercased through Python objects, and
+lists stay lists. ``benchmarks/bench_transform.py`` shows from which input
+size columns pay off.
+
+Results match the list transforms, except that uppercasing a NumPy string
+array keeps its fixed width, so characters whose uppercase form is longer
+(such as ``"ß"``) may be truncated.
+"""
+
+from array import array
+from typing import Any
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is an optional dependency
+    np = None
+
+HAS_NUMPY = np is not None
+TRANSFORMS = ("uppercase", "reverse", "sort")
+
+
+def is_column(value: Any) -> bool:
+    """Check whether a value is a NumPy array or an ``array.array``."""
+    return isinstance(value, array) or (HAS_NUMPY and isinstance(value, np.ndarray))
+
+
+def to_column(values: list[Any]) -> Any:
+    """Convert a list of numbers or strings to a column.
+
+    Lists mixing types, even integers and floats, are left alone: a column
+    would coerce them to one type, so transforms would return values of
+    other types than the list transforms, or sort values that cannot be
+    compared.
+
+    Returns:
+        A NumPy array, an ``array.array`` of integers or floats when NumPy
+        is not installed, or None if the values do not share one type
+    """
+    kinds = {type(value) for value in values}
+    if len(kinds) != 1:
+        return None
+    if HAS_NUMPY:
+        column = np.asarray(values)
+        return None if column.dtype.kind == "O" or column.ndim != 1 else column
+    if kinds == {int}:
+        try:
+            return array("q", values)
+        except OverflowError:
+            return None
+    if kinds == {float}:
+        return array("d", values)
+    return None
+
+
+def transform_column(column: Any, transform_type: str) -> Any:
+    """Apply a ``DataTransformNode`` transform to a column in bulk.
+
+    Args:
+        column: NumPy array or ``array.array``
+        transform_type: One of ``TRANSFORMS``
+
+    Returns:
+        The transformed column: a NumPy array for NumPy input, otherwise
+        an ``array.array`` (a list of strings for uppercase)
+
+    Raises:
+        ValueError: If the transform type is unknown
+    """
+    if transform_type == "reverse":
+        return column[::-1]
+    if transform_type == "sort":
+        if isinstance(column, array):
+            return array(column.typecode, sorted(column))
+        return np.sort(column, kind="stable")
+    if transform_type == "uppercase":
+        if isinstance(column, array):
+            return [str(item).upper() for item in column]
+        strings = np.strings if hasattr(np, "strings") else np.char
+        if column.dtype.kind not in "UT":
+            column = column.astype(str)
+        return strings.upper(column)
+    msg = f"Unknown transform type: {transform_type}"
+    raise ValueError(msg)
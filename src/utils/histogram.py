@@ -0,0 +1,140 @@
+"""Log-linear latency histogram for PocketFlow.
+
+Durations are recorded in whole microseconds into buckets whose width grows
+with the value: every power of two is split into ``SUB_BUCKETS`` equal
+buckets, so quantiles are accurate to about 1/``SUB_BUCKETS`` (6%) of the
+value. The buckets are allocated up front and cover up to ``2**MAX_BITS``
+microseconds (about 19 hours; longer durations land in the last bucket),
+so a histogram has a fixed size of a few hundred integer counters.
+
+Recording is O(1) and takes no lock. ``record_ns`` takes integer
+nanoseconds (from ``time.perf_counter_ns`` and friends) and buckets them
+with integer arithmetic only, which is about twice as fast as ``record``.
+Under the GIL a sample can very rarely be lost when several threads record
+into the same histogram at once, which does not matter for statistics.
+Quantiles scan the buckets.
+"""
+
+import math
+import threading
+from collections.abc import Iterable
+
+SUB_BITS = 4
+SUB_BUCKETS = 1 << SUB_BITS
+MAX_BITS = 36
+BUCKETS = (MAX_BITS - SUB_BITS + 1) * SUB_BUCKETS
+
+
+def _upper_bound(index: int) -> int:
+    """Largest value in microseconds that falls into a bucket."""
+    if index < SUB_BUCKETS:
+        return index
+    shift, offset = divmod(index - SUB_BUCKETS, SUB_BUCKETS)
+    return ((SUB_BUCKETS + offset + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """Histogram of durations with approximate quantiles.
+
+    ``record`` takes no lock (see the module docstring); ``clear`` and the
+    quantile methods hold one so quantiles never see a half-cleared
+    histogram.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty histogram."""
+        self._counts = [0] * BUCKETS
+        self._count = 0
+        self._total = 0  # Nanoseconds
+        self._max = 0
+        self._lock = threading.Lock()  # Guards clear() against quantiles
+
+    @property
+    def count(self) -> int:
+        """Number of recorded durations."""
+        return self._count
+
+    @property
+    def mean(self) -> float | None:
+        """Mean duration in seconds, or None if nothing was recorded."""
+        return self._total / self._count / 1e9 if self._count else None
+
+    @property
+    def max(self) -> float | None:
+        """Longest duration in seconds, or None if nothing was recorded."""
+        return self._max / 1e9 if self._count else None
+
+    def record(self, seconds: float) -> None:
+        """Record a duration in seconds."""
+        self.record_ns(int(seconds * 1_000_000_000))
+
+    def record_ns(self, nanos: int) -> None:
+        """Record a duration in nanoseconds."""
+        micros = nanos // 1000
+        if micros < SUB_BUCKETS:
+            index = micros if micros > 0 else 0
+        else:
+            shift = micros.bit_length() - SUB_BITS - 1
+            index = shift * SUB_BUCKETS + (micros >> shift)
+            if index >= BUCKETS:
+                index = BUCKETS - 1
+        self._counts[index] += 1
+        self._count += 1
+        self._total += nanos
+        if nanos > self._max:  # noqa: PLR1730 - cheaper than max() here
+            self._max = nanos
+
+    def quantile(self, q: float) -> float | None:
+        """Estimate a quantile of the recorded durations.
+
+        Args:
+            q: Quantile between 0 and 1 (0.95 for the 95th percentile)
+
+        Returns:
+            Upper bound of the bucket holding the quantile, in seconds, or
+            None if nothing was recorded
+        """
+        return self.quantiles([q])[0]
+
+    def quantiles(self, qs: Iterable[float]) -> list[float | None]:
+        """Estimate several quantiles in one pass, see ``quantile``."""
+        qs = list(qs)
+        if any(not 0 <= q <= 1 for q in qs):
+            msg = "Quantiles must be between 0 and 1"
+            raise ValueError(msg)
+
+        with self._lock:
+            counts = list(self._counts)
+            longest = self._max / 1e9
+        # Count from the snapshot so concurrent records cannot skew ranks
+        count = sum(counts)
+        if not count:
+            return [None] * len(qs)
+
+        ranks = sorted((max(math.ceil(q * count), 1), i) for i, q in enumerate(qs))
+        results: list[float | None] = [None] * len(qs)
+        seen = 0
+        pending = iter(ranks)
+        rank, slot = next(pending)
+        for index, bucket in enumerate(counts):
+            seen += bucket
+            while seen >= rank:
+                # Never report more than the longest recorded duration, and
+                # report it for the last bucket, which has no upper bound
+                if index == BUCKETS - 1:
+                    results[slot] = longest
+                else:
+                    results[slot] = min(_upper_bound(index) / 1_000_000, longest)
+                next_rank = next(pending, None)
+                if next_rank is None:
+                    return results
+                rank, slot = next_rank
+        return results
+
+    def clear(self) -> None:
+        """Drop all recorded durations."""
+        with self._lock:
+            self._counts = [0] * BUCKETS
+            self._count = 0
+            self._total = 0
+            self._max = 0
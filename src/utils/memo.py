@@ -0,0 +1,239 @@
+"""Memoization of node execution for PocketFlow.
+
+Nodes that set ``memoize = True`` have their exec phase cached by a
+fingerprint of the store keys they declare in ``reads``. On a hit, the
+writes recorded for that fingerprint are replayed instead of calling
+``exec``. Each node class has its own bounded ``MemoCache``:
+
+    class SummarizeNode(BaseNode):
+        reads = frozenset({"document"})
+        memoize = True
+        memo_maxsize = 1024
+        memo_ttl = 3600
+
+Concurrent misses for the same fingerprint are coalesced, so only one of
+them runs ``exec`` and the others wait for its result.
+
+Cached values are shared by every hit, not copied. Nodes must treat values
+read from the store as immutable and assign new values instead.
+"""
+
+import asyncio
+import hashlib
+import pickle
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Mapping
+from concurrent.futures import Future
+from typing import Any
+
+_MISSING = object()
+
+_caches: "weakref.WeakKeyDictionary[type, MemoCache]" = weakref.WeakKeyDictionary()
+_caches_lock = threading.Lock()
+
+
+def fingerprint(values: Mapping[str, Any]) -> bytes | None:
+    """Fingerprint a mapping of store values.
+
+    Values are pickled in key order and hashed with BLAKE2b. Equal values
+    that pickle differently (such as sets built in a different order) get
+    different fingerprints, which only costs a cache miss.
+
+    Returns:
+        A 16-byte digest, or None if a value cannot be pickled
+    """
+    try:
+        data = pickle.dumps(sorted(values.items()), protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        return None
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def diff_writes(
+    before: Mapping[str, Any], after: Mapping[str, Any]
+) -> tuple[dict[str, Any], set[str]]:
+    """Compute the writes and deletions that turned ``before`` into ``after``.
+
+    Values are compared by identity.
+
+    Returns:
+        Tuple of (written key/value dict, set of deleted keys)
+    """
+    writes = {
+        key: value
+        for key, value in after.items()
+        if before.get(key, _MISSING) is not value
+    }
+    return writes, {key for key in before if key not in after}
+
+
+class MemoCache:
+    """Thread-safe LRU cache with optional TTL and single-flight misses."""
+
+    def __init__(
+        self,
+        maxsize: int = 256,
+        ttl: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize the cache.
+
+        Args:
+            maxsize: Maximum number of entries; least recently used
+                entries are evicted first
+            ttl: Seconds an entry stays valid, or None for no expiry
+            clock: Monotonic clock, replaceable for tests
+        """
+        if maxsize < 1:
+            msg = "maxsize must be at least 1"
+            raise ValueError(msg)
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries: OrderedDict[Any, tuple[float | None, Any]] = OrderedDict()
+        self._inflight: dict[Any, Future] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Number of cached entries (including expired ones not yet evicted)."""
+        return len(self._entries)
+
+    def stats(self) -> dict[str, int]:
+        """Return the hit, miss and coalesced-miss counters and the size."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "size": len(self._entries),
+        }
+
+    def clear(self) -> None:
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.coalesced = 0
+
+    def get_or_compute(
+        self,
+        key: Any,
+        compute: Callable[[], Any],
+        *,
+        cacheable: Callable[[Any], bool] | None = None,
+    ) -> Any:
+        """Return the cached value for ``key``, computing it on a miss.
+
+        Args:
+            key: Cache key
+            compute: Produces the value on a miss
+            cacheable: Optional predicate deciding whether a computed value
+                is stored (it is still returned to concurrent callers)
+
+        Returns:
+            The cached or computed value
+        """
+        value, future, owner = self._claim(key)
+        if future is None:
+            return value
+        if not owner:
+            return future.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            self._fail(key, future, e)
+            raise
+        self._fulfil(key, future, value, cacheable)
+        return value
+
+    async def get_or_compute_async(
+        self,
+        key: Any,
+        compute: Callable[[], Awaitable[Any]],
+        *,
+        cacheable: Callable[[Any], bool] | None = None,
+    ) -> Any:
+        """Awaitable form of ``get_or_compute`` for async computations."""
+        value, future, owner = self._claim(key)
+        if future is None:
+            return value
+        if not owner:
+            return await asyncio.wrap_future(future)
+
+        try:
+            value = await compute()
+        except BaseException as e:
+            self._fail(key, future, e)
+            raise
+        self._fulfil(key, future, value, cacheable)
+        return value
+
+    def _claim(self, key: Any) -> tuple[Any, Future | None, bool]:
+        """Look up ``key`` and register a miss.
+
+        Returns:
+            ``(value, None, False)`` on a hit, ``(None, future, True)`` if
+            the caller must compute the value, or ``(None, future, False)``
+            if another caller is already computing it
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires is None or expires > self.clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value, None, False
+                del self._entries[key]
+
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return None, future, False
+
+            self.misses += 1
+            future = self._inflight[key] = Future()
+            return None, future, True
+
+    def _fail(self, key: Any, future: Future, error: BaseException) -> None:
+        """Release waiters of a failed computation without caching it."""
+        with self._lock:
+            self._inflight.pop(key, None)
+        future.set_exception(error)
+
+    def _fulfil(
+        self,
+        key: Any,
+        future: Future,
+        value: Any,
+        cacheable: Callable[[Any], bool] | None,
+    ) -> None:
+        """Store a computed value and release its waiters."""
+        with self._lock:
+            self._inflight.pop(key, None)
+            if cacheable is None or cacheable(value):
+                expires = None if self.ttl is None else self.clock() + self.ttl
+                self._entries[key] = (expires, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        future.set_result(value)
+
+
+def cache_for(node_class: type) -> MemoCache:
+    """Get the cache of a node class, creating it from its memo settings."""
+    cache = _caches.get(node_class)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(node_class)
+            if cache is None:
+                cache = _caches[node_class] = MemoCache(
+                    node_class.memo_maxsize, node_class.memo_ttl
+                )
+    return cache
@@ -0,0 +1,263 @@
+"""Typed, slotted store objects for PocketFlow flows.
+
+``FlowStore`` is a drop-in replacement for the plain ``dict`` store with a
+declared schema. Subclasses declare their fields as class annotations,
+optionally with defaults, and every field becomes a ``__slots__`` entry:
+
+    class GreetingStore(FlowStore):
+        name: str
+        time_of_day: str = "day"
+        greeting: str | None = None
+
+    store = GreetingStore(name="ada")
+    result = greeting_flow.run(store)
+    result.greeting  # Typed attribute access; a typo raises AttributeError
+
+The flow engine's own keys (``action``, ``error``, ``_flow_path`` and so on)
+are declared by ``FlowStore`` itself. Keys that are not fields go to an
+overflow dict, created on first use, unless the class is declared with
+``strict=True``, in which case writing them raises ``KeyError``.
+
+Stores are full ``MutableMapping`` objects, so nodes, flows and
+``ValidationMixin`` use them through the usual ``store["key"]`` interface.
+A field without a default is absent from the mapping until it is set.
+Attribute access to fields is as fast as Python attribute access gets, and
+an instance takes a fraction of the memory of a dict with the same keys
+(see ``benchmarks/bench_store.py``). Mapping access goes through Python
+methods, specialized per class so they do not look up the fields on every
+call, and still costs several times a dict lookup: about 70ns against
+17ns. In ``bench_store.py``, a looping flow whose node reads and writes a
+few keys by mapping access takes about a third longer per step on a
+``FlowStore`` (4.4µs against 3.2µs). Hot nodes should use attributes.
+"""
+
+from abc import ABCMeta
+from collections.abc import Iterator, Mapping, MutableMapping
+from typing import Any
+
+_MUTABLE_DEFAULTS = (list, dict, set)
+_UNSET = object()
+
+
+class _StoreMeta(ABCMeta):
+    """Turns the annotated fields of store classes into slots."""
+
+    def __new__(
+        mcs,
+        name: str,
+        bases: tuple[type, ...],
+        namespace: dict[str, Any],
+        *,
+        strict: bool | None = None,
+        **kwargs: Any,
+    ) -> type:
+        inherited: tuple[str, ...] = ()
+        defaults: dict[str, Any] = {}
+        for base in reversed(bases):
+            for field in getattr(base, "_fields", ()):
+                if field not in inherited:
+                    inherited += (field,)
+            defaults.update(getattr(base, "_defaults", {}))
+
+        own: list[str] = []
+        for field in namespace.get("__annotations__", {}):
+            if field in namespace:
+                default = namespace.pop(field)
+                if isinstance(default, _MUTABLE_DEFAULTS):
+                    msg = f"Field '{field}' of {name} has a mutable default"
+                    raise ValueError(msg)
+                defaults[field] = default
+            if field in inherited:
+                continue  # Only the default is overridden
+            if any(hasattr(base, field) for base in bases):
+                msg = f"Field '{field}' of {name} clashes with a store attribute"
+                raise ValueError(msg)
+            own.append(field)
+
+        namespace["__slots__"] = (*namespace.get("__slots__", ()), *own)
+        namespace["_fields"] = (*inherited, *own)
+        namespace["_field_set"] = frozenset(namespace["_fields"])
+        namespace["_defaults"] = defaults
+        if strict is not None:
+            namespace["_strict"] = strict
+        cls = super().__new__(mcs, name, bases, namespace, **kwargs)
+
+        # Mapping access of subclasses that keep the FlowStore accessors goes
+        # through copies that see the class's fields as a closure variable
+        for method_name, specialize in _ACCESSORS.items():
+            inherited = getattr(cls, method_name, None)
+            generic = getattr(inherited, "_generic", None)
+            if method_name not in namespace and generic is not None:
+                accessor = specialize(namespace["_field_set"], generic)
+                accessor.__doc__ = generic.__doc__
+                accessor._generic = generic
+                setattr(cls, method_name, accessor)
+        return cls
+
+
+def _field_accessor(method: Any) -> Any:
+    """Mark a ``FlowStore`` mapping accessor that ``_StoreMeta`` specializes."""
+    method._generic = method
+    return method
+
+
+# The specialized accessors below handle the fields of their class and defer
+# to the generic method for other keys, which covers the fields of
+# subclasses reaching them through super()
+
+
+def _getitem(field_set: frozenset[str], generic: Any) -> Any:
+    def __getitem__(self: Any, key: str) -> Any:  # noqa: N807
+        if key in field_set:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        return generic(self, key)
+
+    return __getitem__
+
+
+def _get(field_set: frozenset[str], generic: Any) -> Any:
+    def get(self: Any, key: str, default: Any = None) -> Any:
+        if key in field_set:
+            return getattr(self, key, default)
+        return generic(self, key, default)
+
+    return get
+
+
+def _contains(field_set: frozenset[str], generic: Any) -> Any:
+    def __contains__(self: Any, key: object) -> bool:  # noqa: N807
+        if key in field_set:
+            return hasattr(self, key)  # type: ignore[arg-type]
+        return generic(self, key)
+
+    return __contains__
+
+
+_ACCESSORS = {"__getitem__": _getitem, "get": _get, "__contains__": _contains}
+
+
+class FlowStore(MutableMapping, metaclass=_StoreMeta):
+    """Store with declared, slotted fields and an overflow dict.
+
+    Subclass it to declare fields; see the module docstring.
+    """
+
+    __slots__ = ("_extra",)
+    _strict = False
+
+    action: str
+    error: str
+    error_node: str
+    _flow_name: str
+    _flow_path: Any
+    _flow_steps: int
+    _flow_completed: bool
+    _flow_run_id: str
+    _flow_deadline: float
+    _flow_seed: int
+    _flow_rng: Any
+    _flow_trace: Any
+    _join: dict
+
+    def __init__(self, data: Mapping[str, Any] | None = None, /, **values: Any):
+        """Initialize the store.
+
+        Args:
+            data: Initial contents, fields and other keys alike
+            **values: More initial contents
+        """
+        self._extra: dict[str, Any] | None = None
+        for field, default in self._defaults.items():
+            setattr(self, field, default)
+        if data:
+            self.update(data)
+        if values:
+            self.update(values)
+
+    @_field_accessor
+    def __getitem__(self, key: str) -> Any:
+        """Look up a field, then the overflow dict."""
+        if key in self._field_set:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    @_field_accessor
+    def get(self, key: str, default: Any = None) -> Any:
+        """Look up a key without raising for missing ones."""
+        if key in self._field_set:
+            return getattr(self, key, default)
+        if self._extra is None:
+            return default
+        return self._extra.get(key, default)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        """Set a field, or a key in the overflow dict."""
+        if key in self._field_set:
+            setattr(self, key, value)
+        elif self._strict:
+            msg = f"{self.__class__.__name__} has no field '{key}'"
+            raise KeyError(msg)
+        elif self._extra is None:
+            self._extra = {key: value}
+        else:
+            self._extra[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        """Unset a field, or remove a key from the overflow dict."""
+        if key in self._field_set:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self._extra is None:
+            raise KeyError(key)
+        else:
+            del self._extra[key]
+
+    @_field_accessor
+    def __contains__(self, key: object) -> bool:
+        """Check whether a field is set or the overflow dict has a key."""
+        if key in self._field_set:
+            return hasattr(self, key)  # type: ignore[arg-type]
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the set fields in declaration order, then other keys."""
+        for field in self._fields:
+            if hasattr(self, field):
+                yield field
+        if self._extra:
+            yield from list(self._extra)
+
+    def __len__(self) -> int:
+        """Number of set fields plus other keys."""
+        count = sum(1 for field in self._fields if hasattr(self, field))
+        return count + (len(self._extra) if self._extra else 0)
+
+    def __repr__(self) -> str:
+        """Show the contents."""
+        return f"{self.__class__.__name__}({self.to_dict()!r})"
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the contents as a plain dict."""
+        return {key: self[key] for key in self}
+
+    def fork(self) -> "FlowStore":
+        """Create a shallow copy of the same class, sharing the values."""
+        child = self.__class__.__new__(self.__class__)
+        child._extra = None if self._extra is None else dict(self._extra)
+        for field in self._fields:
+            value = getattr(self, field, _UNSET)
+            if value is not _UNSET:
+                setattr(child, field, value)
+        return child
+
+    copy = fork
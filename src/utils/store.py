@@ -0,0 +1,278 @@
+"""Copy-on-write store for PocketFlow flows.
+
+``CowStore`` is a drop-in replacement for the plain ``dict`` store. It keeps
+its contents as a chain of immutable layers plus one mutable layer of
+pending changes:
+
+- ``commit`` freezes the pending changes into a new layer, optionally
+  labelled with the node that made them
+- ``fork`` (and its alias ``snapshot``) commits and returns a new store on
+  top of the same layers, so copying costs only the pending changes
+  instead of the size of the store
+- ``delta_since`` returns the writes and deletions a fork made, without
+  comparing untouched values, which is what fan-out merging uses
+
+Flows commit the store after every node, so the layers double as a record
+of per-node deltas (see ``deltas``). Lookups walk the layer chain, so once
+it grows deeper than ``max_depth`` the newest layers are compacted into one.
+
+Values themselves are shared between layers and forks, not copied. Nodes
+must assign new values instead of mutating shared ones in place.
+"""
+
+from collections.abc import Iterator, Mapping, MutableMapping
+from typing import Any
+
+_MISSING = object()
+
+# Compaction needs at least one layer above the base to merge into
+MIN_DEPTH = 2
+
+
+class _Layer:
+    """Immutable set of changes on top of a parent layer."""
+
+    __slots__ = ("data", "deleted", "depth", "label", "parent")
+
+    def __init__(
+        self,
+        data: dict[str, Any],
+        deleted: frozenset[str],
+        parent: "_Layer | None",
+        label: str | None = None,
+    ):
+        self.data = data
+        self.deleted = deleted
+        self.parent = parent
+        self.depth = 1 if parent is None else parent.depth + 1
+        self.label = label
+
+
+def _apply(
+    writes: dict[str, Any],
+    deleted: set[str],
+    layer_data: Mapping[str, Any],
+    layer_deleted: "set[str] | frozenset[str]",
+) -> None:
+    """Fold one layer's changes into accumulated writes and deletions."""
+    for key in layer_deleted:
+        writes.pop(key, None)
+        deleted.add(key)
+    for key, value in layer_data.items():
+        writes[key] = value
+        deleted.discard(key)
+
+
+class CowStore(MutableMapping):
+    """Layered, copy-on-write mapping usable as a flow store."""
+
+    def __init__(self, data: Mapping[str, Any] | None = None, *, max_depth: int = 16):
+        """Initialize the store.
+
+        Args:
+            data: Initial contents (copied once into the base layer)
+            max_depth: Number of layers after which the newest layers are
+                compacted into one
+        """
+        if max_depth < MIN_DEPTH:
+            msg = f"max_depth must be at least {MIN_DEPTH}"
+            raise ValueError(msg)
+
+        self.max_depth = max_depth
+        self._parent = _Layer(dict(data or {}), frozenset(), None)
+        self._writes: dict[str, Any] = {}
+        self._deleted: set[str] = set()
+        # Layer this store was forked from, used by delta_since
+        self._fork_point: _Layer | None = None
+
+    def __getitem__(self, key: str) -> Any:
+        """Look up a key in the pending changes, then in the layers."""
+        value = self._writes.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if key in self._deleted:
+            raise KeyError(key)
+
+        layer = self._parent
+        while layer is not None:
+            value = layer.data.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+            if key in layer.deleted:
+                break
+            layer = layer.parent
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        """Record a write in the pending changes."""
+        self._writes[key] = value
+        self._deleted.discard(key)
+
+    def __delitem__(self, key: str) -> None:
+        """Record a deletion in the pending changes."""
+        if key not in self:
+            raise KeyError(key)
+        self._writes.pop(key, None)
+        self._deleted.add(key)
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the keys of the merged view."""
+        return iter(self.to_dict())
+
+    def items(self) -> Any:
+        """Return the items of the merged view."""
+        return self.to_dict().items()
+
+    def values(self) -> Any:
+        """Return the values of the merged view."""
+        return self.to_dict().values()
+
+    def __len__(self) -> int:
+        """Number of keys in the merged view (O(size of the store))."""
+        return len(self.to_dict())
+
+    def __repr__(self) -> str:
+        """Show the merged contents."""
+        return f"{self.__class__.__name__}({self.to_dict()!r})"
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the merged contents as a plain dict."""
+        layers = []
+        layer: _Layer | None = self._parent
+        while layer is not None:
+            layers.append(layer)
+            layer = layer.parent
+
+        merged: dict[str, Any] = {}
+        deleted: set[str] = set()
+        for layer in reversed(layers):
+            _apply(merged, deleted, layer.data, layer.deleted)
+        _apply(merged, deleted, self._writes, self._deleted)
+        return merged
+
+    def changes(self) -> tuple[dict[str, Any], set[str]]:
+        """Return the pending (uncommitted) writes and deletions."""
+        return dict(self._writes), set(self._deleted)
+
+    def commit(self, label: str | None = None) -> None:
+        """Freeze the pending changes into a new layer.
+
+        Args:
+            label: Optional label for the layer, such as the node ID that
+                made the changes
+        """
+        if not self._writes and not self._deleted:
+            return
+
+        self._parent = _Layer(
+            self._writes, frozenset(self._deleted), self._parent, label
+        )
+        self._writes = {}
+        self._deleted = set()
+        if self._parent.depth > self.max_depth:
+            self._compact()
+
+    def deltas(self) -> list[tuple[str | None, dict[str, Any], frozenset[str]]]:
+        """Return the committed ``(label, writes, deleted)`` deltas, oldest first.
+
+        Deltas that were compacted appear as a single unlabelled delta.
+        The base layer (the initial data) is not included.
+        """
+        result = []
+        layer = self._parent
+        while layer.parent is not None:
+            result.append((layer.label, dict(layer.data), layer.deleted))
+            layer = layer.parent
+        result.reverse()
+        return result
+
+    def fork(self) -> "CowStore":
+        """Create an independent copy that shares all current layers.
+
+        Costs O(pending changes), not O(size of the store). Neither store
+        sees the other's later writes.
+        """
+        self.commit()
+        child = self.__class__(max_depth=self.max_depth)
+        child._parent = child._fork_point = self._parent
+        return child
+
+    snapshot = fork
+    copy = fork
+
+    def delta_since(self, base: Mapping[str, Any]) -> tuple[dict[str, Any], set]:
+        """Compute the writes and deletions made relative to ``base``.
+
+        When this store was forked from ``base``, only the layers added
+        since the fork are inspected. Otherwise values are compared by
+        identity against ``base``.
+
+        Returns:
+            Tuple of (written key/value dict, set of deleted keys)
+        """
+        point = self._fork_point
+        if isinstance(base, CowStore) and base._has_layer(point):
+            layers = []
+            layer = self._parent
+            while layer is not point:
+                layers.append(layer)
+                layer = layer.parent
+
+            writes: dict[str, Any] = {}
+            deleted: set[str] = set()
+            for layer in reversed(layers):
+                _apply(writes, deleted, layer.data, layer.deleted)
+            _apply(writes, deleted, self._writes, self._deleted)
+            return writes, deleted
+
+        writes = {
+            key: value
+            for key, value in self.items()
+            if base.get(key, _MISSING) is not value
+        }
+        return writes, {key for key in base if key not in self}
+
+    def _has_layer(self, target: _Layer | None) -> bool:
+        """Check whether ``target`` is in this store's layer chain."""
+        if target is None:
+            return False
+        layer = self._parent
+        while layer is not None and layer.depth >= target.depth:
+            if layer is target:
+                return True
+            layer = layer.parent
+        return False
+
+    def _compact(self) -> None:
+        """Merge the newest layers into one to bound the chain depth.
+
+        Layers at or below the fork point are kept so ``delta_since`` keeps
+        working. Without a fork point, the merged layer is folded into the
+        base layer once it grows to half its size.
+        """
+        stop = self._fork_point
+        if stop is None:
+            # Keep the base layer
+            stop = self._parent
+            while stop.parent is not None:
+                stop = stop.parent
+
+        layers = []
+        layer = self._parent
+        while layer is not stop:
+            layers.append(layer)
+            layer = layer.parent
+        if len(layers) < MIN_DEPTH:
+            return
+
+        writes: dict[str, Any] = {}
+        deleted: set[str] = set()
+        for layer in reversed(layers):
+            _apply(writes, deleted, layer.data, layer.deleted)
+
+        if self._fork_point is None and 2 * len(writes) >= len(stop.data):
+            base = dict(stop.data)
+            _apply(base, set(), writes, deleted)
+            self._parent = _Layer(base, frozenset(), None)
+        else:
+            self._parent = _Layer(writes, frozenset(deleted), stop)
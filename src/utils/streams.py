@@ -0,0 +1,113 @@
+"""Chunked streams for transforms whose data does not fit in memory.
+
+``DataTransformNode`` streams ``input_data`` that is an iterable but not a
+list or a column, such as a generator or an open file, and writes the
+results chunk by chunk to ``store["output_sink"]``:
+
+    with open("names.txt") as source, open("upper.txt", "w") as target:
+        DataTransformNode().run({
+            "input_data": (line.rstrip("\\n") for line in source),
+            "transform_type": "uppercase",
+            "output_sink": line_writer(target),
+        })
+
+A sink is a callable taking a list (or column) of results, or an object
+with an ``extend`` method, such as a list. Sources that already come in
+chunks, such as a reader returning a block of rows per call, are passed as
+``Chunks(reader)`` and processed one chunk at a time as they are.
+
+Only one chunk is held in memory at a time. ``reverse`` emits the last
+chunk first: a ``Chunks`` source over a sequence is read backwards, and any
+other source is first spilled chunk by chunk to a temporary file. ``sort``
+needs the whole input and cannot be streamed.
+"""
+
+import pickle
+import tempfile
+from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+from itertools import islice
+from typing import IO, Any
+
+from src.utils.columns import is_column
+
+DEFAULT_CHUNK_SIZE = 10_000
+
+
+class Chunks:
+    """Source that already yields its data in chunks."""
+
+    def __init__(self, chunks: Iterable[Any]):
+        """Wrap an iterable of chunks.
+
+        Args:
+            chunks: Iterable of lists or columns; a sequence of them can be
+                read backwards without spilling
+        """
+        self.chunks = chunks
+
+    def __iter__(self) -> Iterator[Any]:
+        """Iterate over the chunks."""
+        return iter(self.chunks)
+
+
+def is_stream(value: Any) -> bool:
+    """Check whether ``input_data`` is to be streamed.
+
+    Lists, strings, mappings and columns are materialized data, not streams.
+    """
+    if isinstance(value, list | str | bytes | Mapping):
+        return False
+    return isinstance(value, Iterable) and not is_column(value)
+
+
+def iter_chunks(source: Iterable[Any], size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Any]:
+    """Split a stream into chunks, passing ``Chunks`` sources through."""
+    if isinstance(source, Chunks):
+        yield from source
+        return
+    iterator = iter(source)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def reversed_chunks(
+    source: Iterable[Any], size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[Any]:
+    """Yield the chunks of a stream last first, each one reversed."""
+    if isinstance(source, Chunks) and isinstance(source.chunks, Sequence):
+        for chunk in reversed(source.chunks):
+            yield chunk[::-1]
+        return
+
+    with tempfile.TemporaryFile() as spill:
+        offsets = []
+        for chunk in iter_chunks(source, size):
+            offsets.append(spill.tell())
+            pickle.dump(chunk, spill, protocol=pickle.HIGHEST_PROTOCOL)
+        for offset in reversed(offsets):
+            spill.seek(offset)
+            yield pickle.load(spill)[::-1]  # noqa: S301 - written above
+
+
+def sink_writer(sink: Any) -> Callable[[Any], Any]:
+    """Get the function that writes a chunk of results to a sink.
+
+    Raises:
+        TypeError: If the sink is neither callable nor has ``extend``
+    """
+    extend = getattr(sink, "extend", None)
+    if extend is not None:
+        return extend
+    if callable(sink):
+        return sink
+    msg = "output_sink must be callable or have an extend method"
+    raise TypeError(msg)
+
+
+def line_writer(file: IO[str]) -> Callable[[Iterable[Any]], None]:
+    """Sink writing each result as a line of a text file."""
+
+    def write(chunk: Iterable[Any]) -> None:
+        file.write("".join(f"{item}\n" for item in chunk))
+
+    return write
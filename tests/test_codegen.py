@@ -0,0 +1,217 @@
+"""Differential tests for flow code generation."""
+
+import random
+
+import pytest
+
+from src.flows.base import AsyncBaseFlow, BaseFlow, FlowNode
+from src.flows.codegen import compile_flow, generate_source
+from src.flows.examples import (
+    data_pipeline_flow,
+    greeting_flow,
+    random_conditional_flow,
+)
+from src.flows.hooks import FlowHook
+from src.flows.parallel import FanOut
+from src.nodes.base import BaseNode, JoinNode
+from src.nodes.examples import DataTransformNode, GreetingNode
+from src.utils.store import CowStore
+
+
+class CountNode(BaseNode):
+    """Loops until the counter reaches the limit."""
+
+    def exec(self, store):
+        store["count"] = store.get("count", 0) + 1
+        store["action"] = "loop" if store["count"] < store["limit"] else "done"
+        return store
+
+
+class BrokenNode(GreetingNode):
+    """Node that cannot be constructed, so its error escapes ``node.run``."""
+
+    def __init__(self):
+        msg = "cannot construct"
+        raise RuntimeError(msg)
+
+
+def loop_flow(scope="step"):
+    """Two nodes calling each other until the counter reaches the limit."""
+    return BaseFlow(
+        {
+            "start": FlowNode(CountNode, {"loop": "middle"}, scope=scope),
+            "middle": FlowNode(
+                CountNode, {"loop": "start", "done": "end"}, scope=scope
+            ),
+        },
+        name="LoopFlow",
+    )
+
+
+def assert_same_run(flow, store, max_steps=100, seed=0):
+    """Run a flow both ways on copies of a store and compare the results."""
+    compiled = compile_flow(flow)
+
+    random.seed(seed)
+    expected = flow.run(dict(store), max_steps)
+    random.seed(seed)
+    actual = compiled(dict(store), max_steps)
+
+    assert actual == expected
+    assert list(actual["_flow_path"]) == list(expected["_flow_path"])
+
+
+class TestDifferential:
+    """Compiled flows must return exactly what ``run`` returns."""
+
+    @pytest.mark.parametrize(
+        "store",
+        [{"name": "ada"}, {"name": "  bob  ", "time_of_day": "evening"}, {}],
+    )
+    def test_greeting_flow(self, store):
+        """Test success and error paths of the greeting flow."""
+        assert_same_run(greeting_flow, store)
+
+    @pytest.mark.parametrize("seed", range(10))
+    def test_random_conditional_flow(self, seed):
+        """Test every branch of the conditional flow."""
+        assert_same_run(
+            random_conditional_flow,
+            {"input_data": ["a", "b"], "threshold": 50},
+            seed=seed,
+        )
+
+    @pytest.mark.parametrize(
+        "store",
+        [
+            {"input_data": ["a"], "transform_type": "uppercase"},
+            {"input_data": "not a list"},
+            {},
+        ],
+    )
+    def test_data_pipeline_flow(self, store):
+        """Test the pipeline including its error handler."""
+        assert_same_run(data_pipeline_flow, store)
+
+    @pytest.mark.parametrize("scope", ["step", "run", "flow", "pooled"])
+    @pytest.mark.parametrize(("limit", "max_steps"), [(5, 100), (50, 10), (4, 4)])
+    def test_loops_and_max_steps(self, scope, limit, max_steps):
+        """Test cycles, instance scopes and the max_steps limit."""
+        assert_same_run(loop_flow(scope), {"limit": limit}, max_steps)
+
+    def test_escaping_exceptions(self):
+        """Test errors raised outside the node's own error handling."""
+        flow = BaseFlow(
+            {
+                "start": FlowNode(GreetingNode, {"success": "broken"}),
+                "broken": FlowNode(BrokenNode, {"error": "start"}),
+            }
+        )
+
+        assert_same_run(flow, {"name": "ada"})
+
+    def test_unknown_actions_fall_back(self):
+        """Test undeclared actions use the default transition."""
+        flow = BaseFlow(
+            {
+                "start": FlowNode(CountNode, {"default": "next", "loop": "start"}),
+                "next": FlowNode(DataTransformNode, {"success": "end"}),
+            }
+        )
+
+        assert_same_run(flow, {"limit": 3, "input_data": ["x"]})
+        assert_same_run(flow, {"limit": 1, "input_data": ["x"]})
+
+    def test_subflows(self):
+        """Test flows with inlined sub-flows."""
+        flow = BaseFlow(
+            {
+                "start": FlowNode(
+                    greeting_flow, {"success": "transform", "error": "end"}
+                ),
+                "transform": FlowNode(DataTransformNode, {"success": "end"}),
+            }
+        )
+
+        assert_same_run(flow, {"name": "ada", "input_data": ["x"]})
+        assert_same_run(flow, {"input_data": ["x"]})
+
+
+class TestCodegen:
+    """Test code generation options and limits."""
+
+    def test_transitions_are_unrolled(self):
+        """Test the generated source branches on actions directly."""
+        source = generate_source(random_conditional_flow)
+
+        assert "if action == 'success':" in source
+        assert "elif action == 'below_threshold':" in source
+        assert "flow_definition" not in source
+
+    def test_code_is_cached_by_definition(self):
+        """Test flows with the same definition share compiled code."""
+        first = compile_flow(loop_flow())
+        second = compile_flow(loop_flow())
+
+        assert first is not second
+        assert first.__code__ is second.__code__
+
+    def test_without_path_recording(self):
+        """Test path bookkeeping can be left out."""
+        run = compile_flow(loop_flow(), record_path=False)
+
+        result = run({"limit": 3})
+
+        assert "_flow_path" not in result
+        assert result["_flow_steps"] == 3
+        assert result["_flow_completed"] is True
+
+    def test_unsupported_runs_use_run(self):
+        """Test runs with hooks, deadlines or CowStores are delegated."""
+        events = []
+
+        class Recorder(FlowHook):
+            def on_flow_end(self, run_id, flow_name, store):
+                events.append((run_id, flow_name, store))
+
+        flow = loop_flow()
+        run = compile_flow(flow)
+
+        cow = run(CowStore({"limit": 2}))
+        assert isinstance(cow, CowStore)
+        assert [label for label, _, _ in cow.deltas()] == ["start", "middle"]
+
+        flow.add_hook(Recorder())
+        run({"limit": 2})
+        assert len(events) == 1
+
+    def test_seeded_runs_use_run(self):
+        """Test runs with random streams are delegated."""
+        definition = random_conditional_flow.flow_definition
+        store = {"input_data": ["a"], "threshold": 50}
+
+        result = compile_flow(BaseFlow(definition, seed=4))(dict(store))
+        expected = BaseFlow(definition, seed=4).run(dict(store))
+        replay = compile_flow(random_conditional_flow)(dict(store, _flow_seed=0))
+
+        assert result["_flow_seed"] == expected["_flow_seed"]
+        assert result["random_number"] == expected["random_number"]
+        assert replay["_flow_rng"].initial_seed == 0
+
+    def test_unsupported_flows_are_rejected(self):
+        """Test flows using features the generated code lacks."""
+        fanout = BaseFlow(
+            {
+                "start": FlowNode(
+                    GreetingNode, {"success": FanOut(["a", "b"], join="join")}
+                ),
+                "a": FlowNode(GreetingNode, {"success": "join"}),
+                "b": FlowNode(GreetingNode, {"success": "join"}),
+                "join": FlowNode(JoinNode, {"success": "end"}),
+            }
+        )
+
+        with pytest.raises(ValueError, match="fan-outs"):
+            compile_flow(fanout)
+        with pytest.raises(ValueError, match="async"):
+            compile_flow(AsyncBaseFlow({"start": FlowNode(GreetingNode)}))
@@ -1,11 +1,16 @@
 """Tests for the flow daemon."""
 
 import asyncio
+import time
 from unittest.mock import AsyncMock, patch
 
 import pytest
 
 from claude_pocketflow_template.daemon import FlowDaemon
+from src.flows.base import AsyncBaseFlow, BaseFlow, FlowNode
+from src.flows.examples import greeting_flow
+from src.nodes.base import AsyncBaseNode
+from src.nodes.examples import GreetingNode
 
 
 class MockFlow:
@@ -252,6 +257,59 @@ class TestFlowDaemonWithFlows:
         except asyncio.TimeoutError:
             start_task.cancel()
 
+    async def test_execute_sync_flow(self, test_config):
+        """Test executing a sync flow runs it off the event loop."""
+        daemon = FlowDaemon(test_config)
+        daemon.add_flow("greeting", greeting_flow)
+        input_data = {"name": "daemon"}
+
+        result = await daemon.execute_flow("greeting", input_data)
+
+        assert result["status"] == "completed"
+        assert result["result"]["greeting"] == "Hello, Daemon! 👋"
+        assert input_data == {"name": "daemon"}  # Input is not mutated
+
+    async def test_execute_flow_sets_deadline(self, test_config):
+        """Test runs get a deadline from config.flow_timeout."""
+        daemon = FlowDaemon(test_config)
+        daemon.add_flow("greeting", greeting_flow)
+
+        before = time.time()
+        result = await daemon.execute_flow("greeting", {"name": "daemon"})
+
+        deadline = result["result"]["_flow_deadline"]
+        assert before + 30 <= deadline <= time.time() + 30
+
+    async def test_execute_async_flow(self, test_config):
+        """Test executing an async flow awaits it."""
+
+        class EchoNode(AsyncBaseNode):
+            async def exec(self, store):
+                await asyncio.sleep(0)
+                store["echo"] = store["message"]
+                store["action"] = "success"
+                return store
+
+        flow = AsyncBaseFlow({"start": FlowNode(EchoNode, {"success": "end"})})
+        daemon = FlowDaemon(test_config)
+        daemon.add_flow("echo", flow)
+
+        result = await daemon.execute_flow("echo", {"message": "hi"})
+
+        assert result["status"] == "completed"
+        assert result["result"]["echo"] == "hi"
+
+    def test_rejects_flow_that_cannot_finish(self, test_config):
+        """Test flows whose graph loops forever are rejected."""
+        flow = BaseFlow(
+            {"start": FlowNode(GreetingNode, {"default": "start", "error": "start"})}
+        )
+        daemon = FlowDaemon(test_config)
+
+        with pytest.raises(ValueError, match="loop forever"):
+            daemon.add_flow("stuck", flow)
+        assert "stuck" not in daemon.flows
+
 
 class TestFlowDaemonLogging:
     """Test daemon logging behavior."""
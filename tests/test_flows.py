@@ -1,17 +1,48 @@
 """Comprehensive tests for flow execution and integration."""
 
-from unittest.mock import patch
+import asyncio
+import json
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import ClassVar
+from unittest.mock import ANY, patch
 
 import pytest
 
-from src.flows.base import BaseFlow, FlowNode
+from claude_pocketflow_template.config import Config
+from src.flows.base import AsyncBaseFlow, BaseFlow, FlowNode
+from src.flows.checkpoint import FileCheckpointer
+from src.flows.dataflow import Speculation
 from src.flows.examples import (
     data_pipeline_flow,
     greeting_flow,
     random_conditional_flow,
 )
-from src.nodes.base import BaseNode
-from src.nodes.examples import GreetingNode
+from src.flows.executors import DEFAULT_THREAD_WORKERS, configure_thread_pool
+from src.flows.hedging import hedge_stats
+from src.flows.hooks import CPU_SAMPLE_EVERY, FlowHook, SpanRecorder
+from src.flows.instances import PooledProvider
+from src.flows.parallel import FanOut
+from src.flows.path import FlowPath
+from src.flows.plan import END, STOP
+from src.nodes.base import AsyncBaseNode, BaseNode, JoinNode
+from src.nodes.examples import DataTransformNode, GreetingNode, RandomNumberNode
+from src.utils.rng import rng_for
+
+
+class CPUBoundTransformNode(DataTransformNode):
+    """DataTransformNode whose exec phase runs in a worker process."""
+
+    cpu_bound = True
+
+    def exec(self, store):
+        store = super().exec(store)
+        store["exec_pid"] = os.getpid()
+        store["exec_keys"] = sorted(store)
+        return store
 
 
 class TestBaseFlow:
@@ -372,3 +403,2167 @@ class TestFlowRobustness:
 
         assert result["_flow_completed"] is True
         assert result["_flow_steps"] <= 1
+
+
+class TestExecutionPlan:
+    """Test compilation of flow definitions into execution plans."""
+
+    def test_start_is_index_zero(self):
+        """Test 'start' always compiles to node index 0."""
+        flow_def = {
+            "other": FlowNode(node_class=GreetingNode, transitions={"success": "end"}),
+            "start": FlowNode(
+                node_class=GreetingNode, transitions={"success": "other"}
+            ),
+        }
+        plan = BaseFlow(flow_def).plan
+
+        assert plan.nodes[0].node_id == "start"
+        assert plan.node_index == {"start": 0, "other": 1}
+
+    def test_transition_resolution(self):
+        """Test the dense transition tables apply the run-time fallbacks."""
+        flow_def = {
+            "start": FlowNode(
+                node_class=GreetingNode,
+                transitions={"success": "second", "default": "second"},
+            ),
+            "second": FlowNode(
+                node_class=GreetingNode,
+                transitions={"success": "end", "error": "start"},
+            ),
+        }
+        plan = BaseFlow(flow_def).plan
+        start, second = plan.nodes
+
+        assert plan.next_index(start, "success") == 1
+        assert plan.next_index(start, "unknown") == 1  # default transition
+        assert plan.next_index(start, "error") == STOP  # no error transition
+        assert plan.next_index(second, "error") == 0
+        assert plan.next_index(second, "unknown") == END  # no default
+        assert plan.target_name(END) == "end"
+
+    def test_direct_nodes(self):
+        """Test only plain step-scoped nodes are marked to run inline."""
+        timed = type("TimedNode", (GreetingNode,), {"node_timeout": 5})
+        flow_def = {
+            "start": FlowNode(GreetingNode, {"success": "run"}),
+            "run": FlowNode(GreetingNode, {"success": "cpu"}, scope="run"),
+            "cpu": FlowNode(CPUBoundTransformNode, {"success": "timed"}),
+            "timed": FlowNode(timed, {"success": "end"}),
+        }
+        plan = BaseFlow(flow_def).plan
+
+        assert [node.direct for node in plan.nodes] == [True, False, False, False]
+
+        result = BaseFlow({"start": FlowNode(GreetingNode)}).run({"name": "Ada"})
+
+        assert "Ada" in result["greeting"]
+        assert result["_flow_path"] == ["start"]
+
+    def test_plan_is_immutable(self):
+        """Test the compiled plan cannot be modified."""
+        plan = greeting_flow.plan
+
+        with pytest.raises((AttributeError, TypeError)):
+            plan.node_index["new"] = 1  # type: ignore[index]
+        with pytest.raises(AttributeError):
+            plan.nodes = ()  # type: ignore[misc]
+
+
+class TestNodeScopes:
+    """Test node instance scopes and pooling."""
+
+    @staticmethod
+    def make_counting_node():
+        """Create a looping node class that counts its instances."""
+
+        class CountingNode(BaseNode):
+            instances = 0
+
+            def __init__(self):
+                super().__init__()
+                type(self).instances += 1
+
+            def exec(self, store):
+                store["visits"] = store.get("visits", 0) + 1
+                store["action"] = "loop" if store["visits"] < 3 else "done"
+                return store
+
+        return CountingNode
+
+    def run_loop_flow(self, scope, runs=2):
+        """Run a three-visit looping flow and return the node class."""
+        node_class = self.make_counting_node()
+        flow_def = {
+            "start": FlowNode(
+                node_class=node_class, transitions={"loop": "start"}, scope=scope
+            )
+        }
+        flow = BaseFlow(flow_def, name="ScopeTestFlow")
+        for _ in range(runs):
+            result = flow.run({})
+            assert result["_flow_completed"] is True
+            assert result["_flow_steps"] == 3
+        return node_class
+
+    def test_step_scope(self):
+        """Test the default scope creates an instance per visit."""
+        assert self.run_loop_flow("step").instances == 6
+
+    def test_run_scope(self):
+        """Test run scope reuses one instance per run."""
+        assert self.run_loop_flow("run").instances == 2
+
+    def test_flow_scope(self):
+        """Test flow scope shares one instance across runs."""
+        assert self.run_loop_flow("flow").instances == 1
+
+    def test_pooled_scope(self):
+        """Test pooled scope reuses released instances."""
+        assert self.run_loop_flow("pooled").instances == 1
+
+    def test_unknown_scope(self):
+        """Test validation rejects unknown scopes."""
+        flow_def = {"start": FlowNode(node_class=GreetingNode, scope="forever")}
+
+        with pytest.raises(ValueError, match="unknown scope"):
+            BaseFlow(flow_def)
+
+    def test_pool_is_bounded_under_concurrency(self):
+        """Test concurrent runs never exceed the pool size."""
+        node_class = self.make_counting_node()
+        flow_def = {
+            "start": FlowNode(
+                node_class=node_class,
+                transitions={"loop": "start"},
+                scope="pooled",
+                pool_size=2,
+            )
+        }
+        flow = BaseFlow(flow_def, name="PoolTestFlow")
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: flow.run({}), range(32)))
+
+        assert all(result["_flow_completed"] for result in results)
+        assert node_class.instances <= 2
+
+    def test_pool_blocks_until_release(self):
+        """Test acquire waits for an instance when the pool is exhausted."""
+        provider = PooledProvider(GreetingNode, max_size=1)
+        node = provider.acquire({})
+
+        assert provider.try_acquire() is None
+
+        provider.release(node)
+        assert provider.try_acquire() is node
+
+    async def test_async_acquire_waits_on_the_loop(self):
+        """Test released instances go to async waiters, cancelled ones skipped."""
+        provider = PooledProvider(GreetingNode, max_size=1)
+        node = provider.acquire({})
+        cancelled = asyncio.ensure_future(provider.acquire_async({}))
+        waiting = asyncio.ensure_future(provider.acquire_async({}))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+
+        threading.Thread(target=provider.release, args=(node,)).start()
+
+        assert await asyncio.wait_for(waiting, timeout=5) is node
+        assert cancelled.cancelled()
+        assert provider.try_acquire() is None
+
+
+class TestAsyncBaseFlow:
+    """Test the async flow engine."""
+
+    class SleepNode(AsyncBaseNode):
+        """Async node simulating an I/O-bound call."""
+
+        async def exec(self, store):
+            await asyncio.sleep(0.05)
+            store["slept"] = store.get("slept", 0) + 1
+            store["action"] = "success"
+            return store
+
+    async def test_mixed_sync_and_async_nodes(self):
+        """Test async nodes are awaited and sync nodes are offloaded."""
+        flow_def = {
+            "start": FlowNode(
+                node_class=self.SleepNode, transitions={"success": "greet"}
+            ),
+            "greet": FlowNode(node_class=GreetingNode, transitions={"success": "end"}),
+        }
+        flow = AsyncBaseFlow(flow_def, name="MixedFlow")
+
+        result = await flow.run({"name": "async"})
+
+        assert result["_flow_completed"] is True
+        assert result["_flow_path"] == ["start", "greet"]
+        assert result["slept"] == 1
+        assert result["greeting"] == "Hello, Async! 👋"
+
+    async def test_many_flows_in_flight(self):
+        """Test concurrent runs overlap instead of blocking each other."""
+        flow_def = {
+            "start": FlowNode(node_class=self.SleepNode, transitions={"success": "end"})
+        }
+        flow = AsyncBaseFlow(flow_def, name="SleepFlow")
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(flow.run({}) for _ in range(200)))
+        elapsed = time.perf_counter() - started
+
+        assert all(result["_flow_completed"] for result in results)
+        assert elapsed < 2.0  # Sequential execution would take 10s
+
+    async def test_pooled_waits_do_not_hold_workers(self):
+        """Test runs waiting for a pooled instance leave the thread pool free."""
+
+        class SlowNode(BaseNode):
+            def exec(self, store):
+                time.sleep(0.01)
+                store["action"] = "success"
+                return store
+
+        flow = AsyncBaseFlow(
+            {
+                "start": FlowNode(
+                    SlowNode, {"success": "end"}, scope="pooled", pool_size=1
+                )
+            }
+        )
+        configure_thread_pool(4)
+        try:
+            results = await asyncio.wait_for(
+                asyncio.gather(*(flow.run({}) for _ in range(12))), timeout=10
+            )
+        finally:
+            configure_thread_pool(DEFAULT_THREAD_WORKERS)
+
+        provider = flow._providers[0]
+        assert all(result["_flow_completed"] for result in results)
+        assert isinstance(provider, PooledProvider)
+        assert provider.size == 1
+
+    async def test_async_node_error(self):
+        """Test errors in async nodes route like sync errors."""
+
+        class FailingNode(AsyncBaseNode):
+            async def exec(self, store):  # noqa: ARG002
+                msg = "async failure"
+                raise RuntimeError(msg)
+
+        flow = AsyncBaseFlow({"start": FlowNode(FailingNode, {"success": "end"})})
+
+        result = await flow.run()
+
+        assert result["action"] == "error"
+        assert result["error"] == "async failure"
+        assert result["_flow_completed"] is False
+
+    def test_sync_flow_rejects_async_nodes(self):
+        """Test BaseFlow refuses nodes it cannot run."""
+        flow_def = {"start": FlowNode(node_class=self.SleepNode)}
+
+        with pytest.raises(ValueError, match="use AsyncBaseFlow"):
+            BaseFlow(flow_def)
+
+
+class TestFanOut:
+    """Test fan-out transitions and join nodes."""
+
+    class SourceNode(BaseNode):
+        """Node that starts the fan-out."""
+
+        def exec(self, store):
+            store["action"] = "success"
+            return store
+
+    @staticmethod
+    def make_branch_node(key, value, delay=0.0, *, fail=False):
+        """Create a node class that writes ``key`` after ``delay`` seconds."""
+
+        class BranchNode(BaseNode):
+            def exec(self, store):
+                time.sleep(delay)
+                if fail:
+                    msg = f"{key} failed"
+                    raise RuntimeError(msg)
+                store[key] = value
+                store["action"] = "success"
+                return store
+
+        return BranchNode
+
+    @staticmethod
+    def make_join(**attributes):
+        """Create a JoinNode subclass with the given class attributes."""
+        return type("TestJoin", (JoinNode,), attributes)
+
+    def make_flow(self, branches, join_class=JoinNode, flow_class=BaseFlow):
+        """Build a flow fanning out to ``branches`` (id -> node class)."""
+        flow_def = {
+            "start": FlowNode(
+                self.SourceNode,
+                {"success": FanOut(list(branches), join="join")},
+            ),
+            "join": FlowNode(join_class, {"success": "end", "timeout": "end"}),
+        }
+        for branch_id, node_class in branches.items():
+            flow_def[branch_id] = FlowNode(node_class, {"success": "join"})
+        return flow_class(flow_def, name="FanOutFlow")
+
+    def test_branches_run_concurrently(self):
+        """Test all branches overlap and their writes are merged."""
+        flow = self.make_flow(
+            {
+                f"branch_{i}": self.make_branch_node(f"key_{i}", i, delay=0.1)
+                for i in range(4)
+            }
+        )
+
+        started = time.perf_counter()
+        result = flow.run({})
+        elapsed = time.perf_counter() - started
+
+        assert result["_flow_completed"] is True
+        assert result["action"] == "success"
+        assert [result[f"key_{i}"] for i in range(4)] == [0, 1, 2, 3]
+        assert result["_join"]["satisfied"] is True
+        assert result["_flow_path"] == [
+            "start",
+            "branch_0",
+            "branch_1",
+            "branch_2",
+            "branch_3",
+            "join",
+        ]
+        assert result["_flow_steps"] == 6
+        assert elapsed < 0.3  # Sequential execution would take 0.4s
+
+    def test_wait_any_takes_first(self):
+        """Test 'any' joins as soon as one branch finishes."""
+        flow = self.make_flow(
+            {
+                "fast": self.make_branch_node("fast", 1, delay=0.01),
+                "slow": self.make_branch_node("slow", 2, delay=0.5),
+            },
+            join_class=self.make_join(wait="any"),
+        )
+
+        started = time.perf_counter()
+        result = flow.run({})
+
+        assert time.perf_counter() - started < 0.4
+        assert result["fast"] == 1
+        assert "slow" not in result
+        assert result["_join"]["pending"] == ["slow"]
+
+    def test_branches_run_on_daemon_threads(self):
+        """Test abandoned branches cannot block interpreter exit."""
+
+        class DaemonCheckNode(BaseNode):
+            def exec(self, store):
+                store["daemon"] = threading.current_thread().daemon
+                store["action"] = "success"
+                return store
+
+        result = self.make_flow({"check": DaemonCheckNode}).run({})
+
+        assert result["daemon"] is True
+
+    def test_timeout_routes_timeout_action(self):
+        """Test a join timeout sets the 'timeout' action."""
+        flow = self.make_flow(
+            {
+                "fast": self.make_branch_node("fast", 1),
+                "slow": self.make_branch_node("slow", 2, delay=0.5),
+            },
+            join_class=self.make_join(timeout=0.05),
+        )
+
+        result = flow.run({})
+
+        assert result["action"] == "timeout"
+        assert result["fast"] == 1
+        assert result["_join"]["pending"] == ["slow"]
+        assert result["_flow_completed"] is True
+
+    def test_quorum_tolerates_failures(self):
+        """Test an integer wait succeeds when enough branches succeed."""
+        flow = self.make_flow(
+            {
+                "a": self.make_branch_node("a", 1),
+                "b": self.make_branch_node("b", 2, fail=True),
+                "c": self.make_branch_node("c", 3, delay=0.05),
+            },
+            join_class=self.make_join(wait=2),
+        )
+
+        result = flow.run({})
+
+        assert result["action"] == "success"
+        assert result["_join"]["failed"] == {"b": "b failed"}
+        assert "b" not in result
+
+    def test_failed_branch_fails_join(self):
+        """Test 'all' joins report failed branches as an error."""
+        flow = self.make_flow(
+            {
+                "a": self.make_branch_node("a", 1),
+                "b": self.make_branch_node("b", 2, fail=True),
+            }
+        )
+
+        result = flow.run({})
+
+        assert result["action"] == "error"
+        assert "b failed" in result["error"]
+        assert result["_flow_completed"] is False
+
+    def test_conflict_policies(self):
+        """Test conflicting writes are resolved by the join's policy."""
+        branches = {
+            "a": self.make_branch_node("shared", "from a"),
+            "b": self.make_branch_node("shared", "from b"),
+        }
+
+        result = self.make_flow(branches).run({})
+        assert result["action"] == "error"
+        assert result["_join"]["conflicts"] == ["shared"]
+
+        join_last = self.make_join(conflict_policy="last")
+        assert self.make_flow(branches, join_last).run({})["shared"] == "from b"
+
+        join_custom = self.make_join(
+            conflict_policy=lambda _key, values: " + ".join(values)
+        )
+        result = self.make_flow(branches, join_custom).run({})
+        assert result["shared"] == "from a + from b"
+
+    def test_equal_writes_do_not_conflict(self):
+        """Test branches writing the same value do not conflict."""
+        result = self.make_flow(
+            {
+                "a": self.make_branch_node("shared", "same"),
+                "b": self.make_branch_node("shared", "same"),
+            }
+        ).run({})
+
+        assert result["action"] == "success"
+        assert result["shared"] == "same"
+
+    async def test_async_fan_out(self):
+        """Test fan-out branches overlap in AsyncBaseFlow."""
+        flow = self.make_flow(
+            {
+                f"branch_{i}": self.make_branch_node(f"key_{i}", i, delay=0.1)
+                for i in range(4)
+            },
+            flow_class=AsyncBaseFlow,
+        )
+        assert isinstance(flow, AsyncBaseFlow)
+
+        started = time.perf_counter()
+        result = await flow.run({})
+
+        assert time.perf_counter() - started < 0.3
+        assert result["action"] == "success"
+        assert [result[f"key_{i}"] for i in range(4)] == [0, 1, 2, 3]
+
+    def test_join_must_be_join_node(self):
+        """Test validation requires the join target to be a JoinNode."""
+        flow_def = {
+            "start": FlowNode(
+                self.SourceNode, {"success": FanOut(["a"], join="not_join")}
+            ),
+            "a": FlowNode(self.SourceNode, {"success": "not_join"}),
+            "not_join": FlowNode(self.SourceNode),
+        }
+
+        with pytest.raises(ValueError, match="must be a JoinNode"):
+            BaseFlow(flow_def)
+
+    def test_visualize_fan_out(self):
+        """Test fan-out transitions appear in the visualization."""
+        flow = self.make_flow({"a": self.SourceNode, "b": self.SourceNode})
+
+        assert "--[success]--> [a | b] => join" in flow.visualize()
+
+
+class TestRunMany:
+    """Test batched execution over many stores."""
+
+    @staticmethod
+    def make_stores(count):
+        """Create input stores for the data pipeline flow."""
+        return [
+            {"input_data": [f"item{i}", "x"], "transform_type": "uppercase"}
+            for i in range(count)
+        ]
+
+    def test_matches_individual_runs(self):
+        """Test run_many produces the same results as run, in order."""
+        expected = [data_pipeline_flow.run(store) for store in self.make_stores(10)]
+
+        results = data_pipeline_flow.run_many(self.make_stores(10), chunk_size=3)
+
+        assert results == expected
+        assert results[7]["transformed_data"] == ["ITEM7", "X"]
+
+    def test_lockstep_shares_pooled_instances(self):
+        """Test runs waiting at a pooled node share one instance."""
+        node_class = TestNodeScopes.make_counting_node()
+        flow = BaseFlow(
+            {
+                "start": FlowNode(
+                    node_class, {"loop": "start"}, scope="pooled", pool_size=4
+                )
+            },
+            name="CountFlow",
+        )
+
+        results = flow.run_many([{} for _ in range(20)], chunk_size=10)
+
+        assert all(result["_flow_steps"] == 3 for result in results)
+        assert node_class.instances == 1
+
+    @pytest.mark.parametrize(("scope", "instances"), [("step", 60), ("run", 20)])
+    def test_runs_keep_their_own_instances(self, scope, instances):
+        """Test step and run scopes are not shared between runs of a chunk."""
+        node_class = TestNodeScopes.make_counting_node()
+        flow = BaseFlow({"start": FlowNode(node_class, {"loop": "start"}, scope=scope)})
+
+        results = flow.run_many([{} for _ in range(20)], chunk_size=10)
+
+        assert all(result["_flow_steps"] == 3 for result in results)
+        assert node_class.instances == instances
+
+    def test_debug_and_checkpoints_apply(self, tmp_path):
+        """Test runs are checked in debug mode and checkpointed one by one."""
+
+        class SneakyNode(BaseNode):
+            reads = frozenset()
+            writes = frozenset()
+
+            def exec(self, store):
+                store["extra"] = True
+                store["action"] = "success"
+                return store
+
+        checkpointer = FileCheckpointer(tmp_path)
+        debugged = BaseFlow({"start": FlowNode(SneakyNode)}, debug=True)
+        recorded = BaseFlow(
+            {"start": FlowNode(GreetingNode, {"success": "end"})},
+            checkpointer=checkpointer,
+        )
+
+        errors = debugged.run_many([{}, {}])
+        results = recorded.run_many([{"name": "a"}, {"name": "b"}])
+
+        assert all("wrote undeclared keys" in r["error"] for r in errors)
+        run_ids = {result["_flow_run_id"] for result in results}
+        assert len(run_ids) == 2
+        assert all(checkpointer.load(run_id).finished for run_id in run_ids)
+
+    def test_errors_are_isolated(self):
+        """Test a failing run does not affect the rest of its chunk."""
+        stores = [{"name": "a"}, {}, {"name": "c"}]
+
+        results = greeting_flow.run_many(stores)
+
+        assert results[0]["greeting"] == "Hello, A! 👋"
+        assert results[1]["action"] == "error"
+        assert results[2]["greeting"] == "Hello, C! 👋"
+
+    def test_thread_executor_stream(self):
+        """Test streaming results from a thread pool."""
+        results = dict(
+            data_pipeline_flow.run_many(
+                self.make_stores(25), executor="thread", chunk_size=4, stream=True
+            )
+        )
+
+        assert sorted(results) == list(range(25))
+        assert results[24]["transformed_data"] == ["ITEM24", "X"]
+
+    @pytest.mark.slow
+    def test_process_executor(self):
+        """Test chunks can run in worker processes."""
+        results = data_pipeline_flow.run_many(
+            self.make_stores(8), executor="process", chunk_size=2
+        )
+
+        assert [result["transformed_data"][0] for result in results] == [
+            f"ITEM{i}" for i in range(8)
+        ]
+
+    def test_unknown_executor(self):
+        """Test unknown executor names are rejected."""
+        with pytest.raises(ValueError, match="Unknown executor"):
+            greeting_flow.run_many([{}], executor="gpu")
+
+    async def test_async_run_many(self):
+        """Test AsyncBaseFlow.run_many runs stores concurrently, in order."""
+        flow = AsyncBaseFlow(
+            {"start": FlowNode(TestAsyncBaseFlow.SleepNode, {"success": "end"})}
+        )
+
+        started = time.perf_counter()
+        results = await flow.run_many([{"id": i} for i in range(50)])
+
+        assert time.perf_counter() - started < 1.0
+        assert [result["id"] for result in results] == list(range(50))
+
+
+@pytest.mark.slow
+class TestCPUBoundNodes:
+    """Test running the exec phase of CPU-bound nodes in worker processes."""
+
+    def make_flow(self, flow_class=BaseFlow):
+        """Build a single-step flow around the CPU-bound node."""
+        return flow_class(
+            {"start": FlowNode(CPUBoundTransformNode, {"success": "end"})},
+            name="CPUFlow",
+        )
+
+    def test_exec_runs_in_worker(self):
+        """Test exec runs in another process and its writes come back."""
+        result = self.make_flow().run(
+            {"input_data": [3, 1, 2], "transform_type": "sort", "big": "x" * 100}
+        )
+
+        assert result["_flow_completed"] is True
+        assert result["transformed_data"] == [1, 2, 3]
+        assert result["transform_stats"]["input_count"] == 3  # post ran locally
+        assert result["exec_pid"] != os.getpid()
+
+    def test_only_declared_reads_are_shipped(self):
+        """Test the worker only sees the keys the node reads."""
+        result = self.make_flow().run({"input_data": [1], "big": "x" * 100})
+
+        assert "big" not in result["exec_keys"]
+        assert "input_data" in result["exec_keys"]
+        assert result["big"] == "x" * 100
+
+    async def test_async_flow(self):
+        """Test CPU-bound nodes also work under AsyncBaseFlow."""
+        flow = self.make_flow(AsyncBaseFlow)
+        assert isinstance(flow, AsyncBaseFlow)
+
+        result = await flow.run({"input_data": ["a"], "transform_type": "uppercase"})
+
+        assert result["transformed_data"] == ["A"]
+        assert result["exec_pid"] != os.getpid()
+
+    def test_async_nodes_cannot_be_cpu_bound(self):
+        """Test async CPU-bound nodes are rejected instead of failing in workers."""
+
+        class AsyncCPUNode(AsyncBaseNode):
+            cpu_bound = True
+
+            async def exec(self, store):
+                return store
+
+        with pytest.raises(ValueError, match="cannot be cpu_bound"):
+            AsyncBaseFlow({"start": FlowNode(AsyncCPUNode)})
+
+
+class TestCheckpointing:
+    """Test step-level checkpointing and resume."""
+
+    class Crash(BaseException):
+        """Simulates the process dying; not caught by the node lifecycle."""
+
+    class CountStepNode(BaseNode):
+        """Appends to a step log and crashes once when told to."""
+
+        runs: ClassVar[list[int]] = []
+        crash_at: ClassVar[int | None] = None
+
+        def exec(self, store):
+            cls = TestCheckpointing.CountStepNode
+            step = store.get("count", 0) + 1
+            cls.runs.append(step)
+            if cls.crash_at == step:
+                cls.crash_at = None
+                raise TestCheckpointing.Crash
+            store["count"] = step
+            store["log"] = [*store.get("log", []), step]
+            store.pop("scratch", None)
+            store["action"] = "again" if step < 5 else "done"
+            return store
+
+    @pytest.fixture
+    def checkpointer(self, tmp_path):
+        """Create a checkpointer in a temporary directory."""
+        self.CountStepNode.runs = []
+        self.CountStepNode.crash_at = None
+        return FileCheckpointer(tmp_path)
+
+    def make_flow(self, checkpointer, flow_class=BaseFlow):
+        """Build a flow that loops five times."""
+        return flow_class(
+            {"start": FlowNode(self.CountStepNode, {"again": "start", "done": "end"})},
+            name="CountFlow",
+            checkpointer=checkpointer,
+        )
+
+    def test_run_records_id_and_finished_run_resumes_to_result(self, checkpointer):
+        """Test a finished run can be loaded back from its checkpoint."""
+        flow = self.make_flow(checkpointer)
+
+        result = flow.run({"scratch": 1}, run_id="run1")
+
+        assert result["_flow_run_id"] == "run1"
+        assert flow.resume("run1") == result
+
+    def test_resume_after_crash_skips_completed_steps(self, checkpointer):
+        """Test resume continues at the step that was interrupted."""
+        flow = self.make_flow(checkpointer)
+
+        self.CountStepNode.crash_at = 3
+        with pytest.raises(self.Crash):
+            flow.run({"scratch": 1}, run_id="run1")
+        result = flow.resume("run1")
+
+        assert self.CountStepNode.runs == [1, 2, 3, 3, 4, 5]
+        assert result["log"] == [1, 2, 3, 4, 5]
+        assert "scratch" not in result
+        assert result["_flow_path"] == ["start"] * 5
+        assert result["_flow_steps"] == 5
+        assert result["_flow_completed"] is True
+
+    def test_only_changed_keys_are_written(self, checkpointer):
+        """Test step records hold deltas rather than the whole store."""
+        flow = self.make_flow(checkpointer)
+
+        flow.run({"big": "x" * 100_000}, run_id="run1")
+
+        assert checkpointer.path_for("run1").stat().st_size < 150_000
+
+    def test_replaced_value_is_recorded(self, checkpointer):
+        """Test a new value of the same length is logged even after a free."""
+        writer = checkpointer.open("run1")
+        store = {}
+        writer.start("Flow", "run1", store)
+        store["v"] = [1, 2]
+        writer.step(["a"], "b", store)
+        store["v"] = None  # Frees the old list unless the writer holds it
+        store["v"] = [7, 8]
+        writer.step(["b"], "end", store)
+        writer.close()
+
+        assert checkpointer.load("run1").store == {"v": [7, 8]}
+
+    def test_batched_writes_are_flushed_on_crash(self, checkpointer):
+        """Test buffered records are written when the run is interrupted."""
+        checkpointer.batch_size = 10
+        checkpointer.fsync = True
+        flow = self.make_flow(checkpointer)
+
+        self.CountStepNode.crash_at = 4
+        with pytest.raises(self.Crash):
+            flow.run({}, run_id="run1")
+
+        assert checkpointer.load("run1").path == ["start"] * 3
+
+    def test_truncated_record_is_ignored(self, checkpointer):
+        """Test a partial final record left by a crash is skipped."""
+        flow = self.make_flow(checkpointer)
+        self.CountStepNode.crash_at = 3
+        with pytest.raises(self.Crash):
+            flow.run({}, run_id="run1")
+        with checkpointer.path_for("run1").open("ab") as file:
+            file.write(b"\x80\x05\x95garbage")
+
+        assert flow.resume("run1")["log"] == [1, 2, 3, 4, 5]
+
+    def test_resume_errors(self, checkpointer):
+        """Test resume rejects unknown runs and flows without checkpointing."""
+        with pytest.raises(KeyError, match="No checkpoint"):
+            self.make_flow(checkpointer).resume("missing")
+        with pytest.raises(ValueError, match="no checkpointer"):
+            greeting_flow.resume("run1")
+        with pytest.raises(ValueError, match="no checkpointer"):
+            greeting_flow.run({"name": "a"}, run_id="run1")
+
+    def test_from_config(self, tmp_path):
+        """Test checkpoints are stored under the configured data directory."""
+        config = Config(anthropic_api_key="test", data_dir=tmp_path)
+
+        checkpointer = FileCheckpointer.from_config(config)
+
+        assert checkpointer.directory == tmp_path / "checkpoints"
+        assert checkpointer.directory.is_dir()
+
+    async def test_async_resume(self, checkpointer):
+        """Test AsyncBaseFlow can resume a run recorded by a sync flow."""
+        self.CountStepNode.crash_at = 2
+        with pytest.raises(self.Crash):
+            self.make_flow(checkpointer).run({}, run_id="run1")
+
+        flow = self.make_flow(checkpointer, AsyncBaseFlow)
+        assert isinstance(flow, AsyncBaseFlow)
+        result = await flow.resume("run1")
+
+        assert result["log"] == [1, 2, 3, 4, 5]
+
+
+class TestFlowHooks:
+    """Test tracing hooks and the span recorder."""
+
+    class EventLog(FlowHook):
+        """Hook that records every event with its most telling argument."""
+
+        def __init__(self):
+            self.events = []
+
+        def on_flow_start(self, run_id, flow_name, store):  # noqa: ARG002
+            self.events.append(("flow_start", flow_name))
+
+        def on_node_start(self, run_id, node_id, store):  # noqa: ARG002
+            self.events.append(("node_start", node_id))
+
+        def on_phase(self, run_id, node_id, phase, timing):  # noqa: ARG002
+            assert timing.wall >= 0
+            self.events.append(("phase", phase))
+
+        def on_node_end(self, run_id, node_id, store, wall):  # noqa: ARG002
+            self.events.append(("node_end", node_id))
+
+        def on_transition(self, run_id, node_id, action, target):  # noqa: ARG002
+            self.events.append(("transition", target))
+
+        def on_error(self, run_id, node_id, error):  # noqa: ARG002
+            self.events.append(("error", node_id))
+
+        def on_flow_end(self, run_id, flow_name, store):  # noqa: ARG002
+            self.events.append(("flow_end", store["_flow_completed"]))
+
+    class BrokenHook(FlowHook):
+        """Hook that fails on every node."""
+
+        def on_node_start(self, run_id, node_id, store):  # noqa: ARG002
+            msg = f"hook failed for {node_id}"
+            raise RuntimeError(msg)
+
+    def test_events_in_order(self):
+        """Test a run emits flow, node, phase and transition events."""
+        log = self.EventLog()
+        flow = BaseFlow(greeting_flow.flow_definition, hooks=[log])
+
+        result = flow.run({"name": "ada"})
+
+        assert result["_flow_run_id"]
+        assert log.events == [
+            ("flow_start", "BaseFlow"),
+            ("node_start", "start"),
+            ("phase", "prep"),
+            ("phase", "exec"),
+            ("phase", "post"),
+            ("node_end", "start"),
+            ("transition", "end"),
+            ("flow_end", True),
+        ]
+
+    def test_error_events_and_broken_hooks(self):
+        """Test node errors are reported and hook failures are contained."""
+        log = self.EventLog()
+        flow = BaseFlow(greeting_flow.flow_definition, hooks=[self.BrokenHook()])
+        flow.add_hook(log)
+
+        result = flow.run({})
+
+        assert result["action"] == "error"
+        assert ("error", "start") in log.events
+        assert log.events[-1][0] == "flow_end"
+
+    def test_no_hooks_no_run_id(self):
+        """Test runs without hooks are left untouched."""
+        log = self.EventLog()
+        flow = BaseFlow(greeting_flow.flow_definition, hooks=[log])
+        flow.remove_hook(log)
+
+        result = flow.run({"name": "ada"})
+
+        assert "_flow_run_id" not in result
+        assert log.events == []
+
+    def test_phase_tracers_follow_the_hooks(self):
+        """Test phases are only timed for hooks that handle them."""
+        log = self.EventLog()
+        flow = BaseFlow(greeting_flow.flow_definition, hooks=[self.BrokenHook()])
+
+        flow.run({"name": "ada"})
+        assert flow._tracers[0] == (flow.hooks, None)
+
+        flow.add_hook(log)
+        flow.run({"name": "ada"})
+        flow.run({"name": "bob"})
+
+        assert log.events.count(("phase", "exec")) == 2
+        cached = flow._tracers[0]
+        assert cached is not None
+        assert cached[1] is not None
+
+    def test_span_recorder_exports_jsonl(self, tmp_path):
+        """Test spans of a run are written to the configured logs directory."""
+        config = Config(anthropic_api_key="test", logs_dir=tmp_path)
+        recorder = SpanRecorder.from_config(config)
+        flow = BaseFlow(data_pipeline_flow.flow_definition, hooks=[recorder])
+
+        result = flow.run({"input_data": ["a"], "transform_type": "uppercase"})
+
+        lines = (tmp_path / "traces.jsonl").read_text().splitlines()
+        spans = [json.loads(line) for line in lines]
+        assert {span["run_id"] for span in spans} == {result["_flow_run_id"]}
+        assert spans[0]["kind"] == "flow"
+        assert spans[0]["completed"] is True
+        phases = [span for span in spans if span["kind"] == "phase"]
+        assert len(phases) == 3 * result["_flow_steps"]
+        assert all(span["duration"] >= 0 for span in spans)
+
+    async def test_async_flow_phases(self):
+        """Test phases of async nodes are traced."""
+        log = self.EventLog()
+        flow = AsyncBaseFlow(
+            {"start": FlowNode(TestAsyncBaseFlow.SleepNode, {"success": "end"})},
+            hooks=[log],
+        )
+
+        await flow.run({})
+
+        assert [e for e in log.events if e[0] == "phase"] == [
+            ("phase", "prep"),
+            ("phase", "exec"),
+            ("phase", "post"),
+        ]
+
+
+class TestProfiler:
+    """Test the flow profiler."""
+
+    def test_disabled_by_default(self):
+        """Test the profiler records nothing until enabled."""
+        flow = BaseFlow(greeting_flow.flow_definition)
+
+        flow.run({"name": "ada"})
+
+        assert flow.profiler is flow.profiler
+        assert flow.profiler.enabled is False
+        assert flow.profiler.runs.count == 0
+        assert "_flow_run_id" not in flow.run({"name": "ada"})
+
+    def test_records_nodes_phases_and_transitions(self):
+        """Test histograms are kept per node, phase and edge."""
+        flow = BaseFlow(data_pipeline_flow.flow_definition)
+        profiler = flow.profiler
+        profiler.enable()
+        profiler.enable()  # Enabling twice subscribes once
+
+        for _ in range(3):
+            flow.run({"input_data": ["a"], "transform_type": "uppercase"})
+
+        assert flow.hooks == (profiler,)
+        assert profiler.runs.count == 3
+        assert profiler.nodes["start"].count == 3
+        wall, _ = profiler.phases["start", "exec"]
+        assert wall.count == 3
+        edge = profiler.transitions["start", "success", "second_transform"]
+        assert edge.count == 3
+        assert [node_id for node_id, _ in profiler.critical_path] == [
+            "start",
+            "second_transform",
+            "final_transform",
+        ]
+
+        report = profiler.report()
+        assert report.startswith("Profile of BaseFlow (3 runs)")
+        assert "start.exec" in report
+        assert "start --[success]--> second_transform" in report
+        assert "p99=" in report
+        assert "Critical path" in report
+
+    def test_cpu_time_is_sampled(self):
+        """Test CPU time is recorded for one phase in CPU_SAMPLE_EVERY."""
+        flow = BaseFlow(greeting_flow.flow_definition)
+        flow.profiler.enable()
+
+        for _ in range(CPU_SAMPLE_EVERY):
+            flow.run({"name": "ada"})
+
+        phases = flow.profiler.phases
+        assert sorted(phases) == [
+            ("start", "exec"),
+            ("start", "post"),
+            ("start", "prep"),
+        ]
+        assert [wall.count for wall, _ in phases.values()] == [CPU_SAMPLE_EVERY] * 3
+        assert sum(cpu.count for _, cpu in phases.values()) == 3
+
+    def test_cpu_time_is_exact_next_to_on_phase_hooks(self):
+        """Test every phase gets CPU time while a hook overrides on_phase."""
+        flow = BaseFlow(greeting_flow.flow_definition)
+        log = TestFlowHooks.EventLog()
+        flow.add_hook(log)
+        flow.profiler.enable()
+
+        for _ in range(3):
+            flow.run({"name": "ada"})
+
+        assert log.events.count(("phase", "exec")) == 3
+        for wall, cpu in flow.profiler.phases.values():
+            assert wall.count == cpu.count == 3
+
+    def test_toggle_and_reset(self):
+        """Test profiling can be switched off and the data cleared."""
+        flow = BaseFlow(greeting_flow.flow_definition)
+        profiler = flow.profiler
+        profiler.enable()
+        flow.run({"name": "ada"})
+        profiler.disable()
+        flow.run({"name": "ada"})
+
+        assert profiler.enabled is False
+        assert profiler.runs.count == 1
+        profiler.reset()
+        assert profiler.nodes == {}
+        assert profiler.phases == {}
+        assert profiler.critical_path == []
+
+        profiler.enable()
+        flow.run({"name": "ada"})
+        assert profiler.phases["start", "exec"][0].count == 1
+
+    def test_critical_path_skips_branches(self):
+        """Test fan-out branches appear as one step of the critical path."""
+        make_branch = TestFanOut.make_branch_node
+        flow = TestFanOut().make_flow(
+            {"fast": make_branch("fast", 1), "slow": make_branch("slow", 2, 0.05)}
+        )
+        flow.profiler.enable()
+
+        flow.run({})
+
+        path = flow.profiler.critical_path
+        assert [node_id for node_id, _ in path] == [
+            "start",
+            "[fast | slow] => join",
+            "join",
+        ]
+        assert path[1][1] >= 0.05
+        assert flow.profiler.nodes["slow"].count == 1
+
+    def test_not_pickled(self):
+        """Test profilers stay with the flow they were created on."""
+        flow = BaseFlow(greeting_flow.flow_definition)
+        flow.profiler.enable()
+
+        clone = pickle.loads(pickle.dumps(flow))  # noqa: S301
+
+        assert clone.hooks == ()
+        assert clone.profiler is not flow.profiler
+        assert clone.profiler.flow is clone
+
+
+class TestSeededRuns:
+    """Test per-run random streams."""
+
+    @staticmethod
+    def make_flow(**kwargs):
+        """Flow drawing a number, then fanning out to two drawing branches."""
+
+        class DrawNode(RandomNumberNode):
+            def post(self, store):
+                store["draws"] = (*store.get("draws", ()), store["random_number"])
+                return store
+
+        def branch(key):
+            class BranchDraw(BaseNode):
+                def exec(self, store):
+                    store[key] = rng_for(store).random()
+                    store["action"] = "success"
+                    return store
+
+            return BranchDraw
+
+        return BaseFlow(
+            {
+                "start": FlowNode(
+                    DrawNode, {"success": FanOut(["a", "b"], join="join")}
+                ),
+                "a": FlowNode(branch("a"), {"success": "join"}),
+                "b": FlowNode(branch("b"), {"success": "join"}),
+                "join": FlowNode(JoinNode, {"success": "end"}),
+            },
+            **kwargs,
+        )
+
+    @staticmethod
+    def numbers(store):
+        """The random values a run produced."""
+        return store["random_number"], store["a"], store["b"]
+
+    def test_seeded_flows_are_reproducible(self):
+        """Test flows with equal seeds produce equal runs."""
+        first = [self.make_flow(seed=1).run({}) for _ in range(2)]
+        again = self.make_flow(seed=1)
+        second = [again.run({}), again.run({})]
+
+        assert [self.numbers(s) for s in first] == [self.numbers(first[0])] * 2
+        assert self.numbers(second[0]) == self.numbers(first[0])
+        assert self.numbers(second[1]) != self.numbers(second[0])
+        assert second[0]["a"] != second[0]["b"]  # Branches get their own streams
+
+    def test_replay_from_seed(self):
+        """Test a run can be replayed from its recorded seed."""
+        flow = self.make_flow()
+        unseeded = flow.run({})
+        assert "_flow_seed" not in unseeded
+
+        result = self.make_flow(seed=5).run({})
+        replay = flow.run({"_flow_seed": result["_flow_seed"]})
+        rerun = flow.run(result)
+
+        assert self.numbers(replay) == self.numbers(result)
+        assert self.numbers(rerun) == self.numbers(result)
+
+    def test_run_many_independent_of_executor(self):
+        """Test run_many seeds runs in input order."""
+        serial = self.make_flow(seed=9).run_many([{} for _ in range(6)], chunk_size=2)
+        threaded = self.make_flow(seed=9).run_many(
+            [None] * 6, chunk_size=2, executor="thread"
+        )
+
+        assert [self.numbers(s) for s in serial] == [self.numbers(s) for s in threaded]
+        assert len({s["_flow_seed"] for s in serial}) == 6
+
+
+class TestIncrementalRerun:
+    """Test recorded runs and incremental reruns."""
+
+    calls: ClassVar[list[str]] = []
+
+    @classmethod
+    def make_node(cls, name, reads, write):
+        """Node summing the keys it reads into ``write``, logging its calls."""
+
+        class SumNode(BaseNode):
+            def exec(self, store):
+                cls.calls.append(name)
+                store[write] = sum(store.get(key, 0) for key in reads)
+                store["action"] = "success"
+                return store
+
+        return SumNode
+
+    def make_flow(self, flow_class=BaseFlow):
+        """Flow where 'a' and 'b' are independent and 'c' combines them."""
+        self.calls.clear()
+        return flow_class(
+            {
+                "start": FlowNode(self.make_node("a", ["x"], "a"), {"success": "b"}),
+                "b": FlowNode(self.make_node("b", ["y"], "b"), {"success": "c"}),
+                "c": FlowNode(self.make_node("c", ["a", "b"], "c"), {"success": "end"}),
+            }
+        )
+
+    def test_record_reads_and_writes(self):
+        """Test recorded runs keep the keys each step read and wrote."""
+        flow = self.make_flow()
+
+        result = flow.run({"x": 1, "y": 2}, record=True)
+
+        trace = result["_flow_trace"]
+        assert trace.initial == {"x": 1, "y": 2}
+        assert [step.node_id for step in trace.steps] == ["start", "b", "c"]
+        assert trace.steps[2].reads == {"a", "b", "action"}
+        assert trace.steps[2].writes == {"c": 3, "action": "success"}
+        assert "_flow_trace" not in flow.run({"x": 1})
+
+    def test_rerun_skips_unaffected_nodes(self):
+        """Test only nodes depending on changed keys run again."""
+        flow = self.make_flow()
+        result = flow.run({"x": 1, "y": 2}, record=True)
+        self.calls.clear()
+
+        rerun = flow.rerun(result, {"y": 5})
+
+        assert self.calls == ["b", "c"]
+        assert rerun["c"] == 6
+        assert rerun["_flow_trace"].replayed == 1
+        assert rerun == {**flow.run({"x": 1, "y": 5}), "_flow_trace": ANY}
+
+    def test_unchanged_outputs_stop_propagation(self):
+        """Test a rerun node producing the same values keeps downstream replayed."""
+        flow = self.make_flow()
+        result = flow.rerun(flow.run({"x": 1, "y": 2}, record=True), {"y": 5})
+        self.calls.clear()
+
+        again = flow.rerun(result, {"x": 1})
+
+        assert self.calls == ["a"]
+        assert again["c"] == 6
+
+    def test_rerun_requires_recording(self):
+        """Test unrecorded results cannot be rerun."""
+        flow = self.make_flow()
+
+        with pytest.raises(ValueError, match="record=True"):
+            flow.rerun(flow.run({"x": 1}), {"x": 2})
+
+    def test_changed_path_runs_remaining_steps(self):
+        """Test steps after a different transition all run."""
+        flow = BaseFlow(greeting_flow.flow_definition)
+        result = flow.run({}, record=True)
+
+        rerun = flow.rerun(result, {"name": "ada"})
+
+        assert rerun["greeting"] == "Hello, Ada! 👋"
+        assert rerun["_flow_trace"].replayed == 0
+
+    async def test_async_rerun(self):
+        """Test async flows record and rerun."""
+        flow = self.make_flow(AsyncBaseFlow)
+        assert isinstance(flow, AsyncBaseFlow)
+        result = await flow.run({"x": 1, "y": 2}, record=True)
+        self.calls.clear()
+
+        rerun = await flow.rerun(result, {"x": 3})
+
+        assert self.calls == ["a", "c"]
+        assert rerun["c"] == 5
+
+
+class TestDataflow:
+    """Test declared reads and writes and automatic parallelization."""
+
+    @staticmethod
+    def make_node(reads, write, delay=0.05, action="success"):
+        """Node summing the keys it reads into ``write`` after a delay."""
+
+        class SumNode(BaseNode):
+            def exec(self, store):
+                time.sleep(delay)
+                store[write] = sum(store.get(key, 0) for key in reads)
+                store["action"] = action
+                return store
+
+        SumNode.reads = frozenset(reads)
+        SumNode.writes = frozenset({write})
+        return SumNode
+
+    def make_definition(self, c_reads=("z",), b_action="success"):
+        """'a' and 'b' are independent; 'c' reads ``c_reads``."""
+        return {
+            "start": FlowNode(self.make_node(["x"], "a"), {"success": "b"}),
+            "b": FlowNode(
+                self.make_node(["y"], "b", action=b_action),
+                {"success": "c", "retry": "end"},
+            ),
+            "c": FlowNode(self.make_node(list(c_reads), "c"), {"success": "end"}),
+        }
+
+    def test_independent_nodes_run_concurrently(self):
+        """Test nodes that do not depend on each other overlap."""
+        definition = self.make_definition()
+        flow = BaseFlow(definition, parallel=True)
+
+        started = time.monotonic()
+        result = flow.run({"x": 1, "y": 2, "z": 3})
+        elapsed = time.monotonic() - started
+
+        assert elapsed < 0.12
+        assert result == BaseFlow(definition).run({"x": 1, "y": 2, "z": 3})
+        assert list(result["_flow_path"]) == ["start", "b", "c"]
+
+    def test_dependent_nodes_wait(self):
+        """Test a node reading an earlier node's writes is not started early."""
+        definition = self.make_definition(c_reads=("a", "b"))
+        flow = BaseFlow(definition, parallel=True)
+
+        result = flow.run({"x": 1, "y": 2})
+
+        waves = flow._waves
+        assert waves is not None
+        assert waves[0] is not None
+        assert waves[0].ahead == (1,)
+        assert waves[1] is None
+        assert result["c"] == 3
+        assert result == BaseFlow(definition).run({"x": 1, "y": 2})
+
+    def test_nodes_off_the_path_are_discarded(self):
+        """Test early results are dropped when the run takes another transition."""
+        definition = self.make_definition(b_action="retry")
+        flow = BaseFlow(definition, parallel=True)
+
+        result = flow.run({"x": 1, "y": 2, "z": 3})
+
+        assert "c" not in result
+        assert result == BaseFlow(definition).run({"x": 1, "y": 2, "z": 3})
+
+    def test_non_speculative_nodes_run_at_their_turn(self):
+        """Test nodes opting out of speculation are never started early."""
+        definition = self.make_definition()
+        unsafe = type(
+            "UnsafeNode", (self.make_node(["z"], "c"),), {"speculative": False}
+        )
+        definition["c"] = FlowNode(unsafe, {"success": "end"})
+
+        flow = BaseFlow(definition, parallel=True)
+
+        waves = flow._waves
+        assert waves is not None
+        wave = waves[0]
+        assert wave is not None
+        assert wave.chain == (1,)
+        assert wave.ahead == (1,)
+
+    def test_iterator_inputs_are_not_read_early(self):
+        """Test a node reading an iterator waits for its turn."""
+        definition = self.make_definition()
+        flow = BaseFlow(definition, parallel=True)
+        started = []
+
+        def start(index, store):
+            started.append(index)
+            return ThreadPoolExecutor(1).submit(lambda: store)
+
+        waves = flow._waves
+        assert waves is not None
+        speculation = Speculation(waves)
+        speculation.start(0, {"y": iter([1, 2]), "z": 3}, start)
+        speculation.discard()
+        speculation.start(0, {"y": [1, 2], "z": 3}, start)
+        speculation.discard()
+
+        # 'b' reads the iterator in 'y'; 'c' only reads 'z'
+        assert started == [2, 1, 2]
+
+    def test_streaming_pipeline_matches_sequential_run(self):
+        """Test parallel flows stream generator inputs as sequential ones do."""
+        definition = data_pipeline_flow.flow_definition
+
+        def items():
+            # Slow enough that a node started early would race for items
+            for i in range(20):
+                time.sleep(0.002)
+                yield f"item-{i}"
+
+        def run(flow):
+            sink = []
+            result = flow.run(
+                {
+                    "input_data": items(),
+                    "transform_type": "uppercase",
+                    "output_sink": sink,
+                }
+            )
+            del result["input_data"], result["output_sink"]
+            return result, sink
+
+        parallel, parallel_sink = run(BaseFlow(definition, parallel=True))
+        sequential, sequential_sink = run(BaseFlow(definition))
+
+        assert parallel_sink == sequential_sink
+        assert parallel_sink == [f"ITEM-{i}" for i in range(20)]
+        assert parallel == sequential
+
+    def test_undeclared_nodes_run_sequentially(self):
+        """Test flows without declarations have nothing to start early."""
+        assert (
+            BaseFlow(random_conditional_flow.flow_definition, parallel=True)._waves
+            is None
+        )
+
+    def test_debug_rejects_undeclared_keys(self):
+        """Test debug mode fails nodes that use keys they did not declare."""
+
+        class SneakyNode(DataTransformNode):
+            def post(self, store):
+                store["extra"] = store.get("secret")
+                return super().post(store)
+
+        flow = BaseFlow({"start": FlowNode(SneakyNode)}, debug=True)
+
+        result = flow.run({"input_data": ["a"]})
+
+        assert result["action"] == "error"
+        assert "read undeclared keys ['secret']" in result["error"]
+        assert "wrote undeclared keys ['extra']" in result["error"]
+
+    def test_debug_accepts_declared_keys(self):
+        """Test debug mode leaves nodes within their declarations alone."""
+        flow = BaseFlow(data_pipeline_flow.flow_definition, debug=True)
+
+        result = flow.run({"input_data": ["b", "a"], "transform_type": "sort"})
+
+        assert result["transformed_data"] == ["a", "b"]
+        assert result["_flow_completed"] is True
+
+    async def test_async_nodes_run_concurrently(self):
+        """Test async flows start independent nodes as tasks."""
+        definition = self.make_definition()
+        flow = AsyncBaseFlow(definition, parallel=True)
+
+        started = time.monotonic()
+        result = await flow.run({"x": 1, "y": 2, "z": 3})
+        elapsed = time.monotonic() - started
+
+        assert elapsed < 0.12
+        assert result == await AsyncBaseFlow(definition).run({"x": 1, "y": 2, "z": 3})
+
+
+class TestFlowPath:
+    """Test compact flow path recording."""
+
+    def test_run_length_encoding(self):
+        """Test repeated visits are stored as runs but read as steps."""
+        path = FlowPath(["a", "b"])
+        path.extend(["a", "a", "a", "b", "b", "a"])
+
+        assert path.runs == 3
+        assert path == ["a", "a", "a", "b", "b", "a"]
+        assert path[3] == "b"
+        assert path[-1] == "a"
+        assert path[1:3] == ["a", "a"]
+        assert "b" in path
+        assert "c" not in path
+        assert " -> ".join(path) == "a -> a -> a -> b -> b -> a"
+
+    def test_ring_buffer_limit(self):
+        """Test only the last steps are kept when a limit is set."""
+        path = FlowPath(["a", "b"], limit=3)
+        for step in range(1000):
+            path.append("a" if step % 10 else "b")
+
+        assert path == ["a", "a", "a"]
+        assert path.total == 1000
+        assert "b" not in path
+        assert len(path._offsets) < 200
+
+    def test_pickle_round_trip(self):
+        """Test pickling keeps the encoded form."""
+        path = FlowPath(["start"])
+        path.extend(["start"] * 10_000)
+
+        data = pickle.dumps(path)
+
+        assert len(data) < 200
+        assert pickle.loads(data) == ["start"] * 10_000  # noqa: S301
+
+    def test_looping_flow_path(self):
+        """Test a self-looping flow records its steps compactly."""
+        node_class = TestNodeScopes.make_counting_node()
+        flow = BaseFlow(
+            {"start": FlowNode(node_class, {"loop": "start"})},
+            name="CountFlow",
+            path_limit=2,
+        )
+
+        result = flow.run({}, max_steps=50)
+
+        assert isinstance(result["_flow_path"], FlowPath)
+        assert result["_flow_path"] == ["start", "start"]
+
+    def test_cycle_encoding(self):
+        """Test a loop over several nodes is stored as one repeated cycle."""
+        path = FlowPath(["start", "poll", "wait", "done"])
+        steps = ["start"] + ["poll", "wait"] * 5000 + ["poll", "done"]
+        for node_id in steps:
+            path.append(node_id)
+
+        assert path.runs == 3
+        assert path == steps
+        assert path[1] == "poll"
+        assert path[-2] == "poll"
+        assert path[10_000] == "wait"
+        assert len(pickle.dumps(path)) < 300
+        assert pickle.loads(pickle.dumps(path)) == steps  # noqa: S301
+
+    def test_cycle_after_distinct_visits(self):
+        """Test a cycle is found at the end of visits that did not repeat."""
+        path = FlowPath()
+        steps = ["a", "b", "c", "d", "c", "d", "c", "e", "a", "b", "a", "b"]
+        path.extend(steps)
+
+        assert path.runs == 4
+        assert path.to_list() == steps
+        assert [path[i] for i in range(len(steps))] == steps
+
+    def test_shared_names_are_not_changed(self):
+        """Test recording an unknown node leaves the caller's names alone."""
+        names = ("start",)
+        lookup = {"start": 0}
+        path = FlowPath(names, lookup, limit=2)
+        path.extend(["start", "other", "start"])
+
+        assert path.to_list() == ["other", "start"]
+        assert path == ["other", "start"]
+        assert lookup == {"start": 0}
+
+    def test_ring_buffer_over_cycles(self):
+        """Test a limit cuts into a cycle at the right phase."""
+        path = FlowPath(["a", "b", "c"], limit=5)
+        path.extend(["a", "b", "c"] * 100 + ["a"])
+
+        assert path == ["c", "a", "b", "c", "a"]
+        assert path[0] == "c"
+        assert "b" in path
+        assert pickle.loads(pickle.dumps(path)) == path  # noqa: S301
+
+    def test_unknown_nodes_widen_codes(self):
+        """Test node IDs not known up front are added to the names."""
+        path = FlowPath()
+        steps = [f"node_{i}" for i in range(300)]
+        path.extend(steps)
+
+        assert path._codes.typecode == "H"
+        assert path == steps
+
+    def test_run_result_keeps_compact_path(self):
+        """Test a run's store keeps the encoded path, decoded on request."""
+
+        class LoopNode(BaseNode):
+            def exec(self, store):
+                store["action"] = "loop"
+                return store
+
+        flow = BaseFlow({"start": FlowNode(LoopNode, {"loop": "start"})})
+
+        result = flow.run({}, max_steps=5000)
+        path = result["_flow_path"]
+
+        assert isinstance(path, FlowPath)
+        assert len(pickle.dumps(path)) < 300
+        assert json.loads(json.dumps(path.to_list())) == ["start"] * 5000
+
+
+class TestFlowAnalysis:
+    """Test static analysis of flow graphs."""
+
+    def test_acyclic_flow(self):
+        """Test bounds of an acyclic flow are derived and sufficient."""
+        analysis = data_pipeline_flow.analysis
+
+        assert analysis.is_acyclic
+        assert analysis.errors == []
+        assert analysis.unreachable == frozenset()
+        assert analysis.safe_max_steps is not None
+        result = data_pipeline_flow.run(
+            {"input_data": ["a"], "transform_type": "uppercase"},
+            max_steps=analysis.safe_max_steps,
+        )
+        assert result["_flow_completed"] is True
+        assert result["_flow_steps"] <= analysis.longest_path
+
+    def test_cycles_and_unreachable_nodes(self):
+        """Test loops and orphan nodes are reported."""
+        flow = BaseFlow(
+            {
+                "start": FlowNode(GreetingNode, {"success": "check"}),
+                "check": FlowNode(GreetingNode, {"retry": "start"}),
+                "orphan": FlowNode(GreetingNode, {}),
+            }
+        )
+
+        analysis = flow.analysis
+
+        assert analysis.cycles == (("check", "start"),)
+        assert analysis.unreachable == {"orphan"}
+        assert analysis.longest_path is None
+        assert analysis.safe_max_steps is None
+        assert analysis.errors == []
+
+    def test_traps_and_no_exit(self):
+        """Test nodes that can never finish or never reach end."""
+        flow = BaseFlow(
+            {
+                "start": FlowNode(GreetingNode, {"success": "end", "poll": "wait"}),
+                "wait": FlowNode(GreetingNode, {"default": "wait", "error": "wait"}),
+                "fail": FlowNode(GreetingNode, {"default": "fail"}),
+            }
+        )
+
+        analysis = flow.analysis
+
+        assert analysis.traps == {"wait"}
+        assert analysis.no_exit == {"wait"}
+        assert "fail" in analysis.unreachable
+        assert "loop forever" in analysis.errors[0]
+
+    def test_fanout_longest_path(self):
+        """Test fan-out branches count toward the longest path."""
+        flow = BaseFlow(
+            {
+                "start": FlowNode(
+                    GreetingNode, {"success": FanOut(["a", "b"], join="join")}
+                ),
+                "a": FlowNode(GreetingNode, {"success": "a2"}),
+                "a2": FlowNode(GreetingNode, {"success": "join"}),
+                "b": FlowNode(GreetingNode, {"success": "join"}),
+                "join": FlowNode(JoinNode, {"success": "end"}),
+            }
+        )
+
+        assert flow.analysis.longest_path == 5
+        assert flow.analysis.safe_max_steps == 6
+
+    def test_long_linear_flow(self):
+        """Test flows far deeper than the recursion limit can be analyzed."""
+        count = 5000
+        definition = {
+            f"n{i}": FlowNode(GreetingNode, {"success": f"n{i + 1}"})
+            for i in range(1, count - 1)
+        }
+        definition["start"] = FlowNode(GreetingNode, {"success": "n1"})
+        definition[f"n{count - 1}"] = FlowNode(GreetingNode, {"success": "end"})
+
+        flow = BaseFlow(definition)
+
+        assert flow.analysis.is_acyclic
+        assert flow.analysis.longest_path == count
+
+
+class TestSubFlows:
+    """Test flows used as nodes of other flows."""
+
+    @pytest.fixture
+    def outer_flow(self):
+        """Flow running greeting_flow as its first step."""
+        return BaseFlow(
+            {
+                "start": FlowNode(
+                    greeting_flow, {"success": "transform", "error": "fallback"}
+                ),
+                "transform": FlowNode(DataTransformNode, {"success": "end"}),
+                "fallback": FlowNode(DataTransformNode, {"default": "end"}),
+            },
+            name="OuterFlow",
+        )
+
+    def test_subflow_is_inlined(self, outer_flow):
+        """Test sub-flow nodes become namespaced nodes of the parent plan."""
+        plan = outer_flow.plan
+
+        assert [node.node_id for node in plan.nodes] == [
+            "start.start",
+            "transform",
+            "fallback",
+        ]
+        assert plan.nodes[0].node_class is GreetingNode
+        assert plan.nodes[0].targets[plan.action_index["success"]] == 1
+
+    def test_subflow_end_continues_in_parent(self, outer_flow):
+        """Test a sub-flow reaching end continues with the parent's transition."""
+        result = outer_flow.run({"name": "ada", "input_data": ["x"]})
+
+        assert result["_flow_completed"] is True
+        assert result["greeting"].startswith("Hello, Ada")
+        assert result["transformed_data"] == ["X"]
+        assert result["_flow_path"] == ["start.start", "transform"]
+
+    def test_subflow_error_uses_parent_error_transition(self, outer_flow):
+        """Test errors leaving a sub-flow are routed by the parent."""
+        result = outer_flow.run({"input_data": ["x"]})
+
+        assert result["_flow_path"] == ["start.start", "fallback"]
+
+    def test_unhandled_subflow_error_stops_without_parent_handler(self):
+        """Test a sub-flow error stops the run if no level handles it."""
+        inner = BaseFlow({"start": FlowNode(GreetingNode, {"success": "end"})})
+        outer = BaseFlow(
+            {
+                "start": FlowNode(inner, {"success": "end"}),
+            }
+        )
+
+        assert outer.plan.nodes[0].targets[outer.plan.action_index["error"]] == STOP
+
+        result = outer.run({})
+
+        assert result["_flow_completed"] is False
+        assert result["_flow_path"] == ["start.start"]
+
+    def test_nested_subflows(self):
+        """Test sub-flows nest and their IDs are namespaced per level."""
+        middle = BaseFlow(
+            {
+                "start": FlowNode(greeting_flow, {"success": "transform"}),
+                "transform": FlowNode(DataTransformNode, {"success": "end"}),
+            }
+        )
+        outer = BaseFlow(
+            {
+                "start": FlowNode(GreetingNode, {"success": "pipeline"}),
+                "pipeline": FlowNode(middle, {"success": "end"}),
+            }
+        )
+
+        result = outer.run({"name": "ada", "input_data": ["x"]})
+
+        assert result["_flow_path"] == [
+            "start",
+            "pipeline.start.start",
+            "pipeline.transform",
+        ]
+        assert result["_flow_completed"] is True
+        assert outer.analysis.longest_path == 3
+        assert "pipeline (sub-flow" in outer.visualize()
+
+    def test_async_subflow_needs_async_parent(self):
+        """Test sync flows reject sub-flows containing async nodes."""
+
+        class SleepNode(AsyncBaseNode):
+            async def exec(self, store):
+                store["action"] = "success"
+                return store
+
+        inner = AsyncBaseFlow({"start": FlowNode(SleepNode, {"success": "end"})})
+
+        with pytest.raises(ValueError, match="contains async nodes"):
+            BaseFlow({"start": FlowNode(inner, {"success": "end"})})
+
+        outer = AsyncBaseFlow({"start": FlowNode(inner, {"success": "end"})})
+        result = asyncio.run(outer.run())
+        assert result["_flow_path"] == ["start.start"]
+
+    def test_namespace_collision_is_rejected(self):
+        """Test inlined IDs may not clash with the parent's own nodes."""
+        with pytest.raises(ValueError, match="defined more than once"):
+            BaseFlow(
+                {
+                    "start": FlowNode(greeting_flow, {"success": "start.start"}),
+                    "start.start": FlowNode(GreetingNode, {"success": "end"}),
+                }
+            )
+
+
+class TestTimeouts:
+    """Test node timeouts and flow deadlines."""
+
+    class BlockingNode(BaseNode):
+        """Node that blocks until released, unless told not to."""
+
+        node_timeout = 0.05
+        release = threading.Event()
+
+        def exec(self, store):
+            if store.get("block", True):
+                self.release.wait(5)
+            store["blocked_write"] = True
+            store["action"] = "success"
+            return store
+
+    @pytest.fixture(autouse=True)
+    def release_blocked_nodes(self):
+        """Let abandoned worker threads finish after each test."""
+        self.BlockingNode.release.clear()
+        yield
+        self.BlockingNode.release.set()
+
+    def test_node_timeout_routes_to_timeout_transition(self):
+        """Test a timed-out node takes its timeout transition."""
+        flow = BaseFlow(
+            {
+                "start": FlowNode(
+                    self.BlockingNode, {"success": "end", "timeout": "fallback"}
+                ),
+                "fallback": FlowNode(DataTransformNode, {"default": "end"}),
+            }
+        )
+
+        started = time.monotonic()
+        result = flow.run({"input_data": ["x"]})
+
+        assert time.monotonic() - started < 1
+        assert result["_flow_path"] == ["start", "fallback"]
+        assert result["error_node"] == "start"
+        assert "timed out" in result["error"]
+        # Writes of the abandoned step never reach the store
+        self.BlockingNode.release.set()
+        time.sleep(0.05)
+        assert "blocked_write" not in result
+
+    async def test_hung_async_steps_leave_the_pool_free(self):
+        """Test abandoned sync steps of async flows do not hold pool workers."""
+        hung = AsyncBaseFlow({"start": FlowNode(self.BlockingNode, {"timeout": "end"})})
+        other = AsyncBaseFlow({"start": FlowNode(GreetingNode, {"success": "end"})})
+        configure_thread_pool(2)
+        try:
+            results = await asyncio.gather(*(hung.run({}) for _ in range(4)))
+            result = await asyncio.wait_for(other.run({"name": "ada"}), timeout=2)
+        finally:
+            configure_thread_pool(DEFAULT_THREAD_WORKERS)
+
+        assert all(result["action"] == "timeout" for result in results)
+        assert result["_flow_completed"] is True
+
+    def test_timeout_falls_back_to_error_transition(self):
+        """Test timeouts without a timeout transition are handled as errors."""
+        handled = BaseFlow(
+            {
+                "start": FlowNode(self.BlockingNode, {"error": "fallback"}),
+                "fallback": FlowNode(DataTransformNode, {"default": "end"}),
+            }
+        )
+        unhandled = BaseFlow({"start": FlowNode(self.BlockingNode, {})})
+
+        assert handled.run({})["_flow_path"] == ["start", "fallback"]
+        result = unhandled.run({})
+        assert result["action"] == "timeout"
+        assert result["_flow_completed"] is False
+
+    def test_step_within_timeout_keeps_store(self):
+        """Test a step finishing in time writes to the caller's store."""
+        flow = BaseFlow({"start": FlowNode(self.BlockingNode, {"success": "end"})})
+        store = {"block": False}
+
+        result = flow.run(store)
+
+        assert result is store
+        assert result["blocked_write"] is True
+        assert result["_flow_completed"] is True
+
+    def test_timeout_action_without_node_timeout_falls_back(self):
+        """Test nodes without node_timeout route 'timeout' like any action."""
+
+        class ReportsTimeoutNode(BaseNode):
+            def exec(self, store):
+                store["action"] = "timeout"
+                return store
+
+        flow = BaseFlow(
+            {
+                "start": FlowNode(
+                    ReportsTimeoutNode, {"default": "next", "error": "end"}
+                ),
+                "next": FlowNode(DataTransformNode, {"default": "end"}),
+            }
+        )
+
+        assert flow.run({})["_flow_path"] == ["start", "next"]
+
+    def test_steps_far_from_deadline_run_inline(self):
+        """Test only steps that could overrun the deadline run on a worker."""
+
+        class ThreadNode(BaseNode):
+            def exec(self, store):
+                store.setdefault("threads", []).append(threading.get_ident())
+                store["action"] = "again" if len(store["threads"]) < 5 else "done"
+                return store
+
+        flow = BaseFlow({"start": FlowNode(ThreadNode, {"again": "start"})})
+
+        result = flow.run({}, timeout=60)
+
+        assert result["_flow_completed"] is True
+        # The first step is limited while its duration is unknown
+        assert result["threads"][0] != threading.get_ident()
+        assert result["threads"][1:] == [threading.get_ident()] * 4
+
+    def test_limited_step_writes_and_deletes(self):
+        """Test writes and deletions of a limited step reach the store."""
+
+        class EditingNode(BaseNode):
+            node_timeout = 5
+
+            def exec(self, store):
+                del store["old"]
+                store["new"] = sorted(store)
+                store["action"] = "success"
+                return store
+
+        flow = BaseFlow({"start": FlowNode(EditingNode, {"success": "end"})})
+        store = {"old": 1, "kept": 2}
+
+        result = flow.run(store)
+
+        assert result is store
+        assert "old" not in result
+        assert result["kept"] == 2
+        assert "old" not in result["new"]
+        assert "kept" in result["new"]
+
+    def test_timed_out_pooled_instance_is_replaced(self):
+        """Test a pool does not hand out an instance a timed-out step holds."""
+        flow = BaseFlow(
+            {
+                "start": FlowNode(
+                    self.BlockingNode, {"success": "end"}, scope="pooled", pool_size=1
+                )
+            }
+        )
+
+        assert flow.run({})["action"] == "timeout"
+        assert flow.run({"block": False})["_flow_completed"] is True
+
+    def test_flow_deadline_stops_run(self):
+        """Test a run stops once its deadline has passed."""
+
+        class SlowNode(BaseNode):
+            def exec(self, store):
+                time.sleep(0.02)
+                store["action"] = "again"
+                return store
+
+        flow = BaseFlow({"start": FlowNode(SlowNode, {"again": "start"})})
+
+        result = flow.run({}, max_steps=1000, timeout=0.1)
+
+        assert result["_flow_completed"] is False
+        assert result["action"] == "timeout"
+        assert result["_flow_steps"] < 20
+        assert "_flow_deadline" in result
+
+    def test_async_node_is_cancelled(self):
+        """Test async nodes are cancelled when they run out of time."""
+        cancelled = []
+
+        class HangingNode(AsyncBaseNode):
+            node_timeout = 0.05
+
+            async def exec(self, store):
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    cancelled.append(True)
+                    raise
+                return store
+
+        flow = AsyncBaseFlow({"start": FlowNode(HangingNode, {"timeout": "end"})})
+
+        result = asyncio.run(flow.run())
+
+        assert cancelled == [True]
+        assert result["_flow_completed"] is True
+        assert result["error_node"] == "start"
+
+    def test_sync_node_in_async_flow_times_out(self):
+        """Test async flows limit offloaded sync nodes too."""
+        flow = AsyncBaseFlow({"start": FlowNode(self.BlockingNode, {})})
+
+        result = asyncio.run(flow.run())
+
+        assert result["action"] == "timeout"
+        assert "blocked_write" not in result
+
+
+class TestHedging:
+    """Test hedged execution of idempotent nodes."""
+
+    @staticmethod
+    def make_node(max_extra=1.0):
+        """Create a hedged node whose 21st attempt hangs until released."""
+
+        class FlakyNode(BaseNode):
+            idempotent = True
+            hedge = True
+            hedge_max_extra = max_extra
+            attempts: ClassVar[list[int]] = []
+            release = threading.Event()
+            lock = threading.Lock()
+
+            def exec(self, store):
+                with self.lock:
+                    self.attempts.append(1)
+                    attempt = len(self.attempts)
+                if attempt == 21:
+                    self.release.wait(5)
+                else:
+                    time.sleep(0.002)
+                store["attempt"] = attempt
+                store["action"] = "success"
+                return store
+
+        return FlakyNode
+
+    def warm_up(self, flow, runs=20):
+        """Run a flow enough times to collect latency samples."""
+        for _ in range(runs):
+            flow.run({})
+
+    def test_hedged_node_must_be_idempotent(self):
+        """Test hedging is refused for nodes not declared idempotent."""
+        with pytest.raises(ValueError, match="must be idempotent"):
+
+            class UnsafeNode(BaseNode):
+                hedge = True
+
+                def exec(self, store):
+                    return store
+
+    def test_slow_attempt_is_hedged(self):
+        """Test a second attempt wins when the first one is slow."""
+        node_class = self.make_node()
+        flow = BaseFlow({"start": FlowNode(node_class, {"success": "end"})})
+        self.warm_up(flow)
+
+        started = time.monotonic()
+        result = flow.run({})
+        elapsed = time.monotonic() - started
+        node_class.release.set()
+
+        assert elapsed < 1
+        assert result["attempt"] == 22
+        stats = hedge_stats(node_class).stats()
+        assert stats["hedges"] == 1
+        assert stats["hedge_wins"] == 1
+        assert stats["threshold"] < 0.1
+
+    def test_extra_load_is_capped(self):
+        """Test no second attempt is started beyond hedge_max_extra."""
+        node_class = self.make_node(max_extra=0.0)
+        flow = BaseFlow({"start": FlowNode(node_class, {"success": "end"})})
+        self.warm_up(flow)
+
+        threading.Timer(0.2, node_class.release.set).start()
+        result = flow.run({})
+
+        assert result["attempt"] == 21
+        assert hedge_stats(node_class).hedges == 0
+
+    def test_async_loser_is_cancelled(self):
+        """Test async flows cancel the attempt that lost."""
+        cancelled = []
+        attempts = []
+
+        class SlowAsyncNode(AsyncBaseNode):
+            idempotent = True
+            hedge = True
+            hedge_max_extra = 1.0
+
+            async def exec(self, store):
+                attempts.append(1)
+                attempt = len(attempts)
+                try:
+                    await asyncio.sleep(5 if attempt == 21 else 0.002)
+                except asyncio.CancelledError:
+                    cancelled.append(attempt)
+                    raise
+                store["attempt"] = attempt
+                store["action"] = "success"
+                return store
+
+        flow = AsyncBaseFlow({"start": FlowNode(SlowAsyncNode, {"success": "end"})})
+
+        async def run_all():
+            for _ in range(20):
+                await flow.run({})
+            return await flow.run({})
+
+        result = asyncio.run(run_all())
+
+        assert result["attempt"] == 22
+        assert cancelled == [21]
+
+
+class TestRunIter:
+    """Test streaming step events."""
+
+    def test_events_per_step(self):
+        """Test one event per step, then a final event with the store."""
+        events = list(
+            data_pipeline_flow.run_iter(
+                {"input_data": ["a"], "transform_type": "uppercase"}
+            )
+        )
+
+        steps, final = events[:-1], events[-1]
+        assert [event.node_id for event in steps] == [
+            "start",
+            "second_transform",
+            "final_transform",
+        ]
+        assert all(event.action == "success" for event in steps)
+        assert all(event.elapsed >= 0 for event in events)
+        assert "transformed_data" in steps[0].written_keys
+        assert not any(key.startswith("_flow_") for key in steps[-1].written_keys)
+        assert steps[0].store is None
+        assert final.node_id is None
+        assert final.store is not None
+        assert final.store["_flow_completed"] is True
+        assert final.store["transformed_data"] == ["A"]
+
+    def test_matches_run(self):
+        """Test iterating a run gives the same final store as run."""
+        final = list(greeting_flow.run_iter({"name": "ada"}))[-1].store
+        result = greeting_flow.run({"name": "ada"})
+
+        assert final is not None
+        assert final["greeting"] == result["greeting"]
+        assert final["_flow_path"] == result["_flow_path"]
+        assert final["_flow_steps"] == result["_flow_steps"]
+
+    def test_progress_is_lazy(self):
+        """Test the run only advances while the caller iterates."""
+        events = data_pipeline_flow.run_iter({"input_data": ["a"]})
+
+        first = next(events)
+        events.close()
+
+        assert first.node_id == "start"
+
+    def test_errors_are_reported_as_events(self):
+        """Test a failing node yields an error event and stops the run."""
+
+        class FailingNode(BaseNode):
+            def exec(self, store):  # noqa: ARG002
+                msg = "boom"
+                raise RuntimeError(msg)
+
+        flow = BaseFlow({"start": FlowNode(FailingNode, {"success": "end"})})
+
+        events = list(flow.run_iter())
+
+        assert events[0].node_id == "start"
+        assert events[0].action == "error"
+        assert "error" in events[0].written_keys
+        assert events[-1].store is not None
+        assert events[-1].store["_flow_completed"] is False
+
+    def test_written_keys_of_a_replaced_store(self):
+        """Test a node returning another store reports the keys that differ."""
+
+        class ReplacingNode(BaseNode):
+            def exec(self, store):
+                return {**store, "extra": 1, "action": "success"}
+
+        flow = BaseFlow({"start": FlowNode(ReplacingNode, {"success": "end"})})
+
+        events = list(flow.run_iter({"kept": "same"}))
+
+        assert set(events[0].written_keys) == {"extra", "action"}
+        assert events[-1].store is not None
+        assert events[-1].store["extra"] == 1
+
+    def test_async_run_iter(self):
+        """Test async flows stream events with async for."""
+
+        class EchoNode(AsyncBaseNode):
+            async def exec(self, store):
+                store["echo"] = store.get("message")
+                store["action"] = "success"
+                return store
+
+        flow = AsyncBaseFlow(
+            {
+                "start": FlowNode(EchoNode, {"success": "greet"}),
+                "greet": FlowNode(GreetingNode, {"success": "end"}),
+            }
+        )
+
+        async def collect():
+            return [
+                event async for event in flow.run_iter({"message": "hi", "name": "a"})
+            ]
+
+        events = asyncio.run(collect())
+
+        assert [event.node_id for event in events] == ["start", "greet", None]
+        assert events[0].written_keys == ("echo", "action")
+        assert events[-1].store is not None
+        assert events[-1].store["echo"] == "hi"
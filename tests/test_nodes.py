@@ -1,11 +1,38 @@
 """Tests for example nodes."""
 
+import asyncio
+import io
+import os
+import threading
+import time
+import tracemalloc
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.nodes.base import AsyncBaseNode
+from src.nodes.batch import AsyncBatchNode, BatchNode
 from src.nodes.examples import (
     ConditionalNode,
     DataTransformNode,
     GreetingNode,
     RandomNumberNode,
 )
+from src.utils.columns import to_column
+from src.utils.memo import MemoCache
+from src.utils.rng import RandomStream
+from src.utils.streams import Chunks, line_writer
+
+
+class SquareInProcessNode(BatchNode):
+    """Batch node squaring numbers in worker processes."""
+
+    executor = "process"
+    chunk_size = 2
+
+    def exec_chunk(self, chunk):
+        return [(item * item, os.getpid()) for item in chunk]
 
 
 class TestGreetingNode:
@@ -89,6 +116,26 @@ class TestRandomNumberNode:
         assert result["action"] == "error"
         assert "must be less than" in result["error"]
 
+    def test_random_numbers_bulk(self):
+        """Test bulk mode fills an array from the run's stream."""
+        node = RandomNumberNode()
+
+        first = node.run({"random_count": 500, "_flow_rng": RandomStream(1)})
+        second = node.run({"random_count": 500, "_flow_rng": RandomStream(1)})
+
+        assert first["action"] == "success"
+        assert "random_number" not in first
+        assert len(first["random_numbers"]) == 500
+        assert all(1 <= value <= 100 for value in first["random_numbers"])
+        assert first["random_numbers"] == second["random_numbers"]
+
+    def test_random_count_must_be_positive(self):
+        """Test invalid counts are rejected."""
+        result = RandomNumberNode().run({"random_count": 0})
+
+        assert result["action"] == "error"
+        assert "positive integer" in result["error"]
+
 
 class TestDataTransformNode:
     """Test the DataTransformNode implementation."""
@@ -145,6 +192,190 @@ class TestDataTransformNode:
         assert result["action"] == "error"
         assert "must be list" in result["error"]
 
+    def test_transform_array_column(self):
+        """Test array.array columns are transformed into columns."""
+        column = array("q", [3, 1, 2])
+
+        reversed_ = DataTransformNode().run(
+            {"input_data": column, "transform_type": "reverse"}
+        )
+        sorted_ = DataTransformNode().run(
+            {"input_data": column, "transform_type": "sort"}
+        )
+        upper = DataTransformNode().run(
+            {"input_data": column, "transform_type": "uppercase"}
+        )
+
+        assert reversed_["transformed_data"] == array("q", [2, 1, 3])
+        assert sorted_["transformed_data"] == array("q", [1, 2, 3])
+        assert sorted_["transform_stats"]["output_count"] == 3
+        assert upper["transformed_data"] == ["3", "1", "2"]
+
+    def test_transform_column_unknown_type(self):
+        """Test unknown transforms of columns are errors."""
+        result = DataTransformNode().run(
+            {"input_data": array("d", [1.0]), "transform_type": "shuffle"}
+        )
+
+        assert result["action"] == "error"
+        assert result["error"] == "Unknown transform type: shuffle"
+
+    def test_stream_uppercase_to_sink(self):
+        """Test iterables are uppercased chunk by chunk into the sink."""
+
+        class SmallChunksNode(DataTransformNode):
+            stream_chunk_size = 4
+
+        chunks = []
+        result = SmallChunksNode().run(
+            {
+                "input_data": (f"item{i}" for i in range(10)),
+                "transform_type": "uppercase",
+                "output_sink": chunks.append,
+            }
+        )
+
+        assert result["action"] == "success"
+        assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+        assert chunks[0] == ["ITEM0", "ITEM1", "ITEM2", "ITEM3"]
+        assert result["transform_stats"]["output_count"] == 10
+        assert result["transform_stats"]["chunks"] == 3
+        assert "transformed_data" not in result
+
+    def test_stream_reverse(self):
+        """Test streams are reversed through a spill file or backwards reads."""
+
+        class SmallChunksNode(DataTransformNode):
+            stream_chunk_size = 3
+
+        spilled = []
+        SmallChunksNode().run(
+            {
+                "input_data": iter(range(8)),
+                "transform_type": "reverse",
+                "output_sink": spilled,
+            }
+        )
+        backwards = []
+        DataTransformNode().run(
+            {
+                "input_data": Chunks([[0, 1], [2, 3, 4]]),
+                "transform_type": "reverse",
+                "output_sink": backwards,
+            }
+        )
+
+        assert spilled == [7, 6, 5, 4, 3, 2, 1, 0]
+        assert backwards == [4, 3, 2, 1, 0]
+
+    def test_stream_to_file(self):
+        """Test line_writer writes one result per line."""
+        target = io.StringIO()
+
+        DataTransformNode().run(
+            {
+                "input_data": (line.rstrip("\n") for line in io.StringIO("a\nb\n")),
+                "transform_type": "uppercase",
+                "output_sink": line_writer(target),
+            }
+        )
+
+        assert target.getvalue() == "A\nB\n"
+
+    def test_stream_errors(self):
+        """Test streams need a sink and cannot be sorted."""
+        missing = DataTransformNode().run({"input_data": iter([1])})
+        unsorted = DataTransformNode().run(
+            {"input_data": iter([1]), "transform_type": "sort", "output_sink": []}
+        )
+
+        assert missing["error"] == "Streaming input_data needs an output_sink"
+        assert unsorted["error"] == "Transform type sort cannot be streamed"
+
+    def test_stream_memory_is_flat(self):
+        """Test streaming holds one chunk, not the input, in memory."""
+
+        def peak_bytes(size):
+            tracemalloc.start()
+            DataTransformNode().run(
+                {
+                    "input_data": (f"line {i}" for i in range(size)),
+                    "transform_type": "uppercase",
+                    "output_sink": lambda _chunk: None,
+                }
+            )
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            return peak
+
+        small = peak_bytes(20_000)
+        large = peak_bytes(200_000)
+
+        assert large < small * 1.5
+
+    def test_transform_numpy_column(self):
+        """Test NumPy columns match the list transforms."""
+        np = pytest.importorskip("numpy")
+        words = ["pear", "Apple", "fig"]
+
+        for transform_type in ("uppercase", "reverse", "sort"):
+            expected = DataTransformNode().run(
+                {"input_data": list(words), "transform_type": transform_type}
+            )
+            result = DataTransformNode().run(
+                {"input_data": np.array(words), "transform_type": transform_type}
+            )
+            assert isinstance(result["transformed_data"], np.ndarray)
+            assert result["transformed_data"].tolist() == expected["transformed_data"]
+
+    def test_vectorize_large_lists(self):
+        """Test large lists become columns when vectorize_min_items is set."""
+        np = pytest.importorskip("numpy")
+
+        class VectorTransformNode(DataTransformNode):
+            vectorize_min_items = 3
+
+        small = VectorTransformNode().run(
+            {"input_data": [2, 1], "transform_type": "sort"}
+        )
+        large = VectorTransformNode().run(
+            {"input_data": [3, 1, 2], "transform_type": "sort"}
+        )
+
+        assert small["transformed_data"] == [1, 2]
+        assert isinstance(large["transformed_data"], np.ndarray)
+        assert large["transformed_data"].tolist() == [1, 2, 3]
+
+    def test_mixed_types_are_not_vectorized(self):
+        """Test lists mixing types take the list path, above the threshold too."""
+        pytest.importorskip("numpy")
+
+        class VectorTransformNode(DataTransformNode):
+            vectorize_min_items = 1
+
+        numbers = VectorTransformNode().run(
+            {"input_data": [3, 1.5, 2], "transform_type": "reverse"}
+        )
+        mixed = VectorTransformNode().run(
+            {"input_data": [3, "a", 1], "transform_type": "sort"}
+        )
+        expected = DataTransformNode().run(
+            {"input_data": [3, "a", 1], "transform_type": "sort"}
+        )
+
+        assert numbers["transformed_data"] == [2, 1.5, 3]
+        assert type(numbers["transformed_data"][0]) is int
+        assert mixed["action"] == expected["action"] == "error"
+        assert mixed["error"] == expected["error"]
+
+    def test_to_column_rejects_mixed_types(self):
+        """Test only lists of one type become columns."""
+        assert to_column([1, 2.5]) is None
+        assert to_column([1, "a"]) is None
+        assert to_column([]) is None
+        assert list(to_column([2, 1])) == [2, 1]
+        assert list(to_column([2.5, 1.0])) == [2.5, 1.0]
+
 
 class TestConditionalNode:
     """Test the ConditionalNode implementation."""
@@ -178,3 +409,295 @@ class TestConditionalNode:
 
         assert result["action"] == "at_threshold"
         assert "equals threshold" in result["message"]
+
+
+class TestAsyncBaseNode:
+    """Test the AsyncBaseNode lifecycle."""
+
+    class UpperNode(AsyncBaseNode):
+        """Async node that uppercases a message."""
+
+        async def prep(self, store):
+            if "message" not in store:
+                store["action"] = "error"
+                store["error"] = "message is required"
+            return store
+
+        async def exec(self, store):
+            store["upper"] = store["message"].upper()
+            store["action"] = "success"
+            return store
+
+    async def test_async_lifecycle(self):
+        """Test all phases are awaited in order."""
+        result = await self.UpperNode().run({"message": "hi"})
+
+        assert result["action"] == "success"
+        assert result["upper"] == "HI"
+
+    async def test_async_prep_error_skips_exec(self):
+        """Test a prep error skips the exec phase."""
+        result = await self.UpperNode().run({})
+
+        assert result["action"] == "error"
+        assert "upper" not in result
+
+
+class TestMemoizedNodes:
+    """Test memoized node execution."""
+
+    class MemoTransformNode(DataTransformNode):
+        """DataTransformNode that counts exec calls and memoizes them."""
+
+        memoize = True
+        calls = 0
+
+        def exec(self, store):
+            type(self).calls += 1
+            return super().exec(store)
+
+    class SlowEchoNode(AsyncBaseNode):
+        """Async memoized node that takes a while to compute."""
+
+        reads = frozenset({"text"})
+        memoize = True
+        calls = 0
+
+        async def exec(self, store):
+            type(self).calls += 1
+            await asyncio.sleep(0.05)
+            store["echo"] = store["text"]
+            store["action"] = "success"
+            return store
+
+    def setup_method(self):
+        """Reset the caches and call counters."""
+        for node_class in (self.MemoTransformNode, self.SlowEchoNode):
+            node_class.calls = 0
+            node_class.memo_cache().clear()
+
+    def test_hit_replays_writes(self):
+        """Test a repeated input replays the cached writes without exec."""
+        node = self.MemoTransformNode()
+        first = node.run({"input_data": ["a", "b"], "transform_type": "uppercase"})
+        second = node.run(
+            {"input_data": ["a", "b"], "transform_type": "uppercase", "other": 1}
+        )
+
+        assert self.MemoTransformNode.calls == 1
+        assert second["transformed_data"] == first["transformed_data"] == ["A", "B"]
+        assert second["transform_stats"] == first["transform_stats"]
+        assert second["other"] == 1
+        assert self.MemoTransformNode.memo_cache().stats() == {
+            "hits": 1,
+            "misses": 1,
+            "coalesced": 0,
+            "size": 1,
+        }
+
+    def test_different_inputs_miss(self):
+        """Test a change to a read key is a cache miss."""
+        node = self.MemoTransformNode()
+        node.run({"input_data": ["a"], "transform_type": "uppercase"})
+        result = node.run({"input_data": ["a"], "transform_type": "reverse"})
+
+        assert self.MemoTransformNode.calls == 2
+        assert result["transformed_data"] == ["a"]
+
+    def test_errors_are_not_cached(self):
+        """Test failed executions are computed again."""
+        node = self.MemoTransformNode()
+        node.run({"input_data": ["a"], "transform_type": "bogus"})
+        result = node.run({"input_data": ["a"], "transform_type": "bogus"})
+
+        assert self.MemoTransformNode.calls == 2
+        assert result["action"] == "error"
+
+    def test_concurrent_misses_are_coalesced(self):
+        """Test concurrent callers with the same inputs run exec once."""
+        cache = MemoCache()
+        started = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            time.sleep(0.05)
+            return "value"
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = [pool.submit(cache.get_or_compute, "k", compute)]
+            started.wait()
+            futures += [
+                pool.submit(cache.get_or_compute, "k", compute) for _ in range(3)
+            ]
+            results = [future.result() for future in futures]
+
+        assert results == ["value"] * 4
+        assert len(calls) == 1
+        assert cache.stats()["coalesced"] == 3
+
+    def test_lru_and_ttl_eviction(self):
+        """Test entries are evicted by size and expire after the TTL."""
+        now = [0.0]
+        cache = MemoCache(maxsize=2, ttl=10, clock=lambda: now[0])
+        for key in "abc":
+            cache.get_or_compute(key, lambda key=key: key.upper())
+
+        assert len(cache) == 2
+        assert cache.get_or_compute("a", lambda: "recomputed") == "recomputed"
+
+        now[0] = 11.0
+        assert cache.get_or_compute("c", lambda: "expired") == "expired"
+
+    async def test_async_node_coalesces(self):
+        """Test concurrent async runs with the same inputs await one exec."""
+        results = await asyncio.gather(
+            *(self.SlowEchoNode().run({"text": "hi"}) for _ in range(5))
+        )
+
+        assert [result["echo"] for result in results] == ["hi"] * 5
+        assert self.SlowEchoNode.calls == 1
+
+    def test_memoize_requires_reads(self):
+        """Test memoized nodes must declare the keys they read."""
+        with pytest.raises(ValueError, match="must declare reads"):
+
+            class NoReadsNode(GreetingNode):
+                memoize = True
+
+
+class TestBatchNode:
+    """Test map-reduce batch nodes."""
+
+    class SlowDoubleNode(BatchNode):
+        """Doubles items after a delay that shrinks with the item's value."""
+
+        max_workers = 3
+        active = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def exec_item(self, item):
+            cls = type(self)
+            with cls.lock:
+                cls.active += 1
+                cls.peak = max(cls.peak, cls.active)
+            time.sleep(0.02 / (abs(item) + 1))
+            with cls.lock:
+                cls.active -= 1
+            if item < 0:
+                msg = f"negative item {item}"
+                raise ValueError(msg)
+            return item * 2
+
+    def test_results_in_order_with_bounded_concurrency(self):
+        """Test chunks run concurrently, up to max_workers, and keep their order."""
+        result = self.SlowDoubleNode().run({"items": list(range(10))})
+
+        assert result["action"] == "success"
+        assert result["results"] == [item * 2 for item in range(10)]
+        assert 1 < self.SlowDoubleNode.peak <= 3
+
+    def test_chunks_and_reduce(self):
+        """Test exec_chunk sees chunk_size items and reduce combines results."""
+
+        class ChunkSumNode(BatchNode):
+            chunk_size = 4
+            executor = None
+            items_key = "numbers"
+            output_key = "total"
+
+            def exec_chunk(self, chunk):
+                return [len(chunk)] * len(chunk)
+
+            def reduce(self, results, store):  # noqa: ARG002
+                return sum(results)
+
+        result = ChunkSumNode().run({"numbers": iter(range(10))})
+
+        # Chunks of 4, 4 and 2 items
+        assert result["total"] == 4 * 4 + 4 * 4 + 2 * 2
+
+    def test_first_failure_fails_the_node(self):
+        """Test the default error policy fails the node."""
+        result = self.SlowDoubleNode().run({"items": [1, -2, 3]})
+
+        assert result["action"] == "error"
+        assert result["error"] == "1 items failed; item 1: negative item -2"
+        assert "results" not in result
+
+    def test_skip_failed_items(self):
+        """Test the skip policy leaves failed items out and reports them."""
+
+        class SkippingNode(self.SlowDoubleNode):
+            on_error = "skip"
+            max_failures = 1
+
+        result = SkippingNode().run({"items": [1, -2, 3]})
+
+        assert result["action"] == "success"
+        assert result["results"] == [2, 6]
+        assert result["batch_errors"] == {1: "negative item -2"}
+
+        too_many = SkippingNode().run({"items": [-1, -2, 3]})
+        assert too_many["action"] == "error"
+        assert too_many["batch_errors"].keys() == {0, 1}
+
+    def test_missing_or_invalid_items(self):
+        """Test prep rejects a missing or non-collection input."""
+        assert self.SlowDoubleNode().run({})["error"] == (
+            "Missing required fields: items"
+        )
+        assert self.SlowDoubleNode().run({"items": "abc"})["action"] == "error"
+
+    def test_invalid_settings(self):
+        """Test batch settings are checked when the class is defined."""
+        with pytest.raises(ValueError, match="chunk_size"):
+
+            class EmptyChunks(BatchNode):
+                chunk_size = 0
+
+        with pytest.raises(ValueError, match="unknown on_error"):
+
+            class UnknownPolicy(BatchNode):
+                on_error = "ignore"
+
+    def test_missing_hooks(self):
+        """Test batch nodes must implement exec_item or exec_chunk."""
+        with pytest.raises(TypeError, match="exec_item or exec_chunk"):
+
+            class NoHooks(BatchNode):
+                items_key = "documents"
+
+        with pytest.raises(TypeError, match="exec_item or exec_chunk"):
+
+            class AsyncNoHooks(AsyncBatchNode):
+                items_key = "documents"
+
+        class ChunkOnly(AsyncBatchNode):
+            async def exec_chunk(self, chunk):
+                return chunk
+
+    def test_process_executor(self):
+        """Test chunks can run in worker processes."""
+        result = SquareInProcessNode().run({"items": [1, 2, 3]})
+
+        assert [value for value, _ in result["results"]] == [1, 4, 9]
+        assert all(pid != os.getpid() for _, pid in result["results"])
+
+    async def test_async_batch_node(self):
+        """Test async batch nodes await chunks concurrently and keep order."""
+
+        class AsyncDoubleNode(AsyncBatchNode):
+            max_workers = 5
+
+            async def exec_item(self, item):
+                await asyncio.sleep(0.05)
+                return item * 2
+
+        started = time.monotonic()
+        result = await AsyncDoubleNode().run({"items": range(5)})
+
+        assert result["results"] == [0, 2, 4, 6, 8]
+        assert time.monotonic() - started < 0.2
@@ -0,0 +1,315 @@
+"""Tests for utility modules."""
+
+import pickle
+from typing import Any
+
+import pytest
+
+from src.flows.base import BaseFlow, FlowNode
+from src.flows.examples import greeting_flow
+from src.flows.parallel import FanOut, store_delta
+from src.nodes.base import JoinNode
+from src.nodes.examples import DataTransformNode, GreetingNode
+from src.utils.histogram import LatencyHistogram
+from src.utils.rng import RandomStream, randints, seed_store, split_stream
+from src.utils.schema import FlowStore
+from src.utils.store import CowStore
+
+
+class TestCowStore:
+    """Test the copy-on-write store."""
+
+    def test_behaves_like_dict(self):
+        """Test the mapping interface matches a plain dict."""
+        store = CowStore({"a": 1, "b": 2})
+        store["c"] = 3
+        del store["a"]
+        store.commit()
+        store["a"] = 10
+        store.pop("b")
+
+        assert store == {"c": 3, "a": 10}
+        assert len(store) == 2
+        assert "b" not in store
+        assert store.get("b", "missing") == "missing"
+        with pytest.raises(KeyError):
+            del store["b"]
+
+    def test_fork_is_isolated_and_shares_values(self):
+        """Test forks see the parent's values but not its later writes."""
+        big = list(range(1000))
+        parent = CowStore({"big": big, "x": 1})
+
+        child = parent.fork()
+        child["x"] = 2
+        parent["y"] = 3
+
+        assert child["big"] is big
+        assert child == {"big": big, "x": 2}
+        assert parent == {"big": big, "x": 1, "y": 3}
+
+    def test_delta_since_fork(self):
+        """Test a fork reports only its own writes and deletions."""
+        parent = CowStore({"keep": 1, "drop": 2, "change": 3})
+        child = parent.fork()
+        child["change"] = 30
+        child.commit("node")
+        child["new"] = 4
+        del child["drop"]
+
+        assert store_delta(parent, child) == ({"change": 30, "new": 4}, {"drop"})
+
+    def test_delta_since_unrelated_store(self):
+        """Test deltas against unrelated mappings fall back to identity."""
+        value = object()
+        store = CowStore({"a": value, "b": 1})
+
+        assert store.delta_since({"a": value, "c": 2}) == ({"b": 1}, {"c"})
+
+    def test_deltas_and_compaction(self):
+        """Test per-commit deltas and that deep chains are compacted."""
+        store = CowStore({f"k{i}": i for i in range(100)}, max_depth=4)
+        for step in range(3):
+            store[f"k{step}"] = -step
+            store.commit(f"node{step}")
+
+        assert [label for label, _, _ in store.deltas()] == ["node0", "node1", "node2"]
+
+        for step in range(3, 10):
+            store[f"k{step}"] = -step
+            store.commit(f"node{step}")
+
+        assert len(store.deltas()) < 4
+        assert store == {f"k{i}": -i if i < 10 else i for i in range(100)}
+
+    def test_flow_records_per_node_deltas(self):
+        """Test flows commit each node's changes as a labelled layer."""
+        flow = BaseFlow(
+            {
+                "start": FlowNode(GreetingNode, {"success": "transform"}),
+                "transform": FlowNode(DataTransformNode, {"success": "end"}),
+            }
+        )
+
+        result = flow.run(CowStore({"name": "ada", "input_data": ["x"]}))
+
+        assert isinstance(result, CowStore)
+        assert result["_flow_completed"] is True
+        assert result["transformed_data"] == ["X"]
+        labels = [label for label, _, _ in result.deltas()]
+        assert labels == ["start", "transform"]
+        assert "greeting" in result.deltas()[0][1]
+
+
+class TestLatencyHistogram:
+    """Test the log-linear latency histogram."""
+
+    def test_quantiles_are_accurate(self):
+        """Test quantiles stay within the bucket precision."""
+        histogram = LatencyHistogram()
+        durations = [i / 10_000 for i in range(1, 10_001)]  # 0.1 ms .. 1 s
+        for duration in durations:
+            histogram.record(duration)
+
+        p50, p95, p99 = histogram.quantiles([0.5, 0.95, 0.99])
+
+        assert histogram.count == 10_000
+        assert p50 == pytest.approx(0.5, rel=0.07)
+        assert p95 == pytest.approx(0.95, rel=0.07)
+        assert p99 == pytest.approx(0.99, rel=0.07)
+        assert histogram.quantile(1.0) == histogram.max == 1.0
+
+    def test_empty_histogram(self):
+        """Test an empty histogram has no quantiles."""
+        histogram = LatencyHistogram()
+
+        assert histogram.quantile(0.5) is None
+        assert histogram.mean is None
+        with pytest.raises(ValueError, match="between 0 and 1"):
+            histogram.quantile(1.5)
+
+    def test_fixed_size(self):
+        """Test durations beyond the covered range land in the last bucket."""
+        histogram = LatencyHistogram()
+        histogram.record(10**6)
+        histogram.record(-1.0)
+
+        assert histogram.count == 2
+        assert histogram.quantile(0.0) == 0.0
+        assert histogram.quantile(1.0) == 10**6
+
+    def test_nanoseconds_match_seconds(self):
+        """Test record_ns fills the same buckets as record."""
+        seconds = LatencyHistogram()
+        nanos = LatencyHistogram()
+        for micros in (0, 7, 15, 16, 1_000, 123_456, 10**9):
+            seconds.record(micros / 1_000_000)
+            nanos.record_ns(micros * 1_000)
+
+        qs = [i / 10 for i in range(11)]
+        assert nanos.quantiles(qs) == seconds.quantiles(qs)
+        assert nanos.max == seconds.max == 1_000
+        assert nanos.mean == pytest.approx(seconds.mean)
+
+
+class TestRandomStream:
+    """Test seedable random streams."""
+
+    def test_equal_seeds_equal_streams(self):
+        """Test streams are reproducible and survive pickling."""
+        stream = RandomStream(7)
+        stream.random()
+        clone = pickle.loads(pickle.dumps(stream))  # noqa: S301
+
+        assert clone.initial_seed == 7
+        assert [clone.random() for _ in range(3)] == [stream.random() for _ in range(3)]
+        assert RandomStream(7).random() == RandomStream(7).random()
+
+    def test_split_streams_differ(self):
+        """Test child streams are independent but reproducible."""
+        first, second = RandomStream(1).split(), RandomStream(1).split()
+        sibling = RandomStream(1)
+        sibling.split()
+
+        assert first.initial_seed == second.initial_seed
+        assert sibling.split().initial_seed != first.initial_seed
+
+    def test_seed_store(self):
+        """Test runs get streams only when they have a seed."""
+        unseeded = {}
+        seed_store(unseeded, None)
+        seeded: dict[str, Any] = {"_flow_seed": 3}
+        seed_store(seeded, None)
+        drawn = {}
+        seed_store(drawn, RandomStream(5))
+
+        assert "_flow_rng" not in unseeded
+        assert seeded["_flow_rng"].initial_seed == 3
+        assert drawn["_flow_rng"].initial_seed == drawn["_flow_seed"]
+
+        fork = split_stream(dict(seeded))
+        assert fork["_flow_rng"] is not seeded["_flow_rng"]
+
+    def test_randints(self):
+        """Test bulk draws stay in range and fill an int64 array."""
+        values = randints(RandomStream(0), 5, 8, 1000)
+
+        assert values.typecode == "q"
+        assert len(values) == 1000
+        assert set(values) == {5, 6, 7, 8}
+
+
+class GreetingStore(FlowStore):
+    """Store schema of the greeting flow."""
+
+    name: str
+    time_of_day: str = "day"
+    greeting: str | None = None
+
+
+class StrictStore(GreetingStore, strict=True):
+    """Greeting store rejecting undeclared keys."""
+
+    greeting_metadata: dict
+
+
+class TestFlowStore:
+    """Test typed, slotted stores."""
+
+    def test_behaves_like_dict(self):
+        """Test the mapping interface over fields and other keys."""
+        store = GreetingStore({"name": "ada"}, extra=1)
+
+        assert store["name"] == store.name == "ada"
+        assert store.get("greeting") is None
+        assert "action" not in store
+        assert store.get("action", "default") == "default"
+        with pytest.raises(KeyError):
+            store["action"]
+        store["action"] = "success"
+        del store["extra"]
+
+        assert dict(store) == {
+            "name": "ada",
+            "time_of_day": "day",
+            "greeting": None,
+            "action": "success",
+        }
+        assert len(store) == 4
+        assert not hasattr(store, "__dict__")
+        with pytest.raises(AttributeError):
+            store.greting = "typo"  # type: ignore[attr-defined]
+
+    def test_fork_and_pickle(self):
+        """Test copies are independent and pickling keeps the class."""
+        store = GreetingStore(name="ada", extra=[1])
+        fork = store.fork()
+        fork.name = "bob"  # type: ignore[attr-defined]
+        fork["other"] = 2
+
+        assert store.name == "ada"
+        assert "other" not in store
+        assert fork["extra"] is store["extra"]
+        clone = pickle.loads(pickle.dumps(fork))  # noqa: S301
+        assert type(clone) is GreetingStore
+        assert clone == fork
+
+    def test_mapping_access_overrides_are_kept(self):
+        """Test per-class accessors do not replace user-defined ones."""
+
+        class LowerStore(GreetingStore):
+            def __getitem__(self, key):
+                return super().__getitem__(key.lower())
+
+        class NamedStore(LowerStore):
+            nickname: str = "ace"
+
+        store = NamedStore(name="ada")
+
+        assert store["NAME"] == "ada"
+        assert store["NICKNAME"] == "ace"
+        assert store.get("nickname") == "ace"
+        assert "nickname" in store
+        assert store.get("missing", 1) == 1
+
+    def test_strict_and_invalid_schemas(self):
+        """Test strict stores and schema errors."""
+        with pytest.raises(KeyError, match="no field 'extra'"):
+            StrictStore(name="ada", extra=1)
+        with pytest.raises(ValueError, match="mutable default"):
+            type("Bad", (FlowStore,), {"__annotations__": {"a": list}, "a": []})
+        with pytest.raises(ValueError, match="clashes"):
+            type("Bad", (FlowStore,), {"__annotations__": {"items": list}})
+
+    def test_flows_run_on_typed_stores(self):
+        """Test flows, nodes and validation use typed stores transparently."""
+        result = greeting_flow.run(StrictStore(name="  ada "))
+        failed = greeting_flow.run(StrictStore())
+
+        assert isinstance(result, StrictStore)
+        assert isinstance(failed, StrictStore)
+        assert result.greeting == "Hello, Ada! 👋"
+        assert result.action == "success"
+        assert result._flow_completed is True
+        assert failed.action == "error"
+        assert "Missing required fields: name" in failed.error
+
+    def test_fan_out_merges_into_typed_store(self):
+        """Test branches fork and merge typed stores."""
+        flow = BaseFlow(
+            {
+                "start": FlowNode(
+                    GreetingNode, {"success": FanOut(["a", "b"], join="join")}
+                ),
+                "a": FlowNode(DataTransformNode, {"success": "join"}),
+                "b": FlowNode(GreetingNode, {"success": "join"}),
+                "join": FlowNode(JoinNode, {"success": "end"}),
+            }
+        )
+
+        result = flow.run(GreetingStore(name="ada", input_data=["x"]))
+
+        assert isinstance(result, GreetingStore)
+        assert result._flow_completed is True
+        assert result["transformed_data"] == ["X"]
+        assert result.greeting == "Hello, Ada! 👋"